@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Bulk attendance throughput at school scale
+Compares the old per-student loop of /api/attendance/bulk (get, lookup,
+flush per id) against the endpoint itself (IN queries plus multi-row
+upserts), for a first roll call and a re-submission that updates every row
+
+Usage:
+    python benchmarks/bench_bulk_attendance.py [--students 10000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+
+from sqlalchemy import event
+
+DAY = date(2025, 1, 6)
+
+
+def load_backend(tmp, students):
+    """Import the backend on a throwaway database and enrol the students in its demo class"""
+    os.environ['ATTENSYNC_DB_PATH'] = os.path.join(tmp, 'bench.db')
+    cwd = os.getcwd()
+    os.chdir(tmp)  # backend creates its upload folder relative to the working directory
+    try:
+        import backend
+    finally:
+        os.chdir(cwd)
+    from models import db, Class, Student
+
+    with backend.app.app_context():
+        class_id = Class.query.first().id
+        db.session.bulk_insert_mappings(Student, [
+            {'roll_number': f"B{i:05d}", 'full_name': f"Student {i}", 'class_id': class_id,
+             'enrollment_date': DAY, 'rfid_tag': f"TAG{i:05d}"}
+            for i in range(students)
+        ])
+        db.session.commit()
+        ids = [student_id for student_id, in db.session.query(Student.id).order_by(Student.id)]
+    return backend, ids
+
+
+def per_student(backend, records):
+    """The loop /api/attendance/bulk used to run"""
+    from models import db, Attendance, Student
+
+    for record in records:
+        student = Student.query.get(record['student_id'])
+        existing = Attendance.query.filter_by(student_id=student.id, attendance_date=DAY).first()
+        if existing:
+            existing.status = record['status']
+            existing.method = 'manual'
+        else:
+            db.session.add(Attendance(student_id=student.id, class_id=student.class_id, teacher_id=1,
+                                      attendance_date=DAY, status=record['status'], method='manual'))
+            db.session.flush()
+    db.session.commit()
+
+
+def endpoint(backend, records):
+    """POST the roll call to /api/attendance/bulk"""
+    response = backend.app.test_client().post('/api/attendance/bulk', json={
+        'date': DAY.isoformat(), 'records': records
+    })
+    assert response.status_code == 200 and response.get_json()['errors'] == 0, response.get_json()
+
+
+def measure(backend, mark, records):
+    from models import db
+
+    statements = [0]
+
+    def count(*_):
+        statements[0] += 1
+
+    with backend.app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+        started = time.perf_counter()
+        mark(backend, records)
+        elapsed = time.perf_counter() - started
+        event.remove(db.engine, 'before_cursor_execute', count)
+        db.session.remove()
+    return statements[0], elapsed
+
+
+def clear_attendance(backend):
+    from models import db, Attendance
+
+    with backend.app.app_context():
+        Attendance.query.delete()
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend, ids = load_backend(tmp, args.students)
+
+        # Mixed statuses, as in a real roll call
+        statuses = ('present',) * 8 + ('absent', 'late')
+        first = [{'student_id': student_id, 'status': statuses[i % len(statuses)]}
+                 for i, student_id in enumerate(ids)]
+        again = [dict(record, status='present') for record in first]
+
+        print(f"{'mode':<12} {'pass':<8} {'statements':>10} {'seconds':>8} {'rows/s':>10}")
+        for name, mark in (('per-student', per_student), ('endpoint', endpoint)):
+            clear_attendance(backend)
+            for label, records in (('create', first), ('update', again)):
+                statements, elapsed = measure(backend, mark, records)
+                print(f"{name:<12} {label:<8} {statements:>10} {elapsed:>8.2f} {len(records) / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
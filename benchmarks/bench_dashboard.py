@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Dashboard latency with a large attendance table
+Compares the old /api/stats/dashboard body (today's rows loaded into Python,
+separate counts, weekly GROUP BY over attendance) against the single-query
+snapshot, uncached and through the dashboard cache
+
+Usage:
+    python benchmarks/bench_dashboard.py [--students 2000] [--days 500] [--requests 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+
+from flask import Flask
+from sqlalchemy import text
+
+from dashboard import DashboardCache, load_dashboard_snapshot
+from migrations import run_migrations
+from models import db, User, Class, Student, Attendance, RFIDScanLog
+
+
+def build_app(path, students, days):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    today = date.today()
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+        teacher = User(username='admin', email='admin@attensync.com', full_name='Admin', role='admin')
+        teacher.set_password('admin123')
+        db.session.add(teacher)
+        db.session.flush()
+        classes = []
+        for i in range(max(1, students // 40)):
+            cls = Class(name=f'Class {i}', grade_level=5, section='A', teacher_id=teacher.id, academic_year='2024-25')
+            db.session.add(cls)
+            classes.append(cls)
+        db.session.flush()
+        db.session.bulk_insert_mappings(Student, [
+            {'roll_number': f"B{i:05d}", 'full_name': f"Student {i}", 'class_id': classes[i % len(classes)].id,
+             'enrollment_date': today, 'rfid_tag': f"TAG{i:05d}"}
+            for i in range(students)
+        ])
+        db.session.commit()
+
+        # Raw inserts (the summary triggers still fire for every row)
+        conn = db.engine.raw_connection()
+        conn.executemany(
+            "INSERT INTO attendance (student_id, class_id, teacher_id, attendance_date, time_marked, status, method) "
+            "VALUES (?, ?, 1, ?, ?, ?, 'rfid')",
+            ((s + 1, classes[s % len(classes)].id, (today - timedelta(days=d)).isoformat(),
+              f"{today - timedelta(days=d)} 09:00:00.000000", 'present' if (s + d) % 9 else 'absent')
+             for d in range(days) for s in range(students))
+        )
+        conn.executemany(
+            "INSERT INTO rfid_scan_logs (rfid_tag, scan_time, student_id, status) VALUES (?, ?, ?, 'success')",
+            ((f"TAG{s:05d}", f"{today} 09:{s // 60 % 60:02d}:{s % 60:02d}.000000", s + 1) for s in range(students))
+        )
+        conn.commit()
+        conn.close()
+        db.session.execute(text("ANALYZE"))
+    return app
+
+
+def legacy_dashboard():
+    """The body /api/stats/dashboard used to run"""
+    today = date.today()
+    total_students = Student.query.filter_by(is_active=True).count()
+    total_classes = Class.query.filter_by(is_active=True).count()
+    today_attendance = Attendance.query.filter_by(attendance_date=today).all()
+    present_today = len([a for a in today_attendance if a.status == 'present'])
+    week_ago = today - timedelta(days=7)
+    weekly_attendance = db.session.query(Attendance.attendance_date, db.func.count(Attendance.id)).filter(
+        Attendance.attendance_date >= week_ago,
+        Attendance.attendance_date <= today,
+        Attendance.status == 'present'
+    ).group_by(Attendance.attendance_date).all()
+    weekly_avg = sum([count for _, count in weekly_attendance]) / 7 if weekly_attendance else 0
+    recent_scans = RFIDScanLog.query.order_by(RFIDScanLog.scan_time.desc()).limit(10).all()
+    return {
+        'total_students': total_students,
+        'total_classes': total_classes,
+        'present_today': present_today,
+        'weekly_average': round(weekly_avg, 1),
+        'recent_rfid_scans': [scan.to_dict() for scan in recent_scans]
+    }
+
+
+def measure(app, handler, requests):
+    timings = []
+    with app.app_context():
+        for _ in range(requests):
+            started = time.perf_counter()
+            handler()
+            timings.append(time.perf_counter() - started)
+            db.session.remove()
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        app = build_app(os.path.join(tmp, 'bench.db'), args.students, args.days)
+        print(f"Seeded {args.students * args.days} attendance rows in {time.perf_counter() - started:.1f}s")
+
+        cache = DashboardCache(ttl=2)
+        handlers = [
+            ('legacy', legacy_dashboard),
+            ('single query', lambda: load_dashboard_snapshot(db.session)),
+            ('cached', lambda: cache.get(lambda: load_dashboard_snapshot(db.session))),
+        ]
+        print(f"{'handler':<14} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, handler in handlers:
+            p50, p99 = measure(app, handler, args.requests)
+            print(f"{name:<14} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Backtest of the NumPy forecasters against Prophet
+Rolling origin over school-day attendance series: every week of the last
+--test-weeks is forecast from the days before it, and each method's fit time,
+MAE, MAPE and 80%-interval coverage are reported. Series are synthetic
+(weekday effect, drift, a term-break dip and noise) unless --db points at a
+database, in which case the whole-school series and every class are used.
+
+Usage:
+    python benchmarks/bench_fast_forecast.py [--series 12] [--days 120] [--test-weeks 4] [--db PATH]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+
+import numpy as np
+import pandas as pd
+
+from fast_forecast import FORECASTERS, Z_80, fit_fast, future_dates
+from forecast_model import AttendanceForecastModel, fit_prophet, predict
+
+
+def synthetic_series(rng, days):
+    """Weekday attendance % for the days up to today"""
+    ds = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    weekday_effect = np.array([-5, 0, 1, 0, -3])[ds.weekday]
+    drift = np.linspace(0, rng.uniform(-4, 4), days)
+    dip = np.where((np.arange(days) % 60) < 5, -rng.uniform(3, 8), 0)
+    y = rng.uniform(78, 92) + weekday_effect + drift + dip + rng.normal(0, rng.uniform(1.5, 4), days)
+    return pd.DataFrame({'ds': ds, 'y': np.clip(y, 0, 100)})
+
+
+def database_series(path, days):
+    model = AttendanceForecastModel(db_path=path)
+    series = [model.load_attendance_data(days_back=days)]
+    with model._get_db_connection() as conn:
+        class_ids = [row[0] for row in conn.execute("SELECT id FROM classes WHERE is_active = 1")]
+    series += [model.load_attendance_data(days_back=days, class_id=class_id) for class_id in class_ids]
+    return [s for s in series if len(s) >= 28]
+
+
+def fit_and_predict(method, history, dates):
+    """(yhat, lower, upper, fit seconds) for the given forecast days"""
+    started = time.perf_counter()
+    if method == 'prophet':
+        model = fit_prophet(history)
+        elapsed = time.perf_counter() - started
+        forecast = predict(model, pd.DataFrame({'ds': dates})).set_index('ds').loc[dates.to_numpy()]
+        return forecast['yhat'].to_numpy(), forecast['yhat_lower'].to_numpy(), forecast['yhat_upper'].to_numpy(), elapsed
+    model = fit_fast(method, history)
+    elapsed = time.perf_counter() - started
+    yhat, sigma = model.predict(dates)
+    return yhat, yhat - Z_80 * sigma, yhat + Z_80 * sigma, elapsed
+
+
+def backtest(series, methods, test_weeks):
+    scores = {method: {'errors': [], 'actual': [], 'covered': [], 'fit_seconds': []} for method in methods}
+    for history in series:
+        last = history['ds'].max()
+        for week in range(test_weeks, 0, -1):
+            origin = last - pd.Timedelta(days=7 * week)
+            train = history[history['ds'] <= origin]
+            test = history[(history['ds'] > origin) & (history['ds'] <= origin + pd.Timedelta(days=7))]
+            if len(train) < 14 or test.empty:
+                continue
+            # Forecast the calendar week, score the school days in it
+            dates = future_dates(train, 7)
+            keep = dates.isin(test['ds']).to_numpy()
+            actual = test.set_index('ds').loc[dates[keep].to_numpy(), 'y'].to_numpy()
+            for method in methods:
+                yhat, lower, upper, seconds = fit_and_predict(method, train, dates)
+                yhat, lower, upper = np.clip(yhat[keep], 0, 100), lower[keep], upper[keep]
+                scores[method]['errors'].append(yhat - actual)
+                scores[method]['actual'].append(actual)
+                scores[method]['covered'].append((actual >= lower) & (actual <= upper))
+                scores[method]['fit_seconds'].append(seconds)
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--series', type=int, default=12)
+    parser.add_argument('--days', type=int, default=120, help='School days per synthetic series / days back from --db')
+    parser.add_argument('--test-weeks', type=int, default=4)
+    parser.add_argument('--db', default=None)
+    parser.add_argument('--no-prophet', action='store_true')
+    args = parser.parse_args()
+
+    if args.db:
+        series = database_series(args.db, args.days)
+    else:
+        rng = np.random.default_rng(7)
+        series = [synthetic_series(rng, args.days) for _ in range(args.series)]
+    methods = list(FORECASTERS) + ([] if args.no_prophet else ['prophet'])
+    scores = backtest(series, methods, args.test_weeks)
+
+    print(f"{len(series)} series, last {args.test_weeks} weeks, 7-day horizon")
+    print(f"{'method':<16} {'fit ms':>9} {'MAE':>6} {'MAPE %':>7} {'80% cover':>10}")
+    for method, result in scores.items():
+        errors = np.concatenate(result['errors'])
+        actual = np.concatenate(result['actual'])
+        nonzero = actual > 0
+        print(f"{method:<16} {np.mean(result['fit_seconds']) * 1000:>9.2f} {np.mean(np.abs(errors)):>6.2f} "
+              f"{np.mean(np.abs(errors[nonzero]) / actual[nonzero]) * 100:>7.2f} "
+              f"{np.mean(np.concatenate(result['covered'])) * 100:>9.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Reader/writer lock contention on the attendance database
+One writer commits RFID scans one at a time at a fixed rate (as the
+listener does) while dashboard readers poll aggregate queries; compares SQLite's default rollback
+journal against the database.py profile (WAL, synchronous=NORMAL, mmap, ...)
+
+Usage:
+    python benchmarks/bench_lock_contention.py [--readers 4] [--rate 200] [--seconds 5] [--rows 200000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+
+from database import apply_pragmas, connect
+
+SCHEMA = [
+    "CREATE TABLE rfid_scan_logs (id INTEGER PRIMARY KEY, rfid_tag TEXT NOT NULL, scan_time TEXT NOT NULL, "
+    "student_id INTEGER, status TEXT NOT NULL)",
+    "CREATE INDEX ix_rfid_scan_logs_scan_time ON rfid_scan_logs (scan_time)",
+]
+
+DASHBOARD_QUERY = "SELECT status, COUNT(*) FROM rfid_scan_logs WHERE scan_time >= ? GROUP BY status"
+
+
+def seed(path, rows):
+    conn = sqlite3.connect(path)
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+    conn.executemany(
+        "INSERT INTO rfid_scan_logs (rfid_tag, scan_time, student_id, status) VALUES (?, ?, ?, ?)",
+        ((f"TAG{i % 2000:05d}", f"2025-01-06 09:{i // 6000 % 60:02d}:{i // 100 % 60:02d}", i % 2000,
+          'success' if i % 7 else 'already_marked') for i in range(rows))
+    )
+    conn.commit()
+    conn.close()
+
+
+def open_conn(path, tuned):
+    if tuned:
+        return connect(path, check_same_thread=False)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    apply_pragmas(conn, [('journal_mode', 'DELETE')])
+    return conn
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+
+def run(path, tuned, readers, rate, seconds):
+    stop = threading.Event()
+    reads, writes, errors = [], [], []
+
+    def reader():
+        conn = open_conn(path, tuned)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                conn.execute(DASHBOARD_QUERY, ('2025-01-06 09:50:00',)).fetchall()
+                reads.append(time.perf_counter() - started)
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+        conn.close()
+
+    def writer():
+        conn = open_conn(path, tuned)
+        i = 0
+        began = time.perf_counter()
+        while not stop.is_set():
+            delay = began + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            started = time.perf_counter()
+            try:
+                conn.execute(
+                    "INSERT INTO rfid_scan_logs (rfid_tag, scan_time, student_id, status) VALUES (?, ?, ?, ?)",
+                    (f"TAG{i % 2000:05d}", '2025-01-06 10:00:00', i % 2000, 'success')
+                )
+                conn.commit()
+                writes.append(time.perf_counter() - started)
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                errors.append(str(e))
+            i += 1
+        conn.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return reads, writes, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=200.0, help='scans written per second')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'reads/s':>9} {'read p99':>9} {'writes/s':>9} {'write p99':>10} {'write max':>10} {'errors':>7}")
+    for tuned in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            seed(path, args.rows)
+            reads, writes, errors = run(path, tuned, args.readers, args.rate, args.seconds)
+        name = 'tuned' if tuned else 'default'
+        print(f"{name:<10} {len(reads) / args.seconds:>9.0f} {percentile(reads, 0.99):>7.1f}ms "
+              f"{len(writes) / args.seconds:>9.0f} {percentile(writes, 0.99):>8.1f}ms "
+              f"{percentile(writes, 1.0):>8.1f}ms {len(errors):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Event loop lag under RFID scan load
+Compares writing ingest batches inline on the event loop against the
+dedicated writer thread, using a throwaway SQLite database
+
+Usage:
+    python benchmarks/bench_loop_lag.py [--students 500] [--scans 5000] [--rate 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'hardware'))
+
+from flask import Flask
+
+from models import db, User, Class, Student
+from loop_lag import LoopLagMonitor
+from scan_ingest import ScanIngestQueue
+
+
+def build_app(path, students):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        teacher = User(username='admin', email='admin@attensync.com', full_name='Admin', role='admin')
+        teacher.set_password('admin123')
+        db.session.add(teacher)
+        db.session.flush()
+        cls = Class(name='Class 5A', grade_level=5, section='A', teacher_id=teacher.id, academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        for i in range(students):
+            db.session.add(Student(
+                roll_number=f"B{i:05d}", full_name=f"Student {i}", class_id=cls.id,
+                date_of_birth=date(2012, 1, 1), gender='Male', rfid_tag=f"TAG{i:05d}"
+            ))
+        db.session.commit()
+    return app
+
+
+async def run(app, offload, students, scans, rate):
+    ingest = ScanIngestQueue(app, offload_writes=offload)
+    monitor = LoopLagMonitor(interval=0.005)
+    await ingest.start()
+    monitor.start()
+
+    started = time.perf_counter()
+    for i in range(scans):
+        # Pace submissions like notifications arriving from readers
+        target = started + i / rate
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await ingest.submit(f"TAG{i % students:05d}")
+    await ingest.stop()
+    elapsed = time.perf_counter() - started
+    await monitor.stop()
+    return monitor.stats(), ingest.stats(), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--scans', type=int, default=5000)
+    parser.add_argument('--rate', type=float, default=2000.0, help='scans per second')
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'batches':>8} {'seconds':>8}")
+    for offload in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = build_app(os.path.join(tmp, 'bench.db'), args.students)
+            lag, ingest, elapsed = asyncio.run(run(app, offload, args.students, args.scans, args.rate))
+        mode = 'offload' if offload else 'inline'
+        print(f"{mode:<10} {lag['p50_ms']:>8} {lag['p99_ms']:>8} {lag['max_ms']:>8} "
+              f"{ingest['batches']:>8} {elapsed:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
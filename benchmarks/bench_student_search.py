@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Per-keystroke student search latency on a large roster
+Types a few names one character at a time and times every prefix against
+the old LIKE '%term%' filter of /api/students and the students_fts trigram
+search (including a typo)
+
+Usage:
+    python benchmarks/bench_student_search.py [--students 50000] [--repeat 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'backend'))
+
+from flask import Flask
+
+from migrations import run_migrations
+from models import db, User, Class, Student
+from student_search import search_students
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan',
+               'Ananya', 'Diya', 'Priya', 'Saanvi', 'Aadhya', 'Kavya', 'Meera', 'Riya', 'Pooja', 'Neha']
+LAST_NAMES = ['Sharma', 'Verma', 'Patel', 'Gupta', 'Singh', 'Kumar', 'Reddy', 'Nair', 'Iyer', 'Joshi',
+              'Mehta', 'Chopra', 'Malhotra', 'Bose', 'Das', 'Mishra', 'Pandey', 'Yadav', 'Rao', 'Kapoor']
+TYPED = ['Kavya Malhotra', 'TAG012345', 'Reyansh Chpora']
+
+
+def build_app(path, students):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        teacher = User(username='admin', email='admin@attensync.com', full_name='Admin', role='admin')
+        teacher.set_password('admin123')
+        db.session.add(teacher)
+        db.session.flush()
+        classes = []
+        for i in range(max(1, students // 40)):
+            cls = Class(name=f'Class {i}', grade_level=5, section='A', teacher_id=teacher.id, academic_year='2024-25')
+            db.session.add(cls)
+            classes.append(cls)
+        db.session.flush()
+        db.session.bulk_insert_mappings(Student, [
+            {'roll_number': f"R{i:06d}", 'rfid_tag': f"TAG{i:06d}", 'class_id': classes[i % len(classes)].id,
+             'full_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", 'enrollment_date': date.today()}
+            for i in range(students)
+        ])
+        db.session.commit()
+        # Migration 6 builds students_fts from the rows already present
+        run_migrations(db.engine)
+    return app
+
+
+def like_search(term):
+    """The filter /api/students used before students_fts (first page of 50)"""
+    return [student.id for student in Student.query.filter_by(is_active=True).filter(
+        db.or_(
+            Student.full_name.contains(term),
+            Student.roll_number.contains(term),
+            Student.rfid_tag.contains(term)
+        )
+    ).order_by(Student.roll_number).limit(50)]
+
+
+def measure(app, search, repeat):
+    """p50 and p99 milliseconds over every prefix of every typed name"""
+    timings = []
+    with app.app_context():
+        for _ in range(repeat):
+            for typed in TYPED:
+                for end in range(1, len(typed) + 1):
+                    started = time.perf_counter()
+                    search(typed[:end])
+                    timings.append(time.perf_counter() - started)
+            db.session.remove()
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        app = build_app(os.path.join(tmp, 'bench.db'), args.students)
+        print(f"Seeded {args.students} students and built the index in {time.perf_counter() - started:.1f}s")
+
+        with app.app_context():
+            for typed in TYPED:
+                top = search_students(db.session, typed, limit=3)
+                print(f"  {typed!r} -> {[db.session.get(Student, i).full_name for i in top]}")
+
+        print(f"{'search':<10} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, search in [('like', like_search), ('trigram', lambda term: search_students(db.session, term))]:
+            p50, p99 = measure(app, search, args.repeat)
+            print(f"{name:<10} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,8 +11,17 @@ import os
 from datetime import datetime, date
 import pandas as pd
 from model import generate_forecast
+from roster_cache import RosterCache
+from presence import PresenceBitmap
+from migrations import run_migrations
+from attendance_store import upsert_attendance
+from student_search import search_students
+from fast_forecast import FORECASTERS, FastForecastModel
+from forecast_eval import latest_scores, prediction_accuracy
+from database import engine_options, resolve_db_path, sqlite_uri
 import json
 import sqlite3
+from sqlalchemy import event
 
 # Initialize Flask app
 app = Flask(__name__, static_url_path='', static_folder='static')
@@ -35,7 +44,8 @@ instance_path = os.path.join(basedir, 'instance')
 if not os.path.exists(instance_path):
     os.makedirs(instance_path)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(instance_path, 'attendance_system.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = sqlite_uri(resolve_db_path(os.path.join(instance_path, 'attendance_system.db')))
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db = SQLAlchemy(app)
 
@@ -140,12 +150,30 @@ class AttendanceSession(db.Model):
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+# One row per class and day; class_id 0 is the whole-school forecast (migration 7)
 class AttendanceForecast(db.Model):
     __tablename__ = 'attendance_forecast'
     id = db.Column(db.Integer, primary_key=True)
-    forecast_date = db.Column(db.Date, unique=True, nullable=False)
+    class_id = db.Column(db.Integer, nullable=False, default=0)
+    forecast_date = db.Column(db.Date, nullable=False)
     predicted_present = db.Column(db.Integer, nullable=False)
+    predicted_rate = db.Column(db.Float)
+    # Head-count bounds of the forecast interval, stored so readers never recompute them
+    yhat_lower = db.Column(db.Float)
+    yhat_upper = db.Column(db.Float)
+    model_version = db.Column(db.String(40))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('class_id', 'forecast_date'),)
+
+# Per-day, per-class counts maintained by triggers on attendance (migration 4)
+class DailyAttendanceSummary(db.Model):
+    __tablename__ = 'daily_attendance_summary'
+    attendance_date = db.Column(db.Date, primary_key=True)
+    class_id = db.Column(db.Integer, primary_key=True)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    absent_count = db.Column(db.Integer, nullable=False, default=0)
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
 
 class RFIDScanLog(db.Model):
     __tablename__ = 'rfid_scan_log'
@@ -154,6 +182,26 @@ class RFIDScanLog(db.Model):
     student_name = db.Column(db.String(100), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False)
 
+# Tag/name -> student index and today's presence bitmap used by the RFID scan endpoints
+student_roster = RosterCache(Student)
+attendance_presence = PresenceBitmap(Attendance)
+
+# app.py has no student routes; the scripts that import it write students through
+# db.session, so a committed student change drops the roster
+@event.listens_for(db.session, 'after_flush')
+def _note_student_writes(session, flush_context):
+    if any(isinstance(obj, Student) for objs in (session.new, session.dirty, session.deleted) for obj in objs):
+        session.info['roster_stale'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_student_roster(session):
+    if session.info.pop('roster_stale', False):
+        student_roster.invalidate()
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_student_writes(session):
+    session.info.pop('roster_stale', None)
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -284,19 +332,19 @@ def get_dashboard_data():
     
     # Get class statistics
     total_students = Student.query.filter_by(is_active=True).count()
-    present_today = Attendance.query.filter_by(
-        attendance_date=today,
-        status='present'
-    ).count()
+    present_today = db.session.query(
+        db.func.coalesce(db.func.sum(DailyAttendanceSummary.present_count), 0)
+    ).filter(DailyAttendanceSummary.attendance_date == today).scalar()
     
-    # Calculate weekly attendance
+    # Calculate weekly attendance from the per-day summary
     weekly_data = db.session.query(
-        Attendance.attendance_date,
-        db.func.count().label('count')
+        DailyAttendanceSummary.attendance_date,
+        db.func.sum(DailyAttendanceSummary.present_count).label('count')
     ).filter(
-        Attendance.status == 'present',
-        Attendance.attendance_date >= date.today() - pd.Timedelta(days=7)
-    ).group_by(Attendance.attendance_date).all()
+        DailyAttendanceSummary.attendance_date >= date.today() - pd.Timedelta(days=7)
+    ).group_by(DailyAttendanceSummary.attendance_date).having(
+        db.func.sum(DailyAttendanceSummary.present_count) > 0
+    ).all()
     
     # Get recent activity
     recent_activity = AttendanceSession.query.order_by(
@@ -364,9 +412,11 @@ def get_today_attendance():
     """Get all RFID attendance for today"""
     today = date.today().strftime('%Y-%m-%d')
     
-    # Get today's RFID attendance records with student information
-    records = db.session.query(Attendance, Student).join(
+    # Get today's RFID attendance records with student and class information in one query
+    records = db.session.query(Attendance, Student, Class.class_name).join(
         Student, Attendance.student_id == Student.id
+    ).outerjoin(
+        Class, Student.class_id == Class.id
     ).filter(
         Attendance.attendance_date == date.today(),
         Attendance.method == 'rfid'
@@ -374,7 +424,7 @@ def get_today_attendance():
     
     # Format response
     attendance_data = []
-    for attendance, student in records:
+    for attendance, student, class_name in records:
         attendance_data.append({
             'student_id': student.id,
             'student_name': student.full_name,
@@ -383,7 +433,7 @@ def get_today_attendance():
             'status': attendance.status,
             'time_marked': attendance.time_marked.isoformat() if attendance.time_marked else None,
             'method': attendance.method,
-            'class_name': student.class_info.name if student.class_info else 'Unknown'
+            'class_name': class_name or 'Unknown'
         })
     
     return jsonify({
@@ -405,27 +455,23 @@ def mark_attendance():
     
     attendance_date = datetime.strptime(date_str, '%Y-%m-%d').date()
     
-    # Update or create attendance record
-    attendance = Attendance.query.filter_by(
-        student_id=student_id,
-        attendance_date=attendance_date
-    ).first()
+    student = Student.query.get(student_id)
+    if student is None:
+        return jsonify({'success': False, 'message': f'Student not found: {student_id}'}), 404
     
-    if attendance:
-        attendance.status = status
-    else:
-        student = Student.query.get(student_id)
-        attendance = Attendance(
-            student_id=student_id,
-            class_id=student.class_id,
-            teacher_id=current_user.id,
-            attendance_date=attendance_date,
-            status=status,
-            method='manual'
-        )
-        db.session.add(attendance)
+    # Update or create attendance record in one statement
+    upsert_attendance(db.session, [{
+        'student_id': student.id,
+        'class_id': student.class_id,
+        'teacher_id': current_user.id,
+        'attendance_date': attendance_date,
+        'status': status,
+        'method': 'manual'
+    }])
     
     db.session.commit()
+    # A student marked absent by hand must not have a later tap skipped as a repeat
+    attendance_presence.record(student.id, attendance_date, status)
     return jsonify({'success': True, 'message': 'Attendance marked successfully'})
 
 @app.route('/upload_attendance', methods=['POST'])
@@ -483,9 +529,13 @@ def get_students():
     if class_id and class_id != 'all':
         query = query.filter_by(class_id=class_id)
     if search_term:
-        query = query.filter(Student.full_name.ilike(f'%{search_term}%'))
-    
-    students = query.all()
+        # Ranked matches from the students_fts trigram index instead of a LIKE scan
+        ranked_ids = search_students(db.session, search_term, active_only=False,
+                                     class_id=int(class_id) if class_id and class_id.isdigit() else None)
+        found = {student.id: student for student in query.filter(Student.id.in_(ranked_ids))}
+        students = [found[student_id] for student_id in ranked_ids if student_id in found]
+    else:
+        students = query.all()
     return jsonify([{
         'id': student.id,
         'student_id': student.student_id,
@@ -524,13 +574,15 @@ def generate_attendance_trends():
     current_trend = calculate_current_trend()
     best_day = find_best_attendance_day()
     seasonal_peak = analyze_seasonal_patterns()
-    accuracy = calculate_prediction_accuracy()
+    scores = latest_scores(db.session.connection().connection)
+    accuracy = calculate_prediction_accuracy(scores)
     
     return {
         'current_trend': current_trend,
         'best_day': best_day,
         'seasonal_peak': seasonal_peak,
-        'accuracy': accuracy
+        'accuracy': accuracy,
+        'forecast_scores': scores
     }
 
 def calculate_current_trend():
@@ -538,12 +590,13 @@ def calculate_current_trend():
     thirty_days_ago = date.today() - pd.Timedelta(days=30)
     attendance_data = pd.DataFrame(
         db.session.query(
-            Attendance.attendance_date,
-            db.func.count().label('count')
+            DailyAttendanceSummary.attendance_date,
+            db.func.sum(DailyAttendanceSummary.present_count).label('count')
         ).filter(
-            Attendance.status == 'present',
-            Attendance.attendance_date >= thirty_days_ago
-        ).group_by(Attendance.attendance_date).all()
+            DailyAttendanceSummary.attendance_date >= thirty_days_ago
+        ).group_by(DailyAttendanceSummary.attendance_date).having(
+            db.func.sum(DailyAttendanceSummary.present_count) > 0
+        ).order_by(DailyAttendanceSummary.attendance_date).all()
     )
     
     if len(attendance_data) > 0:
@@ -557,34 +610,35 @@ def calculate_current_trend():
     return None
 
 def find_best_attendance_day():
-    # Find the day with highest average attendance
+    # Find the weekday with the most students present (from the per-day summary, not the attendance rows)
     attendance_by_day = pd.DataFrame(
         db.session.query(
-            db.func.dayofweek(Attendance.attendance_date).label('day'),
-            db.func.count().label('count')
-        ).filter(
-            Attendance.status == 'present'
+            db.func.strftime('%w', DailyAttendanceSummary.attendance_date).label('day'),
+            db.func.sum(DailyAttendanceSummary.present_count).label('count')
         ).group_by(
-            db.func.dayofweek(Attendance.attendance_date)
+            db.func.strftime('%w', DailyAttendanceSummary.attendance_date)
+        ).having(
+            db.func.sum(DailyAttendanceSummary.present_count) > 0
         ).all()
     )
     
     if len(attendance_by_day) > 0:
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        # SQLite's %w counts from Sunday = 0
+        days = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
         best_day_index = attendance_by_day['count'].argmax()
-        return days[attendance_by_day['day'].iloc[best_day_index] - 1]
+        return days[int(attendance_by_day['day'].iloc[best_day_index])]
     return None
 
 def analyze_seasonal_patterns():
-    # Analyze attendance patterns by season
+    # Analyze attendance patterns by season (from the per-day summary, not the attendance rows)
     attendance_by_month = pd.DataFrame(
         db.session.query(
-            db.func.month(Attendance.attendance_date).label('month'),
-            db.func.count().label('count')
-        ).filter(
-            Attendance.status == 'present'
+            db.func.strftime('%m', DailyAttendanceSummary.attendance_date).label('month'),
+            db.func.sum(DailyAttendanceSummary.present_count).label('count')
         ).group_by(
-            db.func.month(Attendance.attendance_date)
+            db.func.strftime('%m', DailyAttendanceSummary.attendance_date)
+        ).having(
+            db.func.sum(DailyAttendanceSummary.present_count) > 0
         ).all()
     )
     
@@ -595,16 +649,22 @@ def analyze_seasonal_patterns():
             'Summer': [6, 7, 8],
             'Fall': [9, 10, 11]
         }
-        month = attendance_by_month['month'].iloc[attendance_by_month['count'].argmax()]
+        month = int(attendance_by_month['month'].iloc[attendance_by_month['count'].argmax()])
         for season, months in seasons.items():
             if month in months:
                 return season
     return None
 
-def calculate_prediction_accuracy():
-    # Here you would compare predicted vs actual attendance
-    # This is a placeholder that could be improved with actual model validation
-    return 87.3
+def calculate_prediction_accuracy(scores=None):
+    # 100 - MAPE of the whole-school forecast from the last forecast_eval run (None before the first run)
+    if scores is None:
+        scores = latest_scores(db.session.connection().connection)
+    return prediction_accuracy(scores)
+
+@app.route('/api/trends')
+def get_trends():
+    # Forecast scores come precomputed from forecast_accuracy; nothing is fitted here
+    return jsonify(generate_attendance_trends())
 
 @app.route('/api/health')
 def health_check():
@@ -615,14 +675,35 @@ def health_check():
 
 @app.route('/api/forecast')
 def get_forecast():
-    forecasts = AttendanceForecast.query.order_by(AttendanceForecast.forecast_date).all()
+    # Whole-school forecast unless ?class_id= asks for one class
+    class_id = request.args.get('class_id', 0, type=int)
+    forecasts = AttendanceForecast.query.filter_by(class_id=class_id).order_by(AttendanceForecast.forecast_date).all()
     return jsonify([
         {
             'date': f.forecast_date.strftime('%Y-%m-%d'),
-            'predicted_present': f.predicted_present
+            'predicted_present': f.predicted_present,
+            'predicted_rate': f.predicted_rate,
+            'lower_bound': f.yhat_lower,
+            'upper_bound': f.yhat_upper,
+            'model_version': f.model_version
         } for f in forecasts
     ])
 
+@app.route('/api/forecast/quick')
+def get_quick_forecast():
+    # NumPy forecaster for the dashboard's next-days card: fitted on request in milliseconds
+    class_id = request.args.get('class_id', type=int)
+    periods = min(request.args.get('periods', 7, type=int), 60)
+    if periods < 1:
+        return jsonify({'error': 'periods must be at least 1'}), 400
+    method = request.args.get('method', 'ets')
+    if method not in FORECASTERS:
+        return jsonify({'error': f"method must be one of {', '.join(FORECASTERS)}"}), 400
+    forecast = FastForecastModel(method=method).generate_forecast(periods=periods, class_id=class_id)
+    if not forecast:
+        return jsonify({'error': 'Not enough attendance data to forecast'}), 404
+    return jsonify(forecast)
+
 @app.route('/api/trigger_forecast', methods=['POST'])
 def trigger_forecast():
     from model import generate_forecast_from_db
@@ -640,19 +721,22 @@ def get_rfid_scans():
     try:
         limit = int(request.args.get('limit', 10))
         
-        # Simple query to get attendance records with RFID method
-        records = Attendance.query.filter(
+        # RFID attendance records with the student's tag and name joined in (one query)
+        records = db.session.query(
+            Attendance.id, Attendance.status, Attendance.time_marked, Attendance.attendance_date,
+            Student.rfid_tag, Student.full_name
+        ).outerjoin(
+            Student, Attendance.student_id == Student.id
+        ).filter(
             Attendance.method == 'rfid'
         ).order_by(Attendance.time_marked.desc()).limit(limit).all()
         
         scan_data = []
         for record in records:
-            # Get student info
-            student = Student.query.get(record.student_id)
             scan_data.append({
                 'id': record.id,
-                'rfid_tag': student.rfid_tag if student else 'Unknown',
-                'student_name': student.full_name if student else 'Unknown Student',
+                'rfid_tag': record.rfid_tag or 'Unknown',
+                'student_name': record.full_name or 'Unknown Student',
                 'status': record.status,
                 'timestamp': record.time_marked.strftime('%Y-%m-%d %H:%M:%S') if record.time_marked else 'N/A',
                 'date': record.attendance_date.strftime('%Y-%m-%d') if record.attendance_date else 'N/A'
@@ -675,32 +759,24 @@ def log_rfid_scan(tag, student_name):
     db.session.add(scan)
     
     # Mark attendance for the student
-    student = Student.query.filter_by(full_name=student_name).first()
-    if student:
-        # Check if attendance already exists for today
-        existing_attendance = Attendance.query.filter_by(
-            student_id=student.id,
-            attendance_date=today
-        ).first()
-        
-        if existing_attendance:
-            existing_attendance.status = 'present'
-            existing_attendance.method = 'rfid'
-            existing_attendance.time_marked = datetime.now()  # Update timestamp for when attendance was last modified
-        else:
-            # Create new attendance record
-            attendance = Attendance(
-                student_id=student.id,
-                class_id=student.class_id,
-                teacher_id=1,  # Using admin user as default
-                attendance_date=today,
-                status='present',
-                method='rfid'
-            )
-            db.session.add(attendance)
+    student = student_roster.resolve_name(student_name)
+    if student and attendance_presence.is_marked(student.student_id, today):
+        # Repeat tap: only the scan log is written, the attendance row is left alone
+        pass
+    elif student:
+        upsert_attendance(db.session, [{
+            'student_id': student.student_id,
+            'class_id': student.class_id,
+            'teacher_id': 1,  # Using admin user as default
+            'attendance_date': today,
+            'status': 'present',
+            'method': 'rfid'
+        }])
     
     # Commit changes immediately to ensure real-time updates
     db.session.commit()
+    if student:
+        attendance_presence.mark(student.student_id, today)
 
 # Example API endpoint to trigger scan logging
 @app.route('/api/scan_rfid', methods=['POST'])
@@ -712,7 +788,7 @@ def scan_rfid():
         return jsonify({'success': False, 'message': 'Tag and student_name required'}), 400
     
     # Check if student exists before proceeding
-    student = Student.query.filter_by(full_name=student_name).first()
+    student = student_roster.resolve_name(student_name)
     if not student:
         return jsonify({
             'success': False,
@@ -741,13 +817,13 @@ def scan_rfid():
     # Add attendance details
     today = date.today()
     attendance = Attendance.query.filter_by(
-        student_id=student.id,
+        student_id=student.student_id,
         attendance_date=today
     ).first()
     
     if attendance:
         response['attendance'] = {
-            'student_id': student.id,
+            'student_id': student.student_id,
             'status': attendance.status,
             'method': attendance.method,
             'date': today.strftime('%Y-%m-%d'),
@@ -771,6 +847,7 @@ def init_db():
         try:
             print("Creating database tables...")
             db.create_all()
+            run_migrations(db.engine)
             print("Database tables created successfully")
 
             print("Checking for admin user...")
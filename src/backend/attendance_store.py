@@ -0,0 +1,133 @@
+"""
+Single-statement attendance writes
+INSERT ... ON CONFLICT(student_id, attendance_date) DO UPDATE ... RETURNING
+replaces the select-then-modify pattern, so marking attendance is one round
+trip and two concurrent writers can no longer create duplicate rows.
+RETURNING needs SQLite 3.35; older builds read the written rows back with a
+second SELECT in the same transaction.
+"""
+import sqlite3
+from collections import namedtuple
+from datetime import date, datetime
+
+# Rows per statement; 11 bound values each keeps us well under SQLite's variable limit
+UPSERT_CHUNK = 500
+
+RETURNING_SUPPORTED = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+UpsertedRow = namedtuple('UpsertedRow', ['id', 'student_id', 'attendance_date', 'status', 'created'])
+UpsertResult = namedtuple('UpsertResult', ['created', 'updated', 'rows'])
+
+COLUMNS = ('student_id', 'class_id', 'teacher_id', 'attendance_date', 'time_marked',
+           'status', 'method', 'notes', 'confidence_score', 'created_at', 'updated_at')
+
+ON_CONFLICT = {
+    # notes is only overwritten when the caller supplies it
+    'update': """
+        ON CONFLICT(student_id, attendance_date) DO UPDATE SET
+            status = excluded.status,
+            method = excluded.method,
+            teacher_id = excluded.teacher_id,
+            notes = COALESCE(excluded.notes, attendance.notes),
+            time_marked = excluded.time_marked,
+            updated_at = excluded.updated_at
+    """,
+    # First write wins (RFID taps must not overwrite a manual mark)
+    'ignore': "ON CONFLICT(student_id, attendance_date) DO NOTHING"
+}
+
+
+def _sql_date(value):
+    if isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _sql_datetime(value):
+    # Same text format SQLAlchemy uses for DateTime columns on SQLite
+    if isinstance(value, str):
+        return value
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+
+def _read_back(connection, chunk, token):
+    # Pre-3.35 stand-in for RETURNING: every row the statement inserted or
+    # updated carries its updated_at token, rows it ignored do not
+    keys = ', '.join(['(?, ?)'] * len(chunk))
+    params = [token, token]
+    for row in chunk:
+        params.extend((row['student_id'], _sql_date(row['attendance_date'])))
+    return connection.exec_driver_sql(
+        f"SELECT id, student_id, attendance_date, status, created_at = ? FROM attendance "
+        f"WHERE updated_at = ? AND (student_id, attendance_date) IN (VALUES {keys})",
+        tuple(params)
+    ).fetchall()
+
+
+def upsert_attendance(session, rows, on_conflict='update'):
+    """
+    Create or update attendance rows, one statement per UPSERT_CHUNK rows
+
+    Args:
+        session: SQLAlchemy session (models.db.session or app.db.session); the
+            caller commits
+        rows (list[dict]): student_id, class_id, teacher_id, attendance_date,
+            status and method; optional notes and time_marked. A later row for
+            the same (student_id, attendance_date) replaces an earlier one.
+        on_conflict (str): 'update' to overwrite an existing row for the day,
+            'ignore' to keep it (the row is then left out of the result)
+
+    Returns:
+        UpsertResult: created/updated counts and one UpsertedRow per written row
+    """
+    clause = ON_CONFLICT[on_conflict]
+    now = datetime.utcnow()
+    # created_at is only written on insert, so a row coming back with this
+    # statement's token was created by it; anything else was updated
+    token = _sql_datetime(now)
+
+    latest = {}
+    for row in rows:
+        latest[(row['student_id'], _sql_date(row['attendance_date']))] = row
+
+    # Positional parameters through exec_driver_sql: compiling a text() clause
+    # with thousands of named binds costs more than the insert itself
+    placeholders = '(' + ', '.join('?' * len(COLUMNS)) + ')'
+    connection = session.connection()
+    written = []
+    items = list(latest.values())
+    for start in range(0, len(items), UPSERT_CHUNK):
+        chunk = items[start:start + UPSERT_CHUNK]
+        params = []
+        for row in chunk:
+            params.extend((
+                row['student_id'],
+                row['class_id'],
+                row['teacher_id'],
+                _sql_date(row['attendance_date']),
+                _sql_datetime(row.get('time_marked') or now),
+                row.get('status', 'present'),
+                row.get('method', 'manual'),
+                row.get('notes'),
+                row.get('confidence_score', 1.0),
+                token,
+                token
+            ))
+
+        statement = (f"INSERT INTO attendance ({', '.join(COLUMNS)}) "
+                     f"VALUES {', '.join([placeholders] * len(chunk))} {clause}")
+        if RETURNING_SUPPORTED:
+            fetched = connection.exec_driver_sql(
+                f"{statement} RETURNING id, student_id, attendance_date, status, created_at = ?",
+                tuple(params) + (token,)
+            ).fetchall()
+        else:
+            connection.exec_driver_sql(statement, tuple(params))
+            fetched = _read_back(connection, chunk, token)
+        written.extend(
+            UpsertedRow(row[0], row[1], date.fromisoformat(row[2]), row[3], bool(row[4]))
+            for row in fetched
+        )
+
+    created = sum(1 for row in written if row.created)
+    return UpsertResult(created, len(written) - created, written)
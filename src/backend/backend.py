@@ -2,10 +2,19 @@
 Fresh Flask backend for AttenSync
 Clean API implementation with proper database connections
 """
-from flask import Flask, request, jsonify, send_from_directory, session
+from flask import Flask, Response, request, jsonify, send_from_directory, session
 from flask_cors import CORS
+from sqlalchemy.orm import joinedload
 from flask_login import LoginManager, login_user, logout_user, current_user, login_required
-from models import db, User, Class, Student, Attendance, RFIDScanLog, init_database, get_db_stats
+from models import db, User, Class, Student, Attendance, DailyAttendanceSummary, RFIDScanLog, init_database, get_db_stats
+from roster_cache import roster_cache
+from attendance_store import upsert_attendance
+from presence import presence_bitmap
+from database import engine_options, get_pool, resolve_db_path, sqlite_uri
+from scan_events import ScanBroadcaster, ScanLogTailer, stream_scans
+from dashboard import dashboard_cache, load_dashboard_snapshot
+from pagination import keyset_page, parse_page_args, table_row_estimate
+from student_search import search_students
 from datetime import datetime, date, timedelta
 import os
 import json
@@ -18,16 +27,17 @@ app = Flask(__name__, static_folder='static')
 # Configuration
 app.config['SECRET_KEY'] = 'attensync-secret-key-2024'  # Change in production
 
-# Use absolute path for database
-basedir = os.path.abspath(os.path.dirname(__file__))
-instance_path = os.path.join(basedir, 'instance')
-os.makedirs(instance_path, exist_ok=True)
-db_path = os.path.join(instance_path, 'attendance_system.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+# Database path and connection profile come from database.py (ATTENSYNC_DB_PATH overrides)
+db_path = resolve_db_path()
+app.config['SQLALCHEMY_DATABASE_URI'] = sqlite_uri(db_path)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+ATTENDANCE_STATUSES = ('present', 'absent', 'late')
+BULK_LOOKUP_CHUNK = 900  # ids per IN query, below SQLite's default variable limit
+
 # Enable CORS for all routes
 CORS(app, resources={
     r"/api/*": {
@@ -129,39 +139,74 @@ def get_current_user():
 
 @app.route('/api/students', methods=['GET'])
 def get_students():
-    """Get all students with optional filtering"""
+    """
+    Get students with optional filtering, ordered by roll number
+
+    Pages are keyset-paginated: pass the previous response's next_cursor as
+    ?cursor=. ?total=exact|approx adds a total. ?page= keeps the old offset
+    pagination for existing clients. With ?search= the response is the best
+    per_page matches, ranked, on a single page.
+    """
     try:
         class_id = request.args.get('class_id', type=int)
         search = request.args.get('search', '')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
+        paging = parse_page_args(request.args, default_per_page=50)
         
-        query = Student.query.filter_by(is_active=True)
+        query = Student.query.options(joinedload(Student.class_info)).filter_by(is_active=True)
         
         if class_id:
             query = query.filter_by(class_id=class_id)
         
         if search:
-            query = query.filter(
-                db.or_(
-                    Student.full_name.contains(search),
-                    Student.roll_number.contains(search),
-                    Student.rfid_tag.contains(search)
-                )
+            # Ranked ids from the trigram index, then the rows themselves in one query
+            ranked_ids = search_students(db.session, search, limit=paging['per_page'], class_id=class_id)
+            found = {student.id: student for student in query.filter(Student.id.in_(ranked_ids))}
+            students = [found[student_id] for student_id in ranked_ids if student_id in found]
+            percentages = Student.attendance_percentages(list(found))
+            return jsonify({
+                'students': [student.to_dict(percentages[student.id]) for student in students],
+                'next_cursor': None,
+                'total': len(students),
+                'per_page': paging['per_page']
+            })
+        
+        if 'page' in request.args and not paging['cursor']:
+            # Offset pagination: COUNT(*) plus an OFFSET scan, slower the deeper the page
+            page = request.args.get('page', 1, type=int)
+            students = query.order_by(Student.roll_number, Student.id).paginate(
+                page=page, per_page=paging['per_page'], error_out=False
             )
+            percentages = Student.attendance_percentages([student.id for student in students.items])
+            return jsonify({
+                'students': [student.to_dict(percentages[student.id]) for student in students.items],
+                'total': students.total,
+                'pages': students.pages,
+                'current_page': page,
+                'per_page': paging['per_page']
+            })
         
-        students = query.order_by(Student.roll_number).paginate(
-            page=page, per_page=per_page, error_out=False
+        students, next_cursor = keyset_page(
+            query, [Student.roll_number, Student.id], paging['cursor'], paging['per_page']
         )
-        
-        return jsonify({
-            'students': [student.to_dict() for student in students.items],
-            'total': students.total,
-            'pages': students.pages,
-            'current_page': page,
-            'per_page': per_page
-        })
-        
+        percentages = Student.attendance_percentages([student.id for student in students])
+        response = {
+            'students': [student.to_dict(percentages[student.id]) for student in students],
+            'next_cursor': next_cursor,
+            'per_page': paging['per_page']
+        }
+        
+        if paging['total'] == 'approx' and not class_id and not search:
+            # Row count from the last ANALYZE (includes inactive students)
+            estimate = table_row_estimate(db.session, Student.__tablename__)
+            if estimate is not None:
+                response.update({'total': estimate, 'total_is_estimate': True})
+        if paging['total'] and 'total' not in response:
+            response.update({'total': query.order_by(None).count(), 'total_is_estimate': False})
+        
+        return jsonify(response)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -206,6 +251,8 @@ def create_student():
         
         db.session.add(student)
         db.session.commit()
+        roster_cache.invalidate()
+        dashboard_cache.invalidate()
         
         return jsonify({
             'message': 'Student created successfully',
@@ -269,6 +316,9 @@ def update_student(student_id):
             student.address = data['address']
         
         db.session.commit()
+        # The roster caches tag, name, class and the active flag: drop it on any update
+        roster_cache.invalidate()
+        dashboard_cache.invalidate()
         
         return jsonify({
             'message': 'Student updated successfully',
@@ -286,6 +336,8 @@ def delete_student(student_id):
         student = Student.query.get_or_404(student_id)
         student.is_active = False
         db.session.commit()
+        roster_cache.invalidate()
+        dashboard_cache.invalidate()
         
         return jsonify({'message': 'Student deleted successfully'})
         
@@ -297,17 +349,28 @@ def delete_student(student_id):
 
 @app.route('/api/attendance', methods=['GET'])
 def get_attendance():
-    """Get attendance records with filtering"""
+    """
+    Get attendance records with filtering, newest day first
+
+    Pages are keyset-paginated on (attendance_date, id): pass the previous
+    response's next_cursor as ?cursor=. ?total=exact|approx adds a total
+    (approx reads daily_attendance_summary). ?page= keeps the old offset
+    pagination for existing clients.
+    """
     try:
         class_id = request.args.get('class_id', type=int)
         student_id = request.args.get('student_id', type=int)
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         status = request.args.get('status')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 100, type=int)
+        paging = parse_page_args(request.args, default_per_page=100)
         
-        query = Attendance.query
+        # to_dict reads the student, class and teacher: join them instead of lazy-loading per row
+        query = Attendance.query.options(
+            joinedload(Attendance.student_info),
+            joinedload(Attendance.class_info),
+            joinedload(Attendance.marked_by)
+        )
         
         if class_id:
             query = query.filter_by(class_id=class_id)
@@ -316,22 +379,54 @@ def get_attendance():
         if status:
             query = query.filter_by(status=status)
         if start_date:
-            query = query.filter(Attendance.attendance_date >= datetime.strptime(start_date, '%Y-%m-%d').date())
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            query = query.filter(Attendance.attendance_date >= start_date)
         if end_date:
-            query = query.filter(Attendance.attendance_date <= datetime.strptime(end_date, '%Y-%m-%d').date())
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            query = query.filter(Attendance.attendance_date <= end_date)
+        
+        if 'page' in request.args and not paging['cursor']:
+            # Offset pagination: COUNT(*) plus an OFFSET scan, slower the deeper the page
+            page = request.args.get('page', 1, type=int)
+            attendance = query.order_by(Attendance.attendance_date.desc(), Attendance.id.desc()).paginate(
+                page=page, per_page=paging['per_page'], error_out=False
+            )
+            return jsonify({
+                'attendance': [record.to_dict() for record in attendance.items],
+                'total': attendance.total,
+                'pages': attendance.pages,
+                'current_page': page,
+                'per_page': paging['per_page']
+            })
         
-        attendance = query.order_by(Attendance.attendance_date.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        records, next_cursor = keyset_page(
+            query, [Attendance.attendance_date, Attendance.id], paging['cursor'], paging['per_page'],
+            descending=True
         )
-        
-        return jsonify({
-            'attendance': [record.to_dict() for record in attendance.items],
-            'total': attendance.total,
-            'pages': attendance.pages,
-            'current_page': page,
-            'per_page': per_page
-        })
-        
+        response = {
+            'attendance': [record.to_dict() for record in records],
+            'next_cursor': next_cursor,
+            'per_page': paging['per_page']
+        }
+        
+        if paging['total'] == 'approx' and not student_id and (not status or status in ATTENDANCE_STATUSES):
+            # The summary holds per-day, per-class counts for every filter except student
+            count_column = getattr(DailyAttendanceSummary, f'{status}_count' if status else 'total_count')
+            summary = db.session.query(db.func.coalesce(db.func.sum(count_column), 0))
+            if class_id:
+                summary = summary.filter(DailyAttendanceSummary.class_id == class_id)
+            if start_date:
+                summary = summary.filter(DailyAttendanceSummary.attendance_date >= start_date)
+            if end_date:
+                summary = summary.filter(DailyAttendanceSummary.attendance_date <= end_date)
+            response.update({'total': summary.scalar(), 'total_is_estimate': True})
+        if paging['total'] and 'total' not in response:
+            response.update({'total': query.order_by(None).count(), 'total_is_estimate': False})
+        
+        return jsonify(response)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -349,49 +444,32 @@ def mark_attendance():
         if not student_id:
             return jsonify({'error': 'student_id is required'}), 400
         
-        # Get student and validate
-        student = Student.query.get_or_404(student_id)
+        # Get student and validate (get_or_404 would be swallowed by the except below)
+        student = Student.query.get(student_id)
+        if student is None:
+            return jsonify({'error': f'Student {student_id} not found'}), 404
         attendance_date = datetime.strptime(attendance_date, '%Y-%m-%d').date()
         
-        # Check if attendance already exists for this date
-        existing = Attendance.query.filter_by(
-            student_id=student_id,
-            attendance_date=attendance_date
-        ).first()
+        # Create or update in one statement; RETURNING tells us which happened
+        result = upsert_attendance(db.session, [{
+            'student_id': student.id,
+            'class_id': student.class_id,
+            'teacher_id': getattr(current_user, 'id', 1),  # Default to admin if no user
+            'attendance_date': attendance_date,
+            'status': status,
+            'method': method,
+            'notes': notes
+        }])
+        db.session.commit()
+        dashboard_cache.invalidate()
+        row = result.rows[0]
+        presence_bitmap.record(row.student_id, row.attendance_date, row.status)
         
-        if existing:
-            # Update existing record
-            existing.status = status
-            existing.method = method
-            existing.notes = notes
-            existing.updated_at = datetime.utcnow()
-            existing.teacher_id = getattr(current_user, 'id', 1)  # Default to admin if no user
-            
-            db.session.commit()
-            
-            return jsonify({
-                'message': 'Attendance updated successfully',
-                'attendance': existing.to_dict()
-            })
-        else:
-            # Create new record
-            attendance = Attendance(
-                student_id=student_id,
-                class_id=student.class_id,
-                teacher_id=getattr(current_user, 'id', 1),  # Default to admin if no user
-                attendance_date=attendance_date,
-                status=status,
-                method=method,
-                notes=notes
-            )
-            
-            db.session.add(attendance)
-            db.session.commit()
-            
-            return jsonify({
-                'message': 'Attendance marked successfully',
-                'attendance': attendance.to_dict()
-            }), 201
+        # Re-read the row: clients rely on the full to_dict() shape (class, teacher, timestamps)
+        return jsonify({
+            'message': 'Attendance marked successfully' if row.created else 'Attendance updated successfully',
+            'attendance': Attendance.query.get(row.id).to_dict()
+        }), 201 if row.created else 200
         
     except Exception as e:
         db.session.rollback()
@@ -399,60 +477,96 @@ def mark_attendance():
 
 @app.route('/api/attendance/bulk', methods=['POST'])
 def bulk_mark_attendance():
-    """Mark attendance for multiple students"""
+    """
+    Mark attendance for many students at once (whole-class roll call)
+
+    Accepts either student_ids with one shared status, or a records (or
+    attendance) list of {student_id | studentId, status, date, notes} for
+    mixed statuses. Students are resolved with IN queries and all rows are
+    written with multi-row upserts, so the statement count no longer grows
+    with the class size.
+    """
     try:
         data = request.get_json()
-        student_ids = data.get('student_ids', [])
         status = data.get('status', 'present')
         attendance_date = data.get('date', date.today().isoformat())
         method = data.get('method', 'manual')
-        
-        if not student_ids:
-            return jsonify({'error': 'student_ids array is required'}), 400
-        
-        attendance_date = datetime.strptime(attendance_date, '%Y-%m-%d').date()
-        results = []
-        
-        for student_id in student_ids:
+        records = data.get('records') or data.get('attendance')
+        if not records:
+            records = [{'student_id': student_id} for student_id in data.get('student_ids', [])]
+        
+        if not records:
+            return jsonify({'error': 'student_ids or records array is required'}), 400
+        if not isinstance(records, list):
+            return jsonify({'error': 'records must be an array'}), 400
+        
+        default_date = datetime.strptime(attendance_date, '%Y-%m-%d').date()
+        teacher_id = getattr(current_user, 'id', 1)
+        
+        results = [None] * len(records)
+        wanted = {}
+        for index, record in enumerate(records):
+            if not isinstance(record, dict):
+                results[index] = {'student_id': None, 'status': 'error', 'message': 'Each record must be an object'}
+                continue
+            student_id = record.get('student_id', record.get('studentId'))
+            record_status = record.get('status', status)
             try:
-                student = Student.query.get(student_id)
-                if not student:
-                    results.append({'student_id': student_id, 'status': 'error', 'message': 'Student not found'})
-                    continue
-                
-                # Check if attendance already exists
-                existing = Attendance.query.filter_by(
-                    student_id=student_id,
-                    attendance_date=attendance_date
-                ).first()
-                
-                if existing:
-                    existing.status = status
-                    existing.method = method
-                    existing.updated_at = datetime.utcnow()
-                    existing.teacher_id = getattr(current_user, 'id', 1)
-                    results.append({'student_id': student_id, 'status': 'updated', 'attendance_id': existing.id})
-                else:
-                    attendance = Attendance(
-                        student_id=student_id,
-                        class_id=student.class_id,
-                        teacher_id=getattr(current_user, 'id', 1),
-                        attendance_date=attendance_date,
-                        status=status,
-                        method=method
-                    )
-                    db.session.add(attendance)
-                    db.session.flush()  # Get the ID without committing
-                    results.append({'student_id': student_id, 'status': 'created', 'attendance_id': attendance.id})
-                    
-            except Exception as e:
-                results.append({'student_id': student_id, 'status': 'error', 'message': str(e)})
+                key = int(student_id)
+                record_date = datetime.strptime(record['date'], '%Y-%m-%d').date() if record.get('date') else default_date
+            except (TypeError, ValueError):
+                results[index] = {'student_id': student_id, 'status': 'error', 'message': 'Invalid student_id or date'}
+                continue
+            if record_status not in ATTENDANCE_STATUSES:
+                results[index] = {'student_id': student_id, 'status': 'error', 'message': f'Invalid status: {record_status}'}
+                continue
+            wanted[index] = (key, student_id, record_date, record_status, record.get('notes'))
+        
+        # One IN query per chunk of ids, selecting only the columns the rows need
+        ids = sorted({key for key, *_ in wanted.values()})
+        class_ids = {}
+        for start in range(0, len(ids), BULK_LOOKUP_CHUNK):
+            class_ids.update(db.session.query(Student.id, Student.class_id).filter(
+                Student.id.in_(ids[start:start + BULK_LOOKUP_CHUNK])
+            ))
+        
+        rows = []
+        for index, (key, student_id, record_date, record_status, notes) in wanted.items():
+            if key not in class_ids:
+                results[index] = {'student_id': student_id, 'status': 'error', 'message': 'Student not found'}
+                continue
+            rows.append({
+                'student_id': key,
+                'class_id': class_ids[key],
+                'teacher_id': teacher_id,
+                'attendance_date': record_date,
+                'status': record_status,
+                'method': method,
+                'notes': notes
+            })
         
+        result = upsert_attendance(db.session, rows)
         db.session.commit()
+        dashboard_cache.invalidate()
+        for row in result.rows:
+            presence_bitmap.record(row.student_id, row.attendance_date, row.status)
+        
+        written = {(row.student_id, row.attendance_date): row for row in result.rows}
+        for index, (key, student_id, record_date, _, _) in wanted.items():
+            row = written.get((key, record_date))
+            if results[index] is None and row:
+                results[index] = {
+                    'student_id': student_id,
+                    'status': 'created' if row.created else 'updated',
+                    'attendance_id': row.id
+                }
         
         return jsonify({
             'message': 'Bulk attendance operation completed',
-            'results': results
+            'results': results,
+            'created': result.created,
+            'updated': result.updated,
+            'errors': sum(1 for item in results if item['status'] == 'error')
         })
         
     except Exception as e:
@@ -465,9 +579,15 @@ def bulk_mark_attendance():
 def get_classes():
     """Get all active classes"""
     try:
-        classes = Class.query.filter_by(is_active=True).order_by(Class.grade_level, Class.section).all()
+        # Teacher joined and student counts as a subquery: one statement for any number of classes
+        student_count = db.session.query(db.func.count(Student.id)).filter(
+            Student.class_id == Class.id
+        ).correlate(Class).scalar_subquery()
+        classes = db.session.query(Class, student_count).options(joinedload(Class.teacher)).filter(
+            Class.is_active == True
+        ).order_by(Class.grade_level, Class.section).all()
         return jsonify({
-            'classes': [cls.to_dict() for cls in classes]
+            'classes': [cls.to_dict(student_count=count) for cls, count in classes]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -505,34 +625,31 @@ def create_class():
 
 # ==================== RFID ROUTES ====================
 
+# Live scan feed shared by every open /api/rfid/stream connection
+scan_broadcaster = ScanBroadcaster()
+scan_tailer = ScanLogTailer(app, scan_broadcaster)
+
 @app.route('/api/rfid/scans', methods=['GET'])
 def get_rfid_scans():
     """Get recent RFID scan logs"""
     try:
         limit = request.args.get('limit', 50, type=int)
         
-        # Direct SQL query as fallback
-        import sqlite3
-        db_path = os.path.join('instance', 'attendance_system.db')
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Get today's date in the right format
-        from datetime import date
-        today = date.today().strftime('%Y-%m-%d')
-        
-        cursor.execute('''
-            SELECT r.rfid_tag, r.scan_time, r.status, r.student_id, r.id, 
-                   COALESCE(r.student_name, s.full_name) as student_name
-            FROM rfid_scan_logs r
-            LEFT JOIN students s ON r.student_id = s.id
-            WHERE DATE(r.scan_time) >= DATE('now', '-1 day')
-            ORDER BY r.scan_time DESC 
-            LIMIT ?
-        ''', (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        # Compare the raw column against a cutoff so the scan_time index is used
+        # (wrapping it in DATE() forces a full table scan)
+        cutoff = (date.today() - timedelta(days=1)).isoformat()
+        
+        # Pooled connection: the statement stays prepared between requests
+        with get_pool(db_path).connection() as conn:
+            rows = conn.execute('''
+                SELECT r.rfid_tag, r.scan_time, r.status, r.student_id, r.id, 
+                       COALESCE(r.student_name, s.full_name) as student_name
+                FROM rfid_scan_logs r
+                LEFT JOIN students s ON r.student_id = s.id
+                WHERE r.scan_time >= ?
+                ORDER BY r.scan_time DESC 
+                LIMIT ?
+            ''', (cutoff, limit)).fetchall()
         
         scans = []
         for row in rows:
@@ -554,43 +671,32 @@ def get_rfid_scans():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/rfid/stream', methods=['GET'])
+def stream_rfid_scans():
+    """Server-Sent Events stream of new RFID scans, resumable with Last-Event-ID"""
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'error': 'last_event_id must be a scan id'}), 400
+    
+    scan_tailer.start()
+    return Response(
+        stream_scans(scan_broadcaster, scan_tailer, last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/rfid/stream/stats', methods=['GET'])
+def rfid_stream_stats():
+    """Subscriber and delivery counters for the live scan feed"""
+    return jsonify({**scan_broadcaster.stats(), 'polls': scan_tailer.polls})
+
 @app.route('/api/stats/dashboard', methods=['GET'])
 def get_dashboard_stats():
-    """Get dashboard statistics"""
+    """Get dashboard statistics (one query, cached for a couple of seconds)"""
     try:
-        today = date.today()
-        
-        # Basic counts
-        total_students = Student.query.filter_by(is_active=True).count()
-        total_classes = Class.query.filter_by(is_active=True).count()
-        
-        # Today's attendance
-        today_attendance = Attendance.query.filter_by(attendance_date=today).all()
-        present_today = len([a for a in today_attendance if a.status == 'present'])
-        absent_today = total_students - present_today
-        
-        # Weekly average
-        week_ago = today - timedelta(days=7)
-        weekly_attendance = db.session.query(Attendance.attendance_date, db.func.count(Attendance.id)).filter(
-            Attendance.attendance_date >= week_ago,
-            Attendance.attendance_date <= today,
-            Attendance.status == 'present'
-        ).group_by(Attendance.attendance_date).all()
-        
-        weekly_avg = sum([count for date, count in weekly_attendance]) / 7 if weekly_attendance else 0
-        
-        # Recent RFID scans
-        recent_scans = RFIDScanLog.query.order_by(RFIDScanLog.scan_time.desc()).limit(10).all()
-        
-        return jsonify({
-            'total_students': total_students,
-            'total_classes': total_classes,
-            'present_today': present_today,
-            'absent_today': absent_today,
-            'weekly_average': round(weekly_avg, 1),
-            'attendance_percentage': round((present_today / total_students * 100), 1) if total_students > 0 else 0,
-            'recent_rfid_scans': [scan.to_dict() for scan in recent_scans]
-        })
+        return jsonify(dashboard_cache.get(lambda: load_dashboard_snapshot(db.session)))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -3,6 +3,7 @@ from flask import Flask
 from datetime import datetime
 import os
 from dotenv import load_dotenv
+from database import sqlite_uri
 
 # Load environment variables from .env file
 load_dotenv()
@@ -19,7 +20,7 @@ DB_CONFIG = {
 }
 
 # Configure SQLAlchemy
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///attendance_system.db"  # Using SQLite for simplicity
+app.config['SQLALCHEMY_DATABASE_URI'] = sqlite_uri(os.path.abspath('attendance_system.db'))  # Using SQLite for simplicity
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize SQLAlchemy
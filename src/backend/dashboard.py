@@ -0,0 +1,148 @@
+"""
+Dashboard snapshot for AttenSync
+All dashboard figures (student and class counts, today's and this week's
+attendance, the latest RFID scans) come from one SQL statement and are
+served from a short-lived cache. Attendance writes through the web API
+invalidate it; RFID scans are written by the listener processes and show
+up once the cached snapshot expires
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Writes in other processes (the BLE listeners) cannot invalidate this
+# process's cache, so the snapshot is never older than this many seconds
+DEFAULT_DASHBOARD_TTL = float(os.getenv('DASHBOARD_CACHE_SECONDS', '2'))
+RECENT_SCANS = 10
+
+# Attendance figures read daily_attendance_summary (one row per day and class);
+# recent scans are packed into a JSON array so everything is one round trip
+DASHBOARD_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM students WHERE is_active = 1) AS total_students,
+        (SELECT COUNT(*) FROM classes WHERE is_active = 1) AS total_classes,
+        (SELECT COALESCE(SUM(present_count), 0) FROM daily_attendance_summary
+         WHERE attendance_date = :today) AS present_today,
+        (SELECT COALESCE(SUM(present_count), 0) FROM daily_attendance_summary
+         WHERE attendance_date >= :week_ago AND attendance_date <= :today) AS weekly_present,
+        (SELECT json_group_array(json_object(
+                    'id', id, 'rfid_tag', rfid_tag, 'student_name', student_name,
+                    'scan_time', replace(scan_time, ' ', 'T'), 'student_id', student_id,
+                    'attendance_id', attendance_id, 'status', status, 'error_message', error_message,
+                    'reader_id', reader_id, 'created_at', replace(created_at, ' ', 'T')))
+         FROM (SELECT * FROM rfid_scan_logs ORDER BY scan_time DESC LIMIT :recent)) AS recent_scans
+"""
+
+
+def load_dashboard_snapshot(session, today=None):
+    """
+    Compute the dashboard figures with a single query
+
+    Args:
+        session: SQLAlchemy session (models.db.session)
+        today (date, optional): Day to report on (default: today)
+
+    Returns:
+        dict: The /api/stats/dashboard payload
+    """
+    today = today or date.today()
+    row = session.execute(text(DASHBOARD_SQL), {
+        'today': today.isoformat(),
+        'week_ago': (today - timedelta(days=7)).isoformat(),
+        'recent': RECENT_SCANS
+    }).one()
+
+    total_students = row.total_students
+    present_today = row.present_today
+    return {
+        'total_students': total_students,
+        'total_classes': row.total_classes,
+        'present_today': present_today,
+        'absent_today': total_students - present_today,
+        'weekly_average': round(row.weekly_present / 7, 1),
+        'attendance_percentage': round((present_today / total_students * 100), 1) if total_students > 0 else 0,
+        'recent_rfid_scans': json.loads(row.recent_scans)
+    }
+
+
+class DashboardCache:
+    """
+    Time-bounded cache of the dashboard snapshot
+
+    Concurrent requests after an expiry share one reload instead of each
+    running the query. invalidate() drops the snapshot immediately.
+    """
+
+    def __init__(self, ttl=DEFAULT_DASHBOARD_TTL, clock=time.monotonic):
+        """
+        Args:
+            ttl (float): Seconds a snapshot is served before it is recomputed
+            clock (callable): Time source (tests substitute a fake clock)
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._snapshot = None
+        self._loaded_at = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def get(self, loader):
+        """
+        Return the cached snapshot, calling loader() to rebuild it when stale
+
+        Args:
+            loader (callable): Builds a fresh snapshot (runs inside the caller's app context)
+        """
+        snapshot = self._fresh()
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        with self._lock:
+            snapshot = self._fresh()
+            if snapshot is not None:
+                self.hits += 1
+                return snapshot
+            generation = self._generation
+            snapshot = loader()
+            self.loads += 1
+            # A write that landed while loading makes this result stale already
+            if generation == self._generation:
+                self._snapshot, self._loaded_at = snapshot, self.clock()
+            return snapshot
+
+    def _fresh(self):
+        snapshot, loaded_at = self._snapshot, self._loaded_at
+        if snapshot is not None and self.clock() - loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    def invalidate(self):
+        """Drop the snapshot (call after attendance or scan writes)"""
+        self._generation += 1
+        self._snapshot = None
+        self.invalidations += 1
+
+    def stats(self):
+        """Hits, reloads and invalidations since start"""
+        return {
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'loads': self.loads,
+            'invalidations': self.invalidations,
+            'cached': self._fresh() is not None
+        }
+
+
+dashboard_cache = DashboardCache()
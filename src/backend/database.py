@@ -0,0 +1,224 @@
+"""
+Central SQLite connection factory for AttenSync
+Every connection to the attendance database - SQLAlchemy engines (through the
+connect event below) and raw sqlite3 handles (through connect()) - gets the
+same performance profile:
+
+    journal_mode=WAL       readers never block the writer and the writer never
+                           blocks readers (dashboard polls vs RFID listener)
+    synchronous=NORMAL     fsync at checkpoints instead of every commit; with
+                           WAL a power cut can lose the last commits but
+                           cannot corrupt the database
+    busy_timeout=5000      wait up to 5 s for the write lock instead of failing
+                           immediately with "database is locked"
+    cache_size=-65536      64 MiB page cache per connection (negative = KiB)
+    mmap_size=268435456    read pages through a 256 MiB memory map
+    temp_store=MEMORY      sorts and temp tables for GROUP BY stay in memory
+
+Connections are pooled: SQLAlchemy engines use a QueuePool (engine_options())
+and raw queries borrow from a ConnectionPool (get_pool()), so the profile is
+applied once per connection and each connection keeps its prepared
+statements cached across requests. The database path can be moved with
+ATTENSYNC_DB_PATH.
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(BACKEND_DIR, 'instance', 'attendance_system.db')
+
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', '8'))
+STATEMENT_CACHE = 256  # prepared statements kept per connection (sqlite3 default is 128)
+
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', BUSY_TIMEOUT_MS),
+    ('cache_size', -65536),
+    ('mmap_size', 268435456),
+    ('temp_store', 'MEMORY'),
+)
+
+
+def resolve_db_path(default=DEFAULT_DB_PATH):
+    """
+    Path of the attendance database
+
+    Args:
+        default (str): Path used when ATTENSYNC_DB_PATH is not set
+
+    Returns:
+        str: Absolute database path (its directory is created if missing)
+    """
+    path = os.path.abspath(os.getenv('ATTENSYNC_DB_PATH') or default)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def sqlite_uri(path=None):
+    """SQLAlchemy URI for a database path (default: resolve_db_path())"""
+    return f"sqlite:///{path or resolve_db_path()}"
+
+
+def engine_options(pool_size=POOL_SIZE):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for a Flask app
+
+    SQLAlchemy 1.4 uses NullPool for SQLite files, which reopens (and
+    re-profiles) a connection for every session; a QueuePool keeps them open.
+    """
+    return {
+        'poolclass': QueuePool,
+        'pool_size': pool_size,
+        'max_overflow': pool_size,
+        'connect_args': {
+            'check_same_thread': False,
+            'timeout': BUSY_TIMEOUT_MS / 1000,
+            'cached_statements': STATEMENT_CACHE
+        }
+    }
+
+
+def apply_pragmas(conn, pragmas=PRAGMAS):
+    """Apply the performance profile to an open sqlite3 connection"""
+    cursor = conn.cursor()
+    try:
+        for name, value in pragmas:
+            try:
+                cursor.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.OperationalError as e:
+                # e.g. switching to WAL while another process holds a lock;
+                # journal_mode is persistent, so a later connection will succeed
+                logger.warning(f"⚠️ Could not set PRAGMA {name}: {e}")
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, 'connect')
+def _apply_profile(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_pragmas(dbapi_connection)
+
+
+def connect(path=None, **kwargs):
+    """
+    Open a raw sqlite3 connection with the performance profile applied
+
+    Args:
+        path (str, optional): Database path (default: resolve_db_path())
+        **kwargs: Passed to sqlite3.connect
+
+    Returns:
+        sqlite3.Connection
+    """
+    kwargs.setdefault('timeout', BUSY_TIMEOUT_MS / 1000)
+    kwargs.setdefault('cached_statements', STATEMENT_CACHE)
+    conn = sqlite3.connect(path or resolve_db_path(), **kwargs)
+    apply_pragmas(conn)
+    return conn
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of profiled sqlite3 connections for raw queries
+
+    Connections are created lazily up to size and shared between threads
+    (one borrower at a time). A borrower blocks when all are in use.
+    """
+
+    def __init__(self, path=None, size=POOL_SIZE, timeout=30.0):
+        """
+        Args:
+            path (str, optional): Database path (default: resolve_db_path())
+            size (int): Maximum open connections
+            timeout (float): Seconds to wait for a free connection
+        """
+        self.path = path or resolve_db_path()
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._all = []
+
+        # Metrics
+        self.borrows = 0
+        self.waits = 0
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = connect(self.path, check_same_thread=False)
+                self._all.append(conn)
+                return conn
+        self.waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free database connection after {self.timeout}s") from None
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; any open transaction is rolled back on return"""
+        conn = self._acquire()
+        self.borrows += 1
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+            self._idle = queue.LifoQueue()
+
+    def stats(self):
+        """Open and idle connections, borrows and waits for a free connection"""
+        return {
+            'path': self.path,
+            'size': self.size,
+            'open': len(self._all),
+            'idle': self._idle.qsize(),
+            'borrows': self.borrows,
+            'waits': self.waits
+        }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    """Shared ConnectionPool for a database path (default: resolve_db_path())"""
+    path = os.path.abspath(path or resolve_db_path())
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def current_profile(conn):
+    """Effective value of every profile pragma on a connection (for health checks and tests)"""
+    cursor = conn.cursor()
+    try:
+        return {name: cursor.execute(f"PRAGMA {name}").fetchone()[0] for name, _ in PRAGMAS}
+    finally:
+        cursor.close()
@@ -0,0 +1,231 @@
+"""
+Lightweight attendance forecasters for AttenSync
+Seasonal-naive, exponential smoothing with weekday seasonality and ridge
+regression on calendar features, in NumPy only. Each fits in milliseconds on
+the load_attendance_data frame and returns the generate_forecast schema, so
+quick dashboard forecasts need neither a Prophet fit nor cmdstan.
+"""
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from forecast_model import AttendanceForecastModel, format_forecast
+
+logger = logging.getLogger(__name__)
+
+Z_80 = 1.2816  # half-width of a two-sided 80% normal interval, as configured for Prophet
+MIN_TRAINING_DAYS = 7  # one school week: every weekday seen once
+
+
+def weekdays(ds):
+    """Weekday (Monday = 0) of each date"""
+    return pd.DatetimeIndex(ds).weekday.to_numpy()
+
+
+class SeasonalNaive:
+    """Each day repeats the last observed day with the same weekday"""
+
+    name = 'seasonal_naive'
+
+    def fit(self, ds, y):
+        wd = weekdays(ds)
+        self.last_day = pd.Timestamp(ds.iloc[-1])
+        self.last = np.full(7, y[-1])
+        diffs = []
+        for w in np.unique(wd):
+            same = y[wd == w]
+            self.last[w] = same[-1]
+            diffs.append(np.diff(same))
+        diffs = np.concatenate(diffs)
+        self.sigma = np.sqrt(np.mean(diffs ** 2)) if len(diffs) else np.std(y)
+        return self
+
+    def predict(self, ds):
+        """Point forecast and standard error per date"""
+        weeks_ahead = np.ceil((pd.DatetimeIndex(ds) - self.last_day).days.to_numpy() / 7)
+        return self.last[weekdays(ds)], self.sigma * np.sqrt(np.maximum(weeks_ahead, 1))
+
+
+class WeekdayExponentialSmoothing:
+    """
+    Additive exponential smoothing: a level plus one seasonal term per weekday
+
+    The smoothing weights are picked from a small grid by one-step-ahead
+    squared error; all grid points run through the series together.
+    """
+
+    name = 'ets'
+    ALPHAS = (0.05, 0.1, 0.2, 0.3, 0.5)
+    GAMMAS = (0.01, 0.05, 0.1, 0.2)
+
+    def fit(self, ds, y):
+        wd = weekdays(ds)
+        alpha, gamma = (grid.ravel() for grid in np.meshgrid(self.ALPHAS, self.GAMMAS))
+
+        # Start from the first four weeks: their mean and the mean offset of each weekday
+        start = min(len(y), 20)
+        base = y[:start].mean()
+        season = np.zeros(7)
+        for w in np.unique(wd[:start]):
+            season[w] = y[:start][wd[:start] == w].mean() - base
+
+        level = np.full(len(alpha), base)
+        seasons = np.tile(season, (len(alpha), 1))
+        rows = np.arange(len(alpha))
+        sse = np.zeros(len(alpha))
+        warmup = min(5, len(y) - 1)
+        for t in range(len(y)):
+            error = y[t] - level - seasons[:, wd[t]]
+            if t >= warmup:
+                sse += error ** 2
+            level = level + alpha * error
+            seasons[rows, wd[t]] += gamma * (1 - alpha) * error
+
+        best = int(np.argmin(sse))
+        self.alpha, self.gamma = alpha[best], gamma[best]
+        self.level, self.season = level[best], seasons[best]
+        self.sigma = np.sqrt(sse[best] / max(len(y) - warmup, 1))
+        self.last_day = pd.Timestamp(ds.iloc[-1])
+        return self
+
+    def predict(self, ds):
+        """Point forecast and standard error per date"""
+        steps = np.maximum((pd.DatetimeIndex(ds) - self.last_day).days.to_numpy(), 1)
+        return self.level + self.season[weekdays(ds)], self.sigma * np.sqrt(1 + (steps - 1) * self.alpha ** 2)
+
+
+class CalendarRidge:
+    """Ridge regression on a linear trend, weekday indicators and yearly Fourier terms"""
+
+    name = 'ridge'
+    PENALTY = 1.0
+    FOURIER_ORDER = 2
+
+    def features(self, ds):
+        index = pd.DatetimeIndex(ds)
+        days = (index - self.origin).days.to_numpy(dtype=float)
+        year_phase = 2 * np.pi * index.dayofyear.to_numpy() / 365.25
+        columns = [days / 365.25, *np.eye(7)[index.weekday].T]
+        for k in range(1, self.FOURIER_ORDER + 1):
+            columns += [np.sin(k * year_phase), np.cos(k * year_phase)]
+        return np.column_stack(columns)
+
+    def fit(self, ds, y):
+        self.origin = pd.Timestamp(ds.iloc[0])
+        X = self.features(ds)
+        self.x_mean = X.mean(axis=0)
+        self.x_scale = X.std(axis=0)
+        self.x_scale[self.x_scale == 0] = 1
+        Xs = (X - self.x_mean) / self.x_scale
+        self.y_mean = y.mean()
+
+        # Centred data, so the intercept is y_mean and is not penalised
+        gram = Xs.T @ Xs + self.PENALTY * np.eye(Xs.shape[1])
+        self.coef = np.linalg.solve(gram, Xs.T @ (y - self.y_mean))
+        residuals = y - self.y_mean - Xs @ self.coef
+        self.sigma = np.sqrt(residuals @ residuals / max(len(y) - Xs.shape[1] - 1, 1))
+        return self
+
+    def predict(self, ds):
+        """Point forecast and standard error per date"""
+        Xs = (self.features(ds) - self.x_mean) / self.x_scale
+        return self.y_mean + Xs @ self.coef, np.full(len(Xs), self.sigma)
+
+
+FORECASTERS = {cls.name: cls for cls in (SeasonalNaive, WeekdayExponentialSmoothing, CalendarRidge)}
+
+
+def fit_fast(method, history):
+    """
+    Fit one of the NumPy forecasters
+
+    Args:
+        method (str): 'seasonal_naive', 'ets' or 'ridge'
+        history (pandas.DataFrame): 'ds'/'y' frame from load_attendance_data
+
+    Returns:
+        Fitted forecaster with predict(ds) -> (yhat, standard error)
+    """
+    if method not in FORECASTERS:
+        raise ValueError(f"Unknown forecast method '{method}' (expected one of {', '.join(FORECASTERS)})")
+    return FORECASTERS[method]().fit(history['ds'].reset_index(drop=True), history['y'].to_numpy(dtype=float))
+
+
+def future_dates(history, periods):
+    """The periods calendar days after the last training day (as Prophet's make_future_dataframe)"""
+    return pd.Series(pd.date_range(history['ds'].max() + pd.Timedelta(days=1), periods=periods, freq='D'))
+
+
+class FastForecastModel(AttendanceForecastModel):
+    """
+    AttendanceForecastModel with a NumPy forecaster in place of Prophet
+
+    Fits are cheap enough to redo on every train_model(), so nothing is
+    kept in the forecast model store.
+    """
+
+    def __init__(self, method='ets', db_path=None):
+        """
+        Args:
+            method (str): 'seasonal_naive', 'ets' or 'ridge'
+            db_path (str, optional): Database file (default: the Flask apps' database)
+        """
+        if method not in FORECASTERS:
+            raise ValueError(f"Unknown forecast method '{method}' (expected one of {', '.join(FORECASTERS)})")
+        super().__init__(db_path=db_path)
+        self.method = method
+        self.training_data = None
+        self.fit_ms = None
+
+    def train_model(self, class_id=None, days_back=90):
+        """
+        Fit the forecaster on attendance data
+
+        Args:
+            class_id (int, optional): Train for specific class
+            days_back (int): Days of historical data to use
+
+        Returns:
+            bool: Success status
+        """
+        training_data = self.load_attendance_data(days_back=days_back, class_id=class_id)
+        if len(training_data) < MIN_TRAINING_DAYS:
+            logger.warning(f"⚠️ Limited training data ({len(training_data)} days). Need at least {MIN_TRAINING_DAYS} days.")
+            return False
+
+        started = time.perf_counter()
+        self.model = fit_fast(self.method, training_data)
+        self.fit_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.training_data = training_data
+        self.is_trained = True
+        self.trained_class_id = class_id
+        self.last_training_date = datetime.now()
+        return True
+
+    def generate_forecast(self, periods=30, class_id=None):
+        """
+        Generate attendance forecast
+
+        Args:
+            periods (int): Number of days to forecast
+            class_id (int, optional): Class to forecast for
+
+        Returns:
+            dict: Same schema as AttendanceForecastModel.generate_forecast, or None without enough data
+        """
+        if not self.is_trained or self.trained_class_id != class_id:
+            if not self.train_model(class_id=class_id):
+                return None
+
+        dates = future_dates(self.training_data, periods)
+        yhat, sigma = self.model.predict(dates)
+        return format_forecast(dates, yhat, yhat - Z_80 * sigma, yhat + Z_80 * sigma, {
+            'training_date': self.last_training_date.isoformat(),
+            'periods_forecasted': periods,
+            'class_id': class_id,
+            'method': self.method,
+            'fit_ms': self.fit_ms
+        })
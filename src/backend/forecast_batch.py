@@ -0,0 +1,209 @@
+"""
+Batch per-class attendance forecasting for AttenSync
+Loads every class's daily series with one query, fits the classes in a
+process pool (one Prophet fit per class, reusing stored fits whose data has
+not changed) and writes all forecasts back in one transaction
+
+Usage:
+    python forecast_batch.py [--periods 30] [--days-back 90] [--workers N] [--compare-serial]
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from database import get_pool, resolve_db_path
+from forecast_model import fit_prophet, predict, training_config
+from forecast_store import ForecastModelStore, data_watermark, default_model_dir, model_version
+from forecast_writer import forecast_frame, write_forecast
+
+logger = logging.getLogger(__name__)
+
+MIN_TRAINING_DAYS = 14  # same floor as AttendanceForecastModel.train_model
+
+SERIES_SQL = """
+    SELECT d.class_id, d.attendance_date AS date, d.present_count, d.total_count
+    FROM daily_attendance_summary d
+    JOIN classes c ON d.class_id = c.id
+    WHERE d.attendance_date >= ? AND d.attendance_date <= ? AND c.is_active = 1
+    ORDER BY d.class_id, d.attendance_date
+"""
+
+STUDENT_COUNT_SQL = "SELECT class_id, COUNT(*) FROM students WHERE is_active = 1 GROUP BY class_id"
+
+
+def load_class_series(conn, days_back=90, today=None):
+    """
+    Daily attendance-rate series of every active class, from one query
+
+    Args:
+        conn: sqlite3 connection
+        days_back (int): Days of history to load
+        today (date, optional): Last day of the window (default: today)
+
+    Returns:
+        dict: class_id -> DataFrame with Prophet's 'ds' and 'y' (attendance %) columns
+    """
+    end_date = today or date.today()
+    start_date = end_date - timedelta(days=days_back)
+    df = pd.read_sql_query(SERIES_SQL, conn, params=[start_date.isoformat(), end_date.isoformat()])
+    if df.empty:
+        return {}
+    df['ds'] = pd.to_datetime(df['date'])
+    df['y'] = (df['present_count'] / df['total_count'] * 100).fillna(0)
+    return {
+        int(class_id): group[['ds', 'y']].reset_index(drop=True)
+        for class_id, group in df.groupby('class_id', sort=True)
+    }
+
+
+def forecast_class(task):
+    """
+    Fit (or load) one class's model and predict its horizon; runs in a worker process
+
+    Args:
+        task (dict): class_id, history, periods, config and model_dir
+
+    Returns:
+        dict: class_id, dates, rates and their bounds (%), model version, refitted flag and seconds spent
+    """
+    started = time.perf_counter()
+    history = task['history']
+    watermark = data_watermark(history)
+    store = ForecastModelStore(task['model_dir'])
+    model, refitted = store.get_or_fit(task['class_id'], task['config'], watermark, lambda: fit_prophet(history))
+    future = model.make_future_dataframe(periods=task['periods'])
+    forecast = predict(model, future).tail(task['periods'])
+    return {
+        'class_id': task['class_id'],
+        'dates': forecast['ds'].dt.strftime('%Y-%m-%d').to_numpy(),
+        'rates': np.clip(forecast['yhat'].to_numpy(), 0, 100),
+        'lower': np.clip(forecast['yhat_lower'].to_numpy(), 0, 100),
+        'upper': np.clip(forecast['yhat_upper'].to_numpy(), 0, 100),
+        'model_version': model_version(task['config'], watermark),
+        'refitted': refitted,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def run_tasks(tasks, workers):
+    """Run forecast_class over tasks, in-process when workers is 1"""
+    if workers <= 1 or len(tasks) <= 1:
+        return [forecast_class(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(forecast_class, tasks))
+
+
+def write_forecasts(conn, results, student_counts):
+    """
+    Store every class's forecast in one transaction, skipping rows that did not change
+
+    Args:
+        conn: sqlite3 connection
+        results (list): forecast_class results
+        student_counts (dict): class_id -> active students, to turn rates into head counts
+
+    Returns:
+        int: Rows written
+    """
+    written = 0
+    try:
+        for result in results:
+            scale = student_counts.get(result['class_id'], 0) / 100
+            rows = forecast_frame(result['dates'], result['rates'] * scale, rate=result['rates'],
+                                  lower=result['lower'] * scale, upper=result['upper'] * scale)
+            written += write_forecast(conn, result['class_id'], rows, result['model_version'])['written']
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return written
+
+
+def forecast_all_classes(db_path=None, periods=30, days_back=90, workers=None, model_dir=None, today=None):
+    """
+    Forecast every active class with enough history
+
+    Args:
+        db_path (str, optional): Database file (default: the Flask apps' database)
+        periods (int): Days to forecast
+        days_back (int): Days of history per class
+        workers (int, optional): Worker processes (default: CPU count; 1 runs serially)
+        model_dir (str, optional): Forecast model store directory
+        today (date, optional): Last day of the training window
+
+    Returns:
+        dict: Per-class timings, skipped classes, rows written and wall-clock seconds
+    """
+    started = time.perf_counter()
+    pool = get_pool(db_path or resolve_db_path())
+    with pool.connection() as conn:
+        series = load_class_series(conn, days_back=days_back, today=today)
+        student_counts = dict(conn.execute(STUDENT_COUNT_SQL).fetchall())
+
+    config = training_config(days_back)
+    model_dir = model_dir or default_model_dir()
+    tasks, skipped = [], []
+    for class_id, history in series.items():
+        if len(history) < MIN_TRAINING_DAYS:
+            skipped.append(class_id)
+            continue
+        tasks.append({'class_id': class_id, 'history': history, 'periods': periods,
+                      'config': config, 'model_dir': model_dir})
+
+    workers = workers or os.cpu_count() or 1
+    results = run_tasks(tasks, workers)
+
+    with pool.connection() as conn:
+        written = write_forecasts(conn, results, student_counts)
+
+    report = {
+        'classes': len(results),
+        'refitted': sum(result['refitted'] for result in results),
+        'skipped': skipped,
+        'rows_written': written,
+        'workers': min(workers, len(tasks)) if tasks else 0,
+        'fit_seconds': {result['class_id']: result['seconds'] for result in results},
+        'wall_seconds': round(time.perf_counter() - started, 3)
+    }
+    logger.info(f"✅ Forecast {report['classes']} classes ({report['refitted']} refitted) "
+                f"with {report['workers']} workers in {report['wall_seconds']}s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Forecast attendance for every class')
+    parser.add_argument('--db', default=None, help='Database file (default: ATTENSYNC_DB_PATH or the backend database)')
+    parser.add_argument('--periods', type=int, default=30)
+    parser.add_argument('--days-back', type=int, default=90)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--model-dir', default=None)
+    parser.add_argument('--compare-serial', action='store_true',
+                        help='Also time a serial run (both runs refit: each uses a fresh model directory)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if not args.compare_serial:
+        report = forecast_all_classes(args.db, args.periods, args.days_back, args.workers, args.model_dir)
+        print(f"Forecast {report['classes']} classes in {report['wall_seconds']}s "
+              f"({report['refitted']} refitted, {len(report['skipped'])} skipped)")
+        return
+
+    import tempfile
+    with tempfile.TemporaryDirectory() as serial_dir, tempfile.TemporaryDirectory() as pool_dir:
+        serial = forecast_all_classes(args.db, args.periods, args.days_back, 1, serial_dir)
+        parallel = forecast_all_classes(args.db, args.periods, args.days_back, args.workers, pool_dir)
+    print(f"serial:   {serial['classes']} classes in {serial['wall_seconds']}s")
+    print(f"parallel: {parallel['classes']} classes in {parallel['wall_seconds']}s "
+          f"with {parallel['workers']} workers")
+    if parallel['wall_seconds']:
+        print(f"speedup:  {serial['wall_seconds'] / parallel['wall_seconds']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
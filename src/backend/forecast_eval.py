@@ -0,0 +1,336 @@
+"""
+Rolling-origin evaluation of the AttenSync forecasters
+Every class (and the whole school, class_id 0) is forecast from weekly
+origins and scored against the attendance that followed: MAE, MAPE and
+80%-interval coverage per forecaster and horizon day. Folds run in a process
+pool and are stored in forecast_eval_folds. A fold's data window is anchored
+to its origin (TRAIN_DAYS before it plus the scored days after it), and the
+fold is refitted only when the watermark of that window changes, so a
+nightly run fits just the newest week. The latest scores are written to
+forecast_accuracy, which /api/trends reads.
+
+Usage:
+    python forecast_eval.py [--horizon 7] [--folds 8] [--train-days 90] [--days-back 180]
+                            [--methods ets,ridge] [--workers N]
+"""
+import argparse
+import importlib.util
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from database import get_pool, resolve_db_path
+from fast_forecast import FORECASTERS, Z_80, fit_fast
+from forecast_batch import MIN_TRAINING_DAYS, load_class_series
+from forecast_model import PROPHET_PARAMS, SCHOOL_TERM_SEASONALITY, AttendanceForecastModel, fit_prophet, predict
+from forecast_store import config_hash, data_watermark
+
+logger = logging.getLogger(__name__)
+
+HORIZON = 7
+FOLDS = 8
+TRAIN_DAYS = 90  # training days per fold, as the production models use
+DAYS_BACK = 180  # history loaded per series; folds whose window starts earlier are skipped
+
+FOLD_COLUMNS = ['class_id', 'method', 'origin', 'horizon', 'config', 'watermark',
+                'actual', 'predicted', 'lower', 'upper']
+
+SCORE_COLUMNS = ['class_id', 'method', 'horizon', 'mae', 'mape', 'coverage', 'points', 'folds']
+
+
+def default_methods():
+    """The NumPy forecasters, plus Prophet when it is installed"""
+    methods = list(FORECASTERS)
+    if importlib.util.find_spec('prophet') is not None:
+        methods.append('prophet')
+    return methods
+
+
+def method_config(method, horizon, train_days=TRAIN_DAYS):
+    """Hash of what a fold's result depends on besides the data"""
+    config = {'method': method, 'horizon': horizon, 'train_days': train_days}
+    if method == 'prophet':
+        config.update(prophet=PROPHET_PARAMS, seasonalities=[SCHOOL_TERM_SEASONALITY])
+    return config_hash(config)
+
+
+def fold_origins(history, horizon=HORIZON, folds=FOLDS, train_days=TRAIN_DAYS):
+    """
+    Last days of training for each fold: the latest Sundays that leave horizon
+    days of actuals and at least MIN_TRAINING_DAYS of training data
+
+    Origins sit on fixed weekdays rather than counting back from the last
+    day, so a fold keeps its data window (and its cached result) as new
+    attendance days arrive.
+    """
+    last_scored = history['ds'].max() - pd.Timedelta(days=horizon)
+    origins = pd.date_range(end=last_scored, periods=folds, freq='W-SUN')
+    return [origin for origin in origins
+            if history['ds'].between(origin - pd.Timedelta(days=train_days - 1), origin).sum() >= MIN_TRAINING_DAYS]
+
+
+def evaluate_fold(task):
+    """
+    Fit one method on a fold's training days and score its forecast; runs in a worker process
+
+    Args:
+        task (dict): class_id, method, origin, horizon, config, watermark, train and actual frames
+
+    Returns:
+        list[tuple]: forecast_eval_folds rows, one per horizon day with attendance
+    """
+    origin, horizon = task['origin'], task['horizon']
+    dates = pd.Series(pd.date_range(origin + pd.Timedelta(days=1), periods=horizon, freq='D'))
+    if task['method'] == 'prophet':
+        forecast = predict(fit_prophet(task['train']), pd.DataFrame({'ds': dates}))
+        yhat = forecast['yhat'].to_numpy()
+        lower, upper = forecast['yhat_lower'].to_numpy(), forecast['yhat_upper'].to_numpy()
+    else:
+        yhat, sigma = fit_fast(task['method'], task['train']).predict(dates)
+        lower, upper = yhat - Z_80 * sigma, yhat + Z_80 * sigma
+
+    observed = dates.isin(task['actual']['ds']).to_numpy()
+    actual = task['actual'].set_index('ds')['y'].reindex(dates[observed]).to_numpy()
+    steps = np.arange(1, horizon + 1)[observed]
+    yhat, lower, upper = (np.clip(values[observed], 0, 100) for values in (yhat, lower, upper))
+    key = (task['class_id'], task['method'], f"{origin:%Y-%m-%d}")
+    return [key + (int(step), task['config'], task['watermark'], float(a), float(p), float(lo), float(hi))
+            for step, a, p, lo, hi in zip(steps, actual, yhat, lower, upper)]
+
+
+def run_folds(tasks, workers):
+    """Run evaluate_fold over tasks, in-process when workers is 1"""
+    if workers <= 1 or len(tasks) <= 1:
+        return [evaluate_fold(task) for task in tasks]
+    workers = min(workers, len(tasks))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Fast-method folds take milliseconds: send them in batches
+        return list(pool.map(evaluate_fold, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+
+def load_series(db_path, days_back=DAYS_BACK, today=None):
+    """Whole-school series (class_id 0) and every active class's series, as 'ds'/'y' frames"""
+    series = {0: AttendanceForecastModel(db_path=db_path).load_attendance_data(days_back=days_back, today=today)}
+    with get_pool(db_path).connection() as conn:
+        series.update(load_class_series(conn, days_back=days_back, today=today))
+    return {class_id: history for class_id, history in series.items() if len(history) >= MIN_TRAINING_DAYS}
+
+
+def plan_folds(series, methods, horizon, folds, train_days=TRAIN_DAYS, since=None):
+    """
+    Every fold of every series and method, keyed as in forecast_eval_folds
+
+    A fold's window runs from train_days before its origin to horizon days
+    after it, whatever span was loaded, so its watermark only changes when
+    attendance inside the window does. Folds whose window starts before
+    since (the first loaded day) would see a clipped window and are skipped.
+    """
+    tasks = []
+    for class_id, history in series.items():
+        for origin in fold_origins(history, horizon, folds, train_days):
+            first_day = origin - pd.Timedelta(days=train_days - 1)
+            if since is not None and first_day < pd.Timestamp(since):
+                continue
+            window = history[history['ds'].between(first_day, origin + pd.Timedelta(days=horizon))]
+            train = window[window['ds'] <= origin].reset_index(drop=True)
+            actual = window[window['ds'] > origin]
+            for method in methods:
+                tasks.append({
+                    'class_id': class_id, 'method': method, 'origin': origin, 'horizon': horizon,
+                    'config': method_config(method, horizon, train_days),
+                    'watermark': data_watermark(window, days=None),
+                    'train': train, 'actual': actual
+                })
+    return tasks
+
+
+def score_folds(folds):
+    """
+    MAE, MAPE (%) and interval coverage (%) per class, method and horizon day
+
+    Args:
+        folds (pandas.DataFrame): forecast_eval_folds rows
+
+    Returns:
+        pandas.DataFrame: SCORE_COLUMNS rows; horizon 0 scores all horizon days together
+    """
+    folds = folds.assign(
+        abs_error=(folds['predicted'] - folds['actual']).abs(),
+        covered=(folds['actual'] >= folds['lower']) & (folds['actual'] <= folds['upper'])
+    )
+    folds['ape'] = (folds['abs_error'] / folds['actual']).where(folds['actual'] > 0)
+    metrics = dict(mae=('abs_error', 'mean'), mape=('ape', 'mean'), coverage=('covered', 'mean'),
+                   points=('abs_error', 'size'), folds=('origin', 'nunique'))
+    by_horizon = folds.groupby(['class_id', 'method', 'horizon']).agg(**metrics).reset_index()
+    overall = folds.groupby(['class_id', 'method']).agg(**metrics).reset_index().assign(horizon=0)
+    scores = pd.concat([overall, by_horizon], ignore_index=True)[SCORE_COLUMNS]
+    scores['mape'] = scores['mape'] * 100
+    scores['coverage'] = scores['coverage'] * 100
+    return scores.round({'mae': 2, 'mape': 2, 'coverage': 1})
+
+
+def evaluate_forecasters(db_path=None, methods=None, horizon=HORIZON, folds=FOLDS, days_back=DAYS_BACK,
+                         workers=None, today=None, train_days=TRAIN_DAYS):
+    """
+    Run the rolling-origin evaluation and store the latest scores
+
+    Args:
+        db_path (str, optional): Database file (default: the Flask apps' database)
+        methods (list, optional): Forecasters to score (default: default_methods())
+        horizon (int): Days forecast from each origin
+        folds (int): Weekly origins per series
+        days_back (int): Days of history loaded per series
+        workers (int, optional): Worker processes (default: CPU count; 1 runs serially)
+        today (date, optional): Last day of the loaded history (default: today)
+        train_days (int): Training days before each origin
+
+    Returns:
+        dict: series and fold counts, folds evaluated vs reused from the cache, wall-clock seconds
+    """
+    started = time.perf_counter()
+    db_path = db_path or resolve_db_path()
+    methods = methods or default_methods()
+    today = today or date.today()
+    series = load_series(db_path, days_back=days_back, today=today)
+    tasks = plan_folds(series, methods, horizon, folds, train_days, since=today - timedelta(days=days_back))
+
+    pool = get_pool(db_path)
+    with pool.connection() as conn:
+        cached = set(conn.execute(
+            "SELECT DISTINCT class_id, method, origin, config, watermark FROM forecast_eval_folds"
+        ).fetchall())
+    keys = [(task['class_id'], task['method'], f"{task['origin']:%Y-%m-%d}", task['config'], task['watermark'])
+            for task in tasks]
+    pending = [task for task, key in zip(tasks, keys) if key not in cached]
+
+    workers = workers or os.cpu_count() or 1
+    results = run_folds(pending, workers)
+
+    with pool.connection() as conn:
+        try:
+            # Replace refitted folds, drop folds that left the window, then rescore from the stored folds
+            conn.executemany("DELETE FROM forecast_eval_folds WHERE class_id = ? AND method = ? AND origin = ?",
+                             [(task['class_id'], task['method'], f"{task['origin']:%Y-%m-%d}") for task in pending])
+            conn.executemany(f"INSERT INTO forecast_eval_folds ({', '.join(FOLD_COLUMNS)}) "
+                             f"VALUES ({', '.join('?' * len(FOLD_COLUMNS))})",
+                             [row for rows in results for row in rows])
+            stored = pd.read_sql_query(f"SELECT {', '.join(FOLD_COLUMNS)} FROM forecast_eval_folds", conn)
+            current_keys = pd.DataFrame(keys, columns=FOLD_COLUMNS[:3] + FOLD_COLUMNS[4:6])
+            current = stored.merge(current_keys)
+            folds_seen = stored[FOLD_COLUMNS[:3]].drop_duplicates().merge(
+                current_keys[FOLD_COLUMNS[:3]].drop_duplicates(), how='left', indicator=True)
+            conn.executemany("DELETE FROM forecast_eval_folds WHERE class_id = ? AND method = ? AND origin = ?",
+                             folds_seen.loc[folds_seen['_merge'] == 'left_only', FOLD_COLUMNS[:3]]
+                             .itertuples(index=False, name=None))
+
+            evaluated_at = datetime.now().isoformat(sep=' ')
+            scores = score_folds(current) if not current.empty else pd.DataFrame(columns=SCORE_COLUMNS)
+            conn.execute("DELETE FROM forecast_accuracy")
+            conn.executemany(
+                f"INSERT INTO forecast_accuracy ({', '.join(SCORE_COLUMNS)}, evaluated_at) "
+                f"VALUES ({', '.join('?' * len(SCORE_COLUMNS))}, ?)",
+                [row + (evaluated_at,) for row in scores.astype(object).where(scores.notna(), None)
+                 .itertuples(index=False, name=None)]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    report = {
+        'series': len(series),
+        'folds': len(tasks),
+        'evaluated': len(pending),
+        'cached': len(tasks) - len(pending),
+        'workers': min(workers, len(pending)) if pending else 0,
+        'wall_seconds': round(time.perf_counter() - started, 3)
+    }
+    logger.info(f"✅ Evaluated {report['evaluated']} forecast folds ({report['cached']} cached) "
+                f"over {report['series']} series in {report['wall_seconds']}s")
+    return report
+
+
+def latest_scores(conn, class_id=0):
+    """
+    Scores of the last evaluation run for one class (0 = whole school)
+
+    Args:
+        conn: DB-API connection (sqlite3, or session.connection().connection)
+        class_id (int): Class to read
+
+    Returns:
+        dict or None: evaluated_at and, per method, the overall scores with a by_horizon list;
+        None before the first run
+    """
+    try:
+        rows = conn.execute(
+            "SELECT method, horizon, mae, mape, coverage, points, folds, evaluated_at "
+            "FROM forecast_accuracy WHERE class_id = ? ORDER BY method, horizon", (class_id,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None  # migration 9 not applied yet
+    if not rows:
+        return None
+
+    methods = {}
+    for method, horizon, mae, mape, coverage, points, folds, _ in rows:
+        score = {'mae': mae, 'mape': mape, 'coverage': coverage, 'points': points, 'folds': folds}
+        if horizon == 0:
+            methods[method] = dict(score, by_horizon=[])
+        else:
+            methods[method]['by_horizon'].append(dict(score, horizon=horizon))
+    return {'class_id': class_id, 'evaluated_at': rows[0][7], 'methods': methods}
+
+
+def prediction_accuracy(scores, method='prophet'):
+    """
+    100 - MAPE of method (or of the best-scoring method if it was not evaluated)
+
+    Args:
+        scores (dict or None): latest_scores() result
+
+    Returns:
+        float or None: Accuracy %, None without scores
+    """
+    if not scores:
+        return None
+    rated = {name: score for name, score in scores['methods'].items() if score['mape'] is not None}
+    if not rated:
+        return None
+    chosen = rated.get(method) or min(rated.values(), key=lambda score: score['mape'])
+    return round(max(0.0, 100 - chosen['mape']), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score the attendance forecasters on past attendance')
+    parser.add_argument('--db', default=None, help='Database file (default: ATTENSYNC_DB_PATH or the backend database)')
+    parser.add_argument('--horizon', type=int, default=HORIZON)
+    parser.add_argument('--folds', type=int, default=FOLDS)
+    parser.add_argument('--train-days', type=int, default=TRAIN_DAYS)
+    parser.add_argument('--days-back', type=int, default=DAYS_BACK)
+    parser.add_argument('--methods', default=None, help='Comma-separated (default: all installed)')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    methods = args.methods.split(',') if args.methods else None
+    report = evaluate_forecasters(args.db, methods, args.horizon, args.folds, args.days_back, args.workers,
+                                  train_days=args.train_days)
+    print(f"{report['folds']} folds over {report['series']} series in {report['wall_seconds']}s "
+          f"({report['evaluated']} evaluated, {report['cached']} cached)")
+    with get_pool(args.db or resolve_db_path()).connection() as conn:
+        scores = latest_scores(conn)
+    if scores:
+        print(f"{'method':<16} {'MAE':>6} {'MAPE %':>7} {'80% cover':>10}")
+        for method, score in scores['methods'].items():
+            print(f"{method:<16} {score['mae']:>6.2f} {score['mape'] or 0:>7.2f} {score['coverage']:>9.1f}%")
+
+
+if __name__ == '__main__':
+    main()
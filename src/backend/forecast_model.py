@@ -4,8 +4,8 @@ Clean implementation with proper database integration
 """
 import pandas as pd
 import numpy as np
-from prophet import Prophet
-import sqlite3
+from database import get_pool, resolve_db_path
+from forecast_store import data_watermark, model_store
 import os
 from datetime import datetime, date, timedelta
 import warnings
@@ -18,81 +18,96 @@ warnings.filterwarnings('ignore')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prophet settings used by train_model; part of the stored-model key, so
+# changing them makes every class refit once
+PROPHET_PARAMS = {
+    'daily_seasonality': True,
+    'weekly_seasonality': True,
+    'yearly_seasonality': False,  # Not enough data for yearly patterns
+    'seasonality_mode': 'additive',
+    'interval_width': 0.80,  # 80% confidence intervals
+    'changepoint_prior_scale': 0.05  # Less aggressive changepoints
+}
+SCHOOL_TERM_SEASONALITY = {'name': 'school_term', 'period': 180, 'fourier_order': 3}
+INTERVAL_SEED = 0  # Prophet samples yhat_lower/yhat_upper; a fixed seed makes a stored model repeat them
+
 class AttendanceForecastModel:
     """
     ML model for forecasting attendance patterns using Prophet
     Integrates directly with AttenSync database
     """
     
-    def __init__(self, db_path=None):
-        """Initialize the forecasting model"""
-        if db_path is None:
-            # Use absolute path relative to this file
-            project_root = os.path.dirname(os.path.abspath(__file__))
-            db_path = os.path.join(project_root, 'instance', 'attensync.db')
-        
-        self.db_path = db_path
+    def __init__(self, db_path=None, store=None):
+        """
+        Initialize the forecasting model
+
+        Args:
+            db_path (str, optional): Database file (default: the Flask apps' database)
+            store (ForecastModelStore, optional): Registry of fitted models (default: forecast_store.model_store)
+        """
+        # Same database as the Flask apps unless told otherwise
+        self.db_path = db_path or resolve_db_path()
+        self.store = store or model_store
         self.model = None
         self.is_trained = False
+        self.trained_class_id = None
         self.last_training_date = None
         self.forecast_cache = {}
         
         logger.info("🤖 Attendance Forecast Model initialized")
     
     def _get_db_connection(self):
-        """Get database connection"""
+        """Borrow a pooled database connection (use as a context manager)"""
         try:
             if not os.path.exists(self.db_path):
                 raise FileNotFoundError(f"Database file not found: {self.db_path}")
             
-            conn = sqlite3.connect(self.db_path)
-            return conn
+            return get_pool(self.db_path).connection()
         except Exception as e:
             logger.error(f"❌ Database connection failed: {e}")
             raise
     
-    def load_attendance_data(self, days_back=90, class_id=None):
+    def load_attendance_data(self, days_back=90, class_id=None, today=None):
         """
         Load attendance data from database for training
         
         Args:
             days_back (int): Number of days to look back
             class_id (int, optional): Filter by specific class
+            today (date, optional): Last day to load (default: today)
         
         Returns:
             pandas.DataFrame: Attendance data formatted for Prophet
         """
         try:
-            conn = self._get_db_connection()
-            
             # Calculate date range
-            end_date = date.today()
+            end_date = today or date.today()
             start_date = end_date - timedelta(days=days_back)
             
-            # Build SQL query
-            base_query = """
-                SELECT 
-                    a.attendance_date as date,
-                    COUNT(CASE WHEN a.status = 'present' THEN 1 END) as present_count,
-                    COUNT(a.id) as total_marked,
-                    s.class_id,
-                    c.name as class_name
-                FROM attendance a
-                JOIN students s ON a.student_id = s.id
-                JOIN classes c ON s.class_id = c.id
-                WHERE a.attendance_date >= ? AND a.attendance_date <= ?
-            """
-            
-            params = [start_date.isoformat(), end_date.isoformat()]
-            
-            if class_id:
-                base_query += " AND s.class_id = ?"
-                params.append(class_id)
-            
-            base_query += " GROUP BY a.attendance_date, s.class_id ORDER BY a.attendance_date"
-            
-            df = pd.read_sql_query(base_query, conn, params=params)
-            conn.close()
+            with self._get_db_connection() as conn:
+                # Build SQL query (the summary already holds one row per day and class, keyed by
+                # the class the attendance was marked in; the join keeps deleted classes out)
+                base_query = f"""
+                    SELECT 
+                        d.attendance_date as date,
+                        d.present_count,
+                        d.total_count as total_marked,
+                        d.class_id,
+                        c.{class_name_column(conn)} as class_name
+                    FROM daily_attendance_summary d
+                    JOIN classes c ON d.class_id = c.id
+                    WHERE d.attendance_date >= ? AND d.attendance_date <= ?
+                """
+                
+                params = [start_date.isoformat(), end_date.isoformat()]
+                
+                if class_id:
+                    base_query += " AND d.class_id = ?"
+                    params.append(class_id)
+                
+                base_query += " ORDER BY d.attendance_date"
+                
+                df = pd.read_sql_query(base_query, conn, params=params)
             
             if df.empty:
                 logger.warning("⚠️ No attendance data found for the specified period")
@@ -129,6 +144,9 @@ class AttendanceForecastModel:
         """
         Train the Prophet model on attendance data
         
+        A model fitted on the same data (same class, window and last
+        attendance day) is loaded from the model store instead of refitted.
+        
         Args:
             class_id (int, optional): Train for specific class
             days_back (int): Days of historical data to use
@@ -150,30 +168,17 @@ class AttendanceForecastModel:
                 logger.warning(f"⚠️ Limited training data ({len(training_data)} days). Need at least 14 days.")
                 return False
             
-            # Initialize and configure Prophet model
-            self.model = Prophet(
-                daily_seasonality=True,
-                weekly_seasonality=True,
-                yearly_seasonality=False,  # Not enough data for yearly patterns
-                seasonality_mode='additive',
-                interval_width=0.80,  # 80% confidence intervals
-                changepoint_prior_scale=0.05  # Less aggressive changepoints
+            self.model, refitted = self.store.get_or_fit(
+                class_id, training_config(days_back), data_watermark(training_data),
+                lambda: fit_prophet(training_data)
             )
             
-            # Add custom seasonalities
-            self.model.add_seasonality(
-                name='school_term',
-                period=180,  # Approximate school term length
-                fourier_order=3
-            )
-            
-            # Fit the model
-            self.model.fit(training_data)
-            
             self.is_trained = True
+            self.trained_class_id = class_id
             self.last_training_date = datetime.now()
             
-            logger.info("✅ Model training completed successfully")
+            logger.info("✅ Model training completed successfully" if refitted
+                        else "✅ Loaded stored model (no attendance changes since its fit)")
             return True
             
         except Exception as e:
@@ -192,7 +197,7 @@ class AttendanceForecastModel:
             dict: Forecast results with dates, values, and confidence intervals
         """
         try:
-            if not self.is_trained:
+            if not self.is_trained or self.trained_class_id != class_id:
                 logger.info("🔄 Model not trained. Training now...")
                 if not self.train_model(class_id=class_id):
                     raise Exception("Model training failed")
@@ -203,32 +208,21 @@ class AttendanceForecastModel:
             future = self.model.make_future_dataframe(periods=periods)
             
             # Generate forecast
-            forecast = self.model.predict(future)
+            forecast = predict(self.model, future)
             
             # Extract forecast data
             forecast_data = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(periods)
             
             # Format results
-            results = {
-                'dates': forecast_data['ds'].dt.strftime('%Y-%m-%d').tolist(),
-                'predicted_attendance': np.maximum(0, np.minimum(100, forecast_data['yhat'])).round(1).tolist(),
-                'lower_bound': np.maximum(0, np.minimum(100, forecast_data['yhat_lower'])).round(1).tolist(),
-                'upper_bound': np.maximum(0, np.minimum(100, forecast_data['yhat_upper'])).round(1).tolist(),
-                'confidence_level': 80,
-                'model_info': {
+            results = format_forecast(
+                forecast_data['ds'], forecast_data['yhat'], forecast_data['yhat_lower'], forecast_data['yhat_upper'],
+                {
                     'training_date': self.last_training_date.isoformat() if self.last_training_date else None,
                     'periods_forecasted': periods,
                     'class_id': class_id
                 }
-            }
-            
-            # Calculate summary statistics
-            avg_forecast = np.mean(results['predicted_attendance'])
-            results['summary'] = {
-                'average_predicted_attendance': round(avg_forecast, 1),
-                'trend': 'increasing' if results['predicted_attendance'][-1] > results['predicted_attendance'][0] else 'decreasing',
-                'volatility': round(np.std(results['predicted_attendance']), 1)
-            }
+            )
+            avg_forecast = results['summary']['average_predicted_attendance']
             
             logger.info(f"✅ Forecast generated - Average: {avg_forecast:.1f}%")
             return results
@@ -316,8 +310,6 @@ class AttendanceForecastModel:
     def get_student_count(self, class_id=None):
         """Get total number of active students for reference"""
         try:
-            conn = self._get_db_connection()
-            
             query = "SELECT COUNT(*) as count FROM students WHERE is_active = 1"
             params = []
             
@@ -325,8 +317,8 @@ class AttendanceForecastModel:
                 query += " AND class_id = ?"
                 params.append(class_id)
             
-            result = pd.read_sql_query(query, conn, params=params)
-            conn.close()
+            with self._get_db_connection() as conn:
+                result = pd.read_sql_query(query, conn, params=params)
             
             return result['count'].iloc[0] if not result.empty else 0
             
@@ -337,6 +329,85 @@ class AttendanceForecastModel:
 
 # ==================== UTILITY FUNCTIONS ====================
 
+def class_name_column(conn):
+    """Name column of the classes table: 'name' (models.py) or 'class_name' (app.py)"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(classes)")}
+    return 'name' if 'name' in columns else 'class_name'
+
+
+def training_config(days_back):
+    """Stored-model key for a training window (with the class id and data watermark)"""
+    return {
+        'model': 'attendance_rate',
+        'days_back': days_back,
+        'prophet': PROPHET_PARAMS,
+        'seasonalities': [SCHOOL_TERM_SEASONALITY]
+    }
+
+
+def fit_prophet(training_data):
+    """
+    Fit a Prophet model with the AttendanceForecastModel settings
+    
+    Args:
+        training_data (pandas.DataFrame): 'ds'/'y' frame from load_attendance_data
+    
+    Returns:
+        Prophet: Fitted model
+    """
+    from prophet import Prophet  # cmdstan loads on the first fit, not when this module is imported
+
+    model = Prophet(**PROPHET_PARAMS)
+    model.add_seasonality(**SCHOOL_TERM_SEASONALITY)  # Approximate school term length
+    model.fit(training_data)
+    return model
+
+
+def format_forecast(dates, yhat, lower, upper, model_info):
+    """
+    Result dict of generate_forecast (rates clipped to 0-100, 80% interval)
+    
+    Args:
+        dates (pandas.Series): Forecast days
+        yhat, lower, upper: Predicted attendance % and interval bounds, one per day
+        model_info (dict): Describes the model that produced the forecast
+    
+    Returns:
+        dict: dates, predicted_attendance, lower_bound, upper_bound, confidence_level, model_info and summary
+    """
+    results = {
+        'dates': pd.Series(dates).dt.strftime('%Y-%m-%d').tolist(),
+        'predicted_attendance': np.maximum(0, np.minimum(100, yhat)).round(1).tolist(),
+        'lower_bound': np.maximum(0, np.minimum(100, lower)).round(1).tolist(),
+        'upper_bound': np.maximum(0, np.minimum(100, upper)).round(1).tolist(),
+        'confidence_level': 80,
+        'model_info': model_info
+    }
+    
+    # Calculate summary statistics
+    avg_forecast = np.mean(results['predicted_attendance'])
+    results['summary'] = {
+        'average_predicted_attendance': round(avg_forecast, 1),
+        'trend': 'increasing' if results['predicted_attendance'][-1] > results['predicted_attendance'][0] else 'decreasing',
+        'volatility': round(np.std(results['predicted_attendance']), 1)
+    }
+    return results
+
+
+def predict(model, future):
+    """
+    model.predict with the interval sampling seeded, so predicting again from
+    the same fit gives the same bounds (and unchanged forecast rows are not rewritten)
+    """
+    # Seed for the call only: other users of the global RNG keep their sequence
+    state = np.random.get_state()
+    np.random.seed(INTERVAL_SEED)
+    try:
+        return model.predict(future)
+    finally:
+        np.random.set_state(state)
+
+
 def generate_forecast_report(class_id=None, periods=30):
     """
     Generate a complete forecast report
@@ -392,9 +463,8 @@ if __name__ == '__main__':
         model = AttendanceForecastModel()
         
         # Test database connection
-        conn = model._get_db_connection()
-        print("✅ Database connection successful")
-        conn.close()
+        with model._get_db_connection():
+            print("✅ Database connection successful")
         
         # Load sample data
         data = model.load_attendance_data(days_back=30)
@@ -0,0 +1,132 @@
+"""
+Debounced background refresh of the attendance forecast
+New attendance only marks the forecast dirty; a worker thread refits at most
+once per interval, so Prophet never runs on the scan path
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two refits
+DEFAULT_REFIT_INTERVAL = float(os.getenv('FORECAST_REFIT_SECONDS', '600'))
+
+
+class ForecastRefresher:
+    """Coalesces "attendance changed" signals into periodic forecast refits"""
+
+    def __init__(self, fit_fn, min_interval=DEFAULT_REFIT_INTERVAL, clock=time.monotonic):
+        """
+        Args:
+            fit_fn (callable): Refits and stores the forecast; runs on the worker thread
+            min_interval (float): Minimum seconds between the start of two refits
+            clock (callable): Monotonic time source (injectable for tests)
+        """
+        self.fit_fn = fit_fn
+        self.min_interval = min_interval
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._dirty_since = None
+        self._last_fit_started = None
+
+        # Metrics
+        self.signals = 0
+        self.fits = 0
+        self.failures = 0
+        self.last_fit_seconds = None
+        self.last_fit_at = None
+        self.last_error = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='forecast-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the worker; a refit already in progress is allowed to finish"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def mark_dirty(self):
+        """Record that attendance changed since the last fit; never blocks on a fit"""
+        with self._cond:
+            self.signals += 1
+            if self._dirty_since is None:
+                self._dirty_since = self.clock()
+            self._cond.notify_all()
+
+    def _next_fit_delay(self):
+        if self._last_fit_started is None:
+            return 0.0
+        return self._last_fit_started + self.min_interval - self.clock()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Sleep until something is dirty and the interval has elapsed
+                while self._running:
+                    if self._dirty_since is None:
+                        self._cond.wait()
+                        continue
+                    delay = self._next_fit_delay()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                if not self._running:
+                    return
+                # Signals arriving during the fit make the next fit due
+                dirty_since, self._dirty_since = self._dirty_since, None
+                self._last_fit_started = self.clock()
+            if not self._fit():
+                # Still behind the data: retry once the interval has elapsed, keeping the oldest timestamp
+                with self._cond:
+                    if self._dirty_since is None or dirty_since < self._dirty_since:
+                        self._dirty_since = dirty_since
+
+    def _fit(self):
+        """Run fit_fn once; True if it succeeded"""
+        started = time.perf_counter()
+        try:
+            self.fit_fn()
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"❌ Forecast refresh failed: {e}")
+            return False
+        else:
+            self.fits += 1
+            self.last_fit_at = time.time()
+            logger.info(f"✅ Forecast refreshed in {time.perf_counter() - started:.2f}s")
+            return True
+        finally:
+            self.last_fit_seconds = round(time.perf_counter() - started, 3)
+
+    def staleness(self):
+        """Seconds the stored forecast has been behind the attendance data (0 if current)"""
+        dirty_since = self._dirty_since
+        return round(self.clock() - dirty_since, 1) if dirty_since is not None else 0.0
+
+    def stats(self):
+        """Refit counts, duration of the last refit and current staleness"""
+        return {
+            'min_interval_seconds': self.min_interval,
+            'signals': self.signals,
+            'fits': self.fits,
+            'failures': self.failures,
+            'last_fit_seconds': self.last_fit_seconds,
+            'last_fit_at': self.last_fit_at,
+            'last_error': self.last_error,
+            'dirty': self._dirty_since is not None,
+            'staleness_seconds': self.staleness()
+        }
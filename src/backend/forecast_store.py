@@ -0,0 +1,205 @@
+"""
+On-disk registry of fitted forecast models
+Fitted Prophet models are serialized to JSON and keyed by (class_id,
+training-configuration hash, data watermark), so a process that needs a
+forecast loads the last fit instead of refitting. A new fit happens only when
+the recent attendance data differs from the stored watermark: a new day or
+changed counts for a day already seen.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from database import resolve_db_path
+
+logger = logging.getLogger(__name__)
+
+# Days up to the last one whose values the watermark covers; older days only
+# drop out of sliding windows, which is no reason to refit
+WATERMARK_DAYS = 28
+
+
+def default_model_dir():
+    """FORECAST_MODEL_DIR, else forecast_models/ next to the database"""
+    return os.getenv('FORECAST_MODEL_DIR') or os.path.join(os.path.dirname(resolve_db_path()), 'forecast_models')
+
+
+def config_hash(config):
+    """Short stable hash of a training configuration (window, model parameters)"""
+    raw = json.dumps(config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+def data_watermark(history, days=WATERMARK_DAYS):
+    """
+    Watermark of a training frame: last day and a hash of the recent values
+
+    Args:
+        history (pandas.DataFrame): Training data with 'ds' and 'y' columns
+        days (int, optional): Days up to the last one to hash; None hashes the whole frame
+
+    Returns:
+        str: e.g. '2025-01-06_3f2a9c01b7de'; changes when a day arrives or a
+        recent day's value changes, not when old days leave the window
+    """
+    if history is None or history.empty:
+        return 'empty_0'
+    last = history['ds'].max()
+    recent = history if days is None else history[history['ds'] > last - pd.Timedelta(days=days)]
+    values = pd.util.hash_pandas_object(recent[['ds', 'y']].sort_values('ds'), index=False)
+    return f"{last:%Y-%m-%d}_{hashlib.sha1(values.to_numpy().tobytes()).hexdigest()[:12]}"
+
+
+def model_version(config, watermark):
+    """Identifier of one fit, stored with the forecast rows it produced"""
+    return f"{config_hash(config)}@{watermark}"
+
+
+def _prophet_serializer():
+    # Imported on first save/load so the registry itself does not pull in cmdstan
+    from prophet.serialize import model_from_json, model_to_json
+    return model_to_json, model_from_json
+
+
+class ForecastModelStore:
+    """
+    Fitted models on disk, one file per (class, configuration)
+
+    A file holds the newest fit for its key; saving a fit for a later
+    watermark replaces it. Models are read from disk lazily, on the first
+    get_or_fit() for their key, and kept in memory after that.
+    """
+
+    def __init__(self, directory=None, serializer=None):
+        """
+        Args:
+            directory (str, optional): Folder for the model files (default_model_dir() on first use)
+            serializer (tuple, optional): (to_json, from_json); Prophet's JSON serializer by default
+        """
+        self._directory = directory
+        self._serializer = serializer
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.fits = 0
+        self.last_fit_seconds = None
+
+    @property
+    def directory(self):
+        if self._directory is None:
+            self._directory = default_model_dir()
+        return self._directory
+
+    @property
+    def serializer(self):
+        if self._serializer is None:
+            self._serializer = _prophet_serializer()
+        return self._serializer
+
+    def path_for(self, class_id, config):
+        """Model file for a class (None = whole school) and training configuration"""
+        scope = 'all' if class_id is None else f"class-{class_id}"
+        return os.path.join(self.directory, f"{scope}-{config_hash(config)}.json")
+
+    def load(self, class_id, config, watermark):
+        """
+        Stored model for the key, or None if missing or older than watermark
+
+        Args:
+            class_id (int or None): Class the model was fitted for
+            config (dict): Training configuration
+            watermark (str): Current data watermark (see data_watermark)
+        """
+        path = self.path_for(class_id, config)
+        cached = self._loaded.get(path)
+        if cached and cached[0] == watermark:
+            self.memory_hits += 1
+            return cached[1]
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable forecast model {path}: {e}")
+            return None
+        if stored.get('watermark') != watermark:
+            return None
+
+        model = self.serializer[1](stored['model'])
+        self._loaded[path] = (watermark, model)
+        self.disk_hits += 1
+        return model
+
+    def save(self, class_id, config, watermark, model):
+        """Write a fitted model, replacing any older fit for the same key"""
+        path = self.path_for(class_id, config)
+        os.makedirs(self.directory, exist_ok=True)
+        stored = {
+            'class_id': class_id,
+            'config': config,
+            'watermark': watermark,
+            'fitted_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'model': self.serializer[0](model)
+        }
+        # Write then rename so readers in other processes never see half a file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, default=str)
+        os.replace(tmp_path, path)
+        self._loaded[path] = (watermark, model)
+
+    def get_or_fit(self, class_id, config, watermark, fit):
+        """
+        Stored model for the key, fitting and saving one when it is missing or stale
+
+        Args:
+            class_id (int or None): Class the model is for
+            config (dict): Training configuration (part of the key)
+            watermark (str): Current data watermark
+            fit (callable): Returns a freshly fitted model
+
+        Returns:
+            tuple: (model, refitted)
+        """
+        model = self.load(class_id, config, watermark)
+        if model is not None:
+            return model, False
+        with self._lock:
+            # Another thread may have fitted it while we waited
+            model = self.load(class_id, config, watermark)
+            if model is not None:
+                return model, False
+            started = time.perf_counter()
+            model = fit()
+            self.fits += 1
+            self.last_fit_seconds = round(time.perf_counter() - started, 3)
+            try:
+                self.save(class_id, config, watermark, model)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not store forecast model: {e}")
+            logger.info(f"✅ Fitted forecast model ({'all' if class_id is None else class_id}, "
+                        f"{watermark}) in {self.last_fit_seconds}s")
+            return model, True
+
+    def stats(self):
+        """Cache hits, fits and the duration of the last fit"""
+        return {
+            'directory': self.directory,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'fits': self.fits,
+            'last_fit_seconds': self.last_fit_seconds
+        }
+
+
+model_store = ForecastModelStore()
@@ -0,0 +1,119 @@
+"""
+Persistence of forecast rows in attendance_forecast
+Only horizon rows whose values or model version differ from what is stored
+are written, with one executemany per call; a forecast recomputed from an
+unchanged model writes nothing
+"""
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+VALUE_COLUMNS = ['predicted_present', 'predicted_rate', 'yhat_lower', 'yhat_upper']
+
+SELECT_SQL = """
+    SELECT forecast_date, predicted_present, predicted_rate, yhat_lower, yhat_upper, model_version
+    FROM attendance_forecast
+    WHERE class_id = ? AND forecast_date >= ? AND forecast_date <= ?
+"""
+
+UPSERT_SQL = """
+    INSERT INTO attendance_forecast
+        (class_id, forecast_date, predicted_present, predicted_rate, yhat_lower, yhat_upper, model_version, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(class_id, forecast_date) DO UPDATE SET
+        predicted_present = excluded.predicted_present,
+        predicted_rate = excluded.predicted_rate,
+        yhat_lower = excluded.yhat_lower,
+        yhat_upper = excluded.yhat_upper,
+        model_version = excluded.model_version,
+        created_at = excluded.created_at
+"""
+
+
+def forecast_frame(dates, present, rate=None, lower=None, upper=None):
+    """
+    Rows as stored: dates as 'YYYY-MM-DD', head counts as integers, rate and bounds rounded
+
+    Args:
+        dates: Forecast days (datetime64 array/Series or ISO strings)
+        present: Predicted present head count
+        rate (optional): Predicted attendance %
+        lower, upper (optional): Head-count bounds of the uncertainty interval
+
+    Returns:
+        pandas.DataFrame: One row per day in the attendance_forecast column layout
+    """
+    size = len(dates)
+
+    def column(values, decimals):
+        if values is None:
+            return np.full(size, np.nan)
+        return np.round(np.asarray(values, dtype=float), decimals)
+
+    return pd.DataFrame({
+        'forecast_date': pd.to_datetime(pd.Series(dates)).dt.strftime('%Y-%m-%d').to_numpy(),
+        'predicted_present': np.maximum(np.rint(np.asarray(present, dtype=float)), 0).astype(np.int64),
+        'predicted_rate': column(rate, 1),
+        'yhat_lower': np.maximum(column(lower, 2), 0),
+        'yhat_upper': np.maximum(column(upper, 2), 0)
+    })
+
+
+def changed_rows(frame, stored, model_version):
+    """
+    Boolean mask of frame rows that are missing from stored or differ from it
+
+    Args:
+        frame (pandas.DataFrame): New rows (forecast_frame)
+        stored (pandas.DataFrame): Rows already in the table for the same class and days
+        model_version (str): Version the new rows come from
+    """
+    merged = frame.merge(stored, on='forecast_date', how='left', suffixes=('', '_stored'), indicator=True)
+    changed = (merged['_merge'] == 'left_only').to_numpy(copy=True)
+    for column in VALUE_COLUMNS:
+        new = merged[column].to_numpy(dtype=float)
+        old = pd.to_numeric(merged[f'{column}_stored'], errors='coerce').to_numpy(dtype=float)
+        changed |= ~np.isclose(new, old, rtol=0, atol=1e-6, equal_nan=True)
+    changed |= (merged['model_version'] != model_version).to_numpy()
+    return changed
+
+
+def write_forecast(conn, class_id, frame, model_version):
+    """
+    Upsert the new or changed rows of one class's forecast
+
+    Runs inside the caller's transaction; the caller commits.
+
+    Args:
+        conn: DB-API connection (sqlite3, or session.connection().connection)
+        class_id (int): Class the forecast is for (0 = whole school)
+        frame (pandas.DataFrame): Horizon rows from forecast_frame
+        model_version (str): Identifies the fitted model (forecast_store.model_version)
+
+    Returns:
+        dict: written and unchanged row counts
+    """
+    if frame.empty:
+        return {'written': 0, 'unchanged': 0}
+    cursor = conn.execute(SELECT_SQL, (class_id, frame['forecast_date'].min(), frame['forecast_date'].max()))
+    stored = pd.DataFrame(cursor.fetchall(), columns=['forecast_date'] + VALUE_COLUMNS + ['model_version'])
+
+    mask = changed_rows(frame, stored, model_version)
+    updates = frame[mask]
+    if len(updates):
+        size = len(updates)
+        rows = zip(
+            np.full(size, class_id).tolist(),
+            updates['forecast_date'].tolist(),
+            updates['predicted_present'].tolist(),
+            *[pd.Series(updates[column]).astype(object).where(updates[column].notna(), None).tolist()
+              for column in VALUE_COLUMNS[1:]],
+            [model_version] * size,
+            [datetime.now().isoformat(sep=' ')] * size
+        )
+        conn.executemany(UPSERT_SQL, list(rows))
+    return {'written': int(mask.sum()), 'unchanged': int(len(frame) - mask.sum())}
@@ -0,0 +1,459 @@
+"""
+Versioned schema migrations for the AttenSync SQLite database
+db.create_all() only creates missing tables; changes to existing tables are
+applied here, in order, and recorded in schema_migrations
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register a migration function; versions must be unique and increasing"""
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+
+def table_exists(conn, table):
+    return conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': table}
+    ).first() is not None
+
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+
+
+def add_column(conn, table, column, ddl):
+    """Add a column unless the table already has it (e.g. created by create_all)"""
+    if table_exists(conn, table) and column not in table_columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def has_unique_index(conn, table, columns):
+    """True if some unique index (including a UNIQUE constraint) covers exactly columns"""
+    for row in conn.execute(text(f"PRAGMA index_list({table})")).fetchall():
+        if not row[2]:
+            continue
+        indexed = [info[2] for info in conn.execute(text(f"PRAGMA index_info('{row[1]}')"))]
+        if indexed == list(columns):
+            return True
+    return False
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """Create an index on an existing table; tables created later get it from the models"""
+    if not table_exists(conn, table):
+        return
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+@migration(1, 'rfid_scan_logs.reader_id for idempotent spool replay')
+def add_scan_reader_id(conn):
+    add_column(conn, 'rfid_scan_logs', 'reader_id', 'VARCHAR(50)')
+
+
+@migration(2, 'unique attendance per student and day; indexes for hot attendance and scan queries')
+def add_attendance_indexes(conn):
+    if table_exists(conn, 'attendance') and not has_unique_index(conn, 'attendance', ['student_id', 'attendance_date']):
+        # Keep the latest row of each duplicated (student, day) and repoint scan logs at it
+        conn.execute(text("""
+            CREATE TEMP TABLE attendance_duplicates AS
+            SELECT a.id AS id, k.keep_id AS keep_id
+            FROM attendance a
+            JOIN (SELECT student_id, attendance_date, MAX(id) AS keep_id
+                  FROM attendance GROUP BY student_id, attendance_date
+                  HAVING COUNT(*) > 1) k
+              ON a.student_id = k.student_id AND a.attendance_date = k.attendance_date
+            WHERE a.id != k.keep_id
+        """))
+        removed = conn.execute(text("SELECT COUNT(*) FROM attendance_duplicates")).scalar()
+        if removed:
+            if table_exists(conn, 'rfid_scan_logs'):
+                conn.execute(text("""
+                    UPDATE rfid_scan_logs
+                    SET attendance_id = (SELECT keep_id FROM attendance_duplicates d
+                                         WHERE d.id = rfid_scan_logs.attendance_id)
+                    WHERE attendance_id IN (SELECT id FROM attendance_duplicates)
+                """))
+            conn.execute(text("DELETE FROM attendance WHERE id IN (SELECT id FROM attendance_duplicates)"))
+            logger.warning(f"Removed {removed} duplicate attendance rows before adding the unique index")
+        conn.execute(text("DROP TABLE attendance_duplicates"))
+        create_index(conn, 'ux_attendance_student_date', 'attendance', ['student_id', 'attendance_date'], unique=True)
+
+    create_index(conn, 'ix_attendance_date_status', 'attendance', ['attendance_date', 'status'])
+    create_index(conn, 'ix_attendance_class_date', 'attendance', ['class_id', 'attendance_date'])
+    create_index(conn, 'ix_rfid_scan_logs_scan_time', 'rfid_scan_logs', ['scan_time'])
+    create_index(conn, 'ix_rfid_scan_logs_rfid_tag', 'rfid_scan_logs', ['rfid_tag'])
+    conn.execute(text("ANALYZE"))
+
+
+@migration(3, 'attendance audit columns written by the single-statement upsert')
+def add_attendance_upsert_columns(conn):
+    # app.py's Attendance model never declared these, so older databases may lack them
+    add_column(conn, 'attendance', 'notes', 'TEXT')
+    add_column(conn, 'attendance', 'confidence_score', 'FLOAT')
+    add_column(conn, 'attendance', 'created_at', 'DATETIME')
+    add_column(conn, 'attendance', 'updated_at', 'DATETIME')
+
+
+SUMMARY_DELTA = """
+    INSERT INTO daily_attendance_summary
+        (attendance_date, class_id, present_count, absent_count, late_count, total_count)
+    VALUES ({row}.attendance_date, {row}.class_id, {sign} * ({row}.status = 'present'),
+            {sign} * ({row}.status = 'absent'), {sign} * ({row}.status = 'late'), {sign})
+    ON CONFLICT(attendance_date, class_id) DO UPDATE SET
+        present_count = present_count + excluded.present_count,
+        absent_count = absent_count + excluded.absent_count,
+        late_count = late_count + excluded.late_count,
+        total_count = total_count + excluded.total_count;
+"""
+
+SUMMARY_TRIGGERS = {
+    'trg_attendance_summary_insert': "AFTER INSERT ON attendance BEGIN {add} END",
+    'trg_attendance_summary_delete': "AFTER DELETE ON attendance BEGIN {remove} {prune} END",
+    'trg_attendance_summary_update': (
+        "AFTER UPDATE OF attendance_date, class_id, status ON attendance BEGIN {remove} {add} {prune} END"
+    ),
+}
+
+
+@migration(4, 'daily_attendance_summary kept up to date by triggers on attendance')
+def add_daily_attendance_summary(conn):
+    if not table_exists(conn, 'attendance'):
+        return
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS daily_attendance_summary (
+            attendance_date DATE NOT NULL,
+            class_id INTEGER NOT NULL,
+            present_count INTEGER NOT NULL DEFAULT 0,
+            absent_count INTEGER NOT NULL DEFAULT 0,
+            late_count INTEGER NOT NULL DEFAULT 0,
+            total_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (attendance_date, class_id)
+        )
+    """))
+    # Triggers see every writer (ORM, raw SQL, upserts, other processes), so
+    # the summary cannot drift the way application-side counters could
+    add = SUMMARY_DELTA.format(row='NEW', sign=1)
+    remove = SUMMARY_DELTA.format(row='OLD', sign=-1)
+    prune = ("DELETE FROM daily_attendance_summary WHERE attendance_date = OLD.attendance_date "
+             "AND class_id = OLD.class_id AND total_count <= 0;")
+    for name, body in SUMMARY_TRIGGERS.items():
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TRIGGER {name} " + body.format(add=add, remove=remove, prune=prune)))
+
+    # Backfill from the rows already written (the table may have been created empty by create_all)
+    conn.execute(text("DELETE FROM daily_attendance_summary"))
+    conn.execute(text("""
+        INSERT INTO daily_attendance_summary
+            (attendance_date, class_id, present_count, absent_count, late_count, total_count)
+        SELECT attendance_date, class_id,
+               SUM(status = 'present'), SUM(status = 'absent'), SUM(status = 'late'), COUNT(*)
+        FROM attendance GROUP BY attendance_date, class_id
+    """))
+
+
+@migration(5, 'indexes matching the keyset pagination order of the attendance and student listings')
+def add_keyset_pagination_indexes(conn):
+    # Listings seek on (sort key, id); with id in the index SQLite walks it in
+    # order and stops after one page instead of sorting every matching row
+    create_index(conn, 'ix_attendance_date_id', 'attendance', ['attendance_date', 'id'])
+    if table_exists(conn, 'students') and 'roll_number' in table_columns(conn, 'students'):
+        create_index(conn, 'ix_students_roll_id', 'students', ['roll_number', 'id'])
+        create_index(conn, 'ix_students_class_roll_id', 'students', ['class_id', 'roll_number', 'id'])
+
+
+STUDENT_SEARCH_COLUMNS = ['full_name', 'roll_number', 'rfid_tag']
+
+STUDENT_SEARCH_TRIGGERS = {
+    'trg_students_fts_insert': "AFTER INSERT ON students BEGIN {add} END",
+    'trg_students_fts_delete': "AFTER DELETE ON students BEGIN {remove} END",
+    'trg_students_fts_update': "AFTER UPDATE OF full_name, roll_number, rfid_tag ON students BEGIN {remove} {add} END",
+}
+
+
+@migration(6, 'students_fts trigram index over student names, roll numbers and RFID tags')
+def add_student_search_index(conn):
+    if not table_exists(conn, 'students') or not set(STUDENT_SEARCH_COLUMNS) <= table_columns(conn, 'students'):
+        return
+    columns = ', '.join(STUDENT_SEARCH_COLUMNS)
+    try:
+        # External-content table: the index stores trigrams only, the text stays in students
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS students_fts USING fts5("
+            f"{columns}, content='students', content_rowid='id', tokenize='trigram')"
+        ))
+    except OperationalError as e:
+        # The trigram tokenizer needs SQLite 3.34+; student_search falls back to LIKE scans
+        logger.warning(f"Student search index not created: {e}")
+        return
+    add = f"INSERT INTO students_fts (rowid, {columns}) VALUES (NEW.id, NEW.{', NEW.'.join(STUDENT_SEARCH_COLUMNS)});"
+    remove = (f"INSERT INTO students_fts (students_fts, rowid, {columns}) "
+              f"VALUES ('delete', OLD.id, OLD.{', OLD.'.join(STUDENT_SEARCH_COLUMNS)});")
+    for name, body in STUDENT_SEARCH_TRIGGERS.items():
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(f"CREATE TRIGGER {name} " + body.format(add=add, remove=remove)))
+    conn.execute(text("INSERT INTO students_fts (students_fts) VALUES ('rebuild')"))
+
+
+# class_id 0 is the whole-school forecast (UNIQUE treats NULLs as distinct,
+# so a NULL class would let INSERT OR REPLACE pile up duplicate days)
+FORECAST_TABLE = """
+    CREATE TABLE {name} (
+        id INTEGER PRIMARY KEY,
+        class_id INTEGER NOT NULL DEFAULT 0,
+        forecast_date DATE NOT NULL,
+        predicted_present INTEGER NOT NULL,
+        predicted_rate FLOAT,
+        created_at DATETIME,
+        UNIQUE (class_id, forecast_date)
+    )
+"""
+
+
+@migration(7, 'attendance_forecast keyed by (class_id, forecast_date) for per-class forecasts')
+def add_forecast_class_id(conn):
+    if not table_exists(conn, 'attendance_forecast'):
+        # Only app.py's models declare the table; the batch forecaster writes it on any database
+        conn.execute(text(FORECAST_TABLE.format(name='attendance_forecast')))
+        return
+    if has_unique_index(conn, 'attendance_forecast', ['class_id', 'forecast_date']):
+        add_column(conn, 'attendance_forecast', 'predicted_rate', 'FLOAT')
+        return
+    # forecast_date was UNIQUE on its own; SQLite cannot drop a constraint, so rebuild the table
+    conn.execute(text(FORECAST_TABLE.format(name='attendance_forecast_new')))
+    conn.execute(text("""
+        INSERT INTO attendance_forecast_new (id, forecast_date, predicted_present, created_at)
+        SELECT id, forecast_date, predicted_present, created_at FROM attendance_forecast
+    """))
+    conn.execute(text("DROP TABLE attendance_forecast"))
+    conn.execute(text("ALTER TABLE attendance_forecast_new RENAME TO attendance_forecast"))
+
+
+@migration(8, 'attendance_forecast uncertainty bounds and the model version that produced each row')
+def add_forecast_bounds(conn):
+    add_column(conn, 'attendance_forecast', 'yhat_lower', 'FLOAT')
+    add_column(conn, 'attendance_forecast', 'yhat_upper', 'FLOAT')
+    add_column(conn, 'attendance_forecast', 'model_version', 'VARCHAR(40)')
+
+
+@migration(9, 'forecast_eval_folds and forecast_accuracy for rolling-origin forecast evaluation')
+def add_forecast_evaluation_tables(conn):
+    # One row per scored forecast day of a fold; (config, watermark) tells whether the fold is still current
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS forecast_eval_folds (
+            class_id INTEGER NOT NULL,
+            method VARCHAR(20) NOT NULL,
+            origin DATE NOT NULL,
+            horizon INTEGER NOT NULL,
+            config VARCHAR(12) NOT NULL,
+            watermark VARCHAR(20) NOT NULL,
+            actual FLOAT NOT NULL,
+            predicted FLOAT NOT NULL,
+            lower FLOAT NOT NULL,
+            upper FLOAT NOT NULL,
+            PRIMARY KEY (class_id, method, origin, horizon)
+        )
+    """))
+    # Latest scores, read by /api/trends; horizon 0 holds the scores over all horizons
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS forecast_accuracy (
+            class_id INTEGER NOT NULL,
+            method VARCHAR(20) NOT NULL,
+            horizon INTEGER NOT NULL,
+            mae FLOAT,
+            mape FLOAT,
+            coverage FLOAT,
+            points INTEGER NOT NULL,
+            folds INTEGER NOT NULL,
+            evaluated_at DATETIME NOT NULL,
+            PRIMARY KEY (class_id, method, horizon)
+        )
+    """))
+
+
+def run_migrations(engine):
+    """
+    Apply pending migrations, each in its own transaction
+
+    Args:
+        engine: SQLAlchemy engine (db.engine)
+
+    Returns:
+        list[int]: Versions applied by this call
+    """
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at TEXT NOT NULL)"
+        ))
+        done = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+    applied = []
+    for version, description, func in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            func(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {'v': version, 'd': description, 't': datetime.now().isoformat()}
+            )
+        applied.append(version)
+        logger.info(f"Applied migration {version}: {description}")
+    return applied
+
+
+# ==================== QUERY PLAN CHECKS ====================
+
+# Representative forms of the hot queries in backend.py, app.py and
+# forecast_model.load_attendance_data (aggregates read daily_attendance_summary), with the table that must not be
+# read by a full scan. They check that the migrations give an old database the
+# indexes; the statements the endpoints really run are checked by
+# check_statement_plans in the endpoint tests.
+HOT_QUERIES = [
+    ('scan: attendance already marked', 'attendance', """
+        SELECT id, status FROM attendance WHERE student_id = :student_id AND attendance_date = :day
+    """),
+    ('dashboard: present today', 'daily_attendance_summary', """
+        SELECT SUM(present_count) FROM daily_attendance_summary WHERE attendance_date = :day
+    """),
+    ('dashboard: weekly present', 'daily_attendance_summary', """
+        SELECT attendance_date, SUM(present_count) FROM daily_attendance_summary
+        WHERE attendance_date >= :start AND attendance_date <= :day
+        GROUP BY attendance_date
+    """),
+    ('class attendance for a day', 'attendance', """
+        SELECT * FROM attendance WHERE class_id = :class_id AND attendance_date = :day
+    """),
+    ('today\'s rfid attendance', 'attendance', """
+        SELECT * FROM attendance WHERE attendance_date = :day AND method = 'rfid'
+    """),
+    ('forecast: load attendance data', 'd', """
+        SELECT d.attendance_date AS date, d.present_count, d.total_count AS total_marked,
+               d.class_id, c.id AS class_ref
+        FROM daily_attendance_summary d
+        JOIN classes c ON d.class_id = c.id
+        WHERE d.attendance_date >= :start AND d.attendance_date <= :day
+        ORDER BY d.attendance_date
+    """),
+    ('rfid: recent scans', 'r', """
+        SELECT r.rfid_tag, r.scan_time, r.status, r.student_id, r.id,
+               COALESCE(r.student_name, s.full_name) AS student_name
+        FROM rfid_scan_logs r
+        LEFT JOIN students s ON r.student_id = s.id
+        WHERE r.scan_time >= :start
+        ORDER BY r.scan_time DESC LIMIT 50
+    """),
+    ('rfid: scans for a tag', 'rfid_scan_logs', """
+        SELECT * FROM rfid_scan_logs WHERE rfid_tag = :tag ORDER BY id DESC LIMIT 50
+    """),
+    ('attendance listing: next page', 'attendance', """
+        SELECT * FROM attendance WHERE (attendance_date, id) < (:day, :after_id)
+        ORDER BY attendance_date DESC, id DESC LIMIT 101
+    """),
+    ('attendance listing: next page for a class', 'attendance', """
+        SELECT * FROM attendance WHERE class_id = :class_id AND (attendance_date, id) < (:day, :after_id)
+        ORDER BY attendance_date DESC, id DESC LIMIT 101
+    """),
+    ('students listing: next page', 'students', """
+        SELECT * FROM students WHERE is_active = 1 AND (roll_number, id) > (:roll, :after_id)
+        ORDER BY roll_number, id LIMIT 51
+    """),
+    ('students listing: next page for a class', 'students', """
+        SELECT * FROM students WHERE is_active = 1 AND class_id = :class_id AND (roll_number, id) > (:roll, :after_id)
+        ORDER BY roll_number, id LIMIT 51
+    """),
+]
+
+PLAN_PARAMS = {
+    'student_id': 1, 'class_id': 1, 'day': '2025-01-06', 'start': '2024-12-06', 'tag': 'E4F8E400',
+    'after_id': 100, 'roll': '05'
+}
+
+
+def explain(conn, sql, params=None):
+    """EXPLAIN QUERY PLAN detail lines for a query"""
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params or PLAN_PARAMS).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Tables (or their aliases) that a plan reads by a full scan"""
+    # "SCAN t" alone is a full table scan; "SCAN t USING ... INDEX" walks an index
+    return [line.split()[1] for line in plan
+            if line.startswith('SCAN ') and 'INDEX' not in line
+            and not line.startswith(('SCAN CONSTANT ROW', 'SCAN ('))]
+
+
+def sorts_in_memory(plan):
+    """True if an ORDER BY needed a temp B-tree"""
+    return any(line.startswith('USE TEMP B-TREE FOR') and 'ORDER BY' in line for line in plan)
+
+
+def check_query_plans(engine):
+    """
+    Verify that the hot queries are answered through an index
+
+    Returns:
+        list[dict]: name, table, plan, uses_index and sorts_in_memory (ORDER BY
+        needed a temp B-tree) for every query in HOT_QUERIES
+    """
+    report = []
+    with engine.connect() as conn:
+        for name, table, sql in HOT_QUERIES:
+            plan = explain(conn, sql)
+            report.append({'name': name, 'table': table, 'plan': plan, 'uses_index': table not in full_scans(plan),
+                           'sorts_in_memory': sorts_in_memory(plan)})
+    return report
+
+
+# Tables that grow with every school day; no request may read them by a full scan
+WATCHED_TABLES = ('attendance', 'rfid_scan_logs', 'daily_attendance_summary')
+
+
+def check_statement_plans(engine, statements, tables=WATCHED_TABLES):
+    """
+    Plans of statements captured while serving requests (see tests/test_query_counts.py)
+
+    Checks the SQL the endpoints actually ran, so it cannot drift from the code
+    the way the hand-written HOT_QUERIES can.
+
+    Args:
+        engine: SQLAlchemy engine the statements ran on
+        statements (list): (sql, parameters) pairs from a before_cursor_execute listener
+        tables (tuple): Tables that must not be scanned in full
+
+    Returns:
+        list[dict]: sql, plan, full_scans (of the watched tables) and sorts_in_memory (of a
+        query reading a watched table) per distinct SELECT
+    """
+    report = []
+    seen = set()
+    with engine.connect() as conn:
+        for sql, parameters in statements:
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')) or sql in seen:
+                continue
+            seen.add(sql)
+            plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+            # ORM aliases a table as <table>_<n>
+            read = {line.split()[1] for line in plan if line.startswith(('SCAN ', 'SEARCH '))}
+            watched = {name for name in read if name in tables or name.rsplit('_', 1)[0] in tables}
+            report.append({
+                'sql': sql, 'plan': plan,
+                'full_scans': [name for name in full_scans(plan) if name in watched],
+                # Sorting a few classes or users in memory is fine; sorting attendance rows is not
+                'sorts_in_memory': bool(watched) and sorts_in_memory(plan)
+            })
+    return report
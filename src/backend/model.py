@@ -1,8 +1,10 @@
 import pandas as pd
 from prophet import Prophet
 import matplotlib.pyplot as plt
-from sqlalchemy import func, text
-from datetime import datetime
+from sqlalchemy import func
+from forecast_model import predict
+from forecast_store import data_watermark, model_store, model_version
+from forecast_writer import forecast_frame, write_forecast
 
 def generate_forecast(filename):
     """
@@ -68,35 +70,41 @@ def generate_forecast(filename):
         print(f"An error occurred in the forecasting process: {e}")
         return None, None, None
 
-def generate_forecast_from_db():
-    from app import db, Attendance
-    # Query attendance data from DB
+def generate_forecast_from_db(plot=True):
+    """
+    Args:
+        plot (bool): Also render the forecast figure; background refreshes skip it.
+    """
+    from app import db, DailyAttendanceSummary
+    # Daily present counts from the per-day summary (one row per day and class)
     data = db.session.query(
-        Attendance.attendance_date,
-        func.count().label('y')
-    ).filter(Attendance.status == 'present').group_by(Attendance.attendance_date).all()
+        DailyAttendanceSummary.attendance_date,
+        func.sum(DailyAttendanceSummary.present_count).label('y')
+    ).group_by(DailyAttendanceSummary.attendance_date).having(
+        func.sum(DailyAttendanceSummary.present_count) > 0
+    ).order_by(DailyAttendanceSummary.attendance_date).all()
     df = pd.DataFrame(data, columns=['ds', 'y'])
     if len(df) == 0:
         print('No attendance data for forecast.')
         return None, None, None
     df['ds'] = pd.to_datetime(df['ds'])
-    model = Prophet()
-    model.fit(df)
+    # Reuse the stored fit unless recent attendance data changed since it was made
+    config = {'model': 'daily_present', 'prophet': 'defaults'}
+    watermark = data_watermark(df)
+    model, refitted = model_store.get_or_fit(None, config, watermark, lambda: Prophet().fit(df))
+    if not refitted:
+        print('No attendance changes since the last fit; using the stored model.')
     future = model.make_future_dataframe(periods=7)
-    forecast = model.predict(future)
-    # Save forecast to DB
-    for _, row in forecast.iterrows():
-        date = row['ds'].date() if isinstance(row['ds'], datetime) else row['ds']
-        yhat = int(row['yhat'])
-        db.session.execute(
-            text("""
-            INSERT OR REPLACE INTO attendance_forecast (forecast_date, predicted_present)
-            VALUES (:date, :yhat)
-            """),
-            {'date': date, 'yhat': yhat}
-        )
+    forecast = predict(model, future)
+    # Save the horizon (days after the history) to DB; rows that did not change are skipped
+    horizon = forecast[forecast['ds'] > df['ds'].max()]
+    rows = forecast_frame(horizon['ds'], horizon['yhat'].to_numpy(),
+                          lower=horizon['yhat_lower'].to_numpy(), upper=horizon['yhat_upper'].to_numpy())
+    written = write_forecast(db.session.connection().connection, 0, rows, model_version(config, watermark))
     db.session.commit()
-    print('Forecast stored in DB.')
+    print(f"Forecast stored in DB ({written['written']} rows written, {written['unchanged']} unchanged).")
+    if not plot:
+        return forecast, None, None
     fig1 = model.plot(forecast, figsize=(10, 6))
     plt.title("7-Day Attendance Forecast", fontsize=18, fontweight='bold')
     plt.xlabel("Date", fontsize=14)
@@ -6,6 +6,8 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, date
 from werkzeug.security import generate_password_hash, check_password_hash
+from migrations import run_migrations
+import database  # noqa: F401 - applies the SQLite connection profile to the engine
 
 db = SQLAlchemy()
 
@@ -63,8 +65,13 @@ class Class(db.Model):
     students = db.relationship('Student', backref='class_info', lazy=True, cascade='all, delete-orphan')
     attendance_records = db.relationship('Attendance', backref='class_info', lazy=True)
     
-    def to_dict(self):
-        """Convert to dictionary for API responses"""
+    def to_dict(self, student_count=None):
+        """
+        Convert to dictionary for API responses
+
+        Args:
+            student_count (int, optional): Precomputed count; avoids loading self.students
+        """
         return {
             'id': self.id,
             'name': self.name,
@@ -74,7 +81,7 @@ class Class(db.Model):
             'teacher_name': self.teacher.full_name if self.teacher else None,
             'academic_year': self.academic_year,
             'is_active': self.is_active,
-            'student_count': len(self.students),
+            'student_count': len(self.students) if student_count is None else student_count,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -126,8 +133,48 @@ class Student(db.Model):
         
         return round((present_records / total_records) * 100, 2)
     
-    def to_dict(self):
-        """Convert to dictionary for API responses"""
+    @staticmethod
+    def attendance_percentages(student_ids, days=30):
+        """
+        Attendance percentage for many students with one grouped query
+
+        Args:
+            student_ids (list): Student ids to report on
+            days (int): Look-back window, as in get_attendance_percentage
+
+        Returns:
+            dict: student_id -> percentage (0.0 for students with no records)
+        """
+        from datetime import timedelta
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days)
+        percentages = dict.fromkeys(student_ids, 0.0)
+        if not percentages:
+            return percentages
+
+        rows = db.session.query(
+            Attendance.student_id,
+            db.func.count(Attendance.id),
+            db.func.sum(db.case((Attendance.status == 'present', 1), else_=0))
+        ).filter(
+            Attendance.student_id.in_(list(percentages)),
+            Attendance.attendance_date >= start_date,
+            Attendance.attendance_date <= end_date
+        ).group_by(Attendance.student_id).all()
+
+        for student_id, total, present in rows:
+            percentages[student_id] = round((present / total) * 100, 2)
+        return percentages
+    
+    def to_dict(self, attendance_percentage=None):
+        """
+        Convert to dictionary for API responses
+
+        Args:
+            attendance_percentage (float, optional): Precomputed by attendance_percentages()
+        """
+        if attendance_percentage is None:
+            attendance_percentage = self.get_attendance_percentage()
         return {
             'id': self.id,
             'roll_number': self.roll_number,
@@ -142,7 +189,7 @@ class Student(db.Model):
             'address': self.address,
             'is_active': self.is_active,
             'enrollment_date': self.enrollment_date.isoformat() if self.enrollment_date else None,
-            'attendance_percentage': self.get_attendance_percentage(),
+            'attendance_percentage': attendance_percentage,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -163,8 +210,13 @@ class Attendance(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Ensure one attendance record per student per day
-    __table_args__ = (db.UniqueConstraint('student_id', 'attendance_date', name='unique_attendance_per_day'),)
+    # Ensure one attendance record per student per day; the other indexes serve
+    # the dashboard (date, status) and per-class (class, date) queries
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'attendance_date', name='unique_attendance_per_day'),
+        db.Index('ix_attendance_date_status', 'attendance_date', 'status'),
+        db.Index('ix_attendance_class_date', 'class_id', 'attendance_date'),
+    )
     
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -187,6 +239,34 @@ class Attendance(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class DailyAttendanceSummary(db.Model):
+    """
+    Attendance counts per day and class
+
+    Maintained by triggers on the attendance table (migration 4), so it is
+    read-only from Python; readers that used to GROUP BY over attendance
+    scan one row per day and class here instead.
+    """
+    __tablename__ = 'daily_attendance_summary'
+
+    attendance_date = db.Column(db.Date, primary_key=True)
+    class_id = db.Column(db.Integer, primary_key=True)
+    present_count = db.Column(db.Integer, nullable=False, default=0)
+    absent_count = db.Column(db.Integer, nullable=False, default=0)
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    total_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        return {
+            'date': self.attendance_date.isoformat(),
+            'class_id': self.class_id,
+            'present': self.present_count,
+            'absent': self.absent_count,
+            'late': self.late_count,
+            'total': self.total_count
+        }
+
 class RFIDScanLog(db.Model):
     """Log of all RFID scans (including invalid ones)"""
     __tablename__ = 'rfid_scan_logs'
@@ -199,8 +279,14 @@ class RFIDScanLog(db.Model):
     attendance_id = db.Column(db.Integer, db.ForeignKey('attendance.id'), nullable=True)  # NULL if already marked
     status = db.Column(db.String(20), nullable=False)  # 'success', 'invalid_tag', 'already_marked', 'error'
     error_message = db.Column(db.Text, nullable=True)
+    reader_id = db.Column(db.String(50), nullable=True)  # BLE reader that sent the scan
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_rfid_scan_logs_scan_time', 'scan_time'),
+        db.Index('ix_rfid_scan_logs_rfid_tag', 'rfid_tag'),
+    )
+    
     # Relationships
     student_info = db.relationship('Student', backref='rfid_scans', lazy=True)
     
@@ -215,6 +301,7 @@ class RFIDScanLog(db.Model):
             'attendance_id': self.attendance_id,
             'status': self.status,
             'error_message': self.error_message,
+            'reader_id': self.reader_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -223,8 +310,9 @@ def init_database(app):
     db.init_app(app)
     
     with app.app_context():
-        # Create all tables
+        # Create all tables, then bring existing ones up to date
         db.create_all()
+        run_migrations(db.engine)
         
         # Create default admin user if not exists
         admin = User.query.filter_by(username='admin').first()
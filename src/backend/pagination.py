@@ -0,0 +1,144 @@
+"""
+Keyset (cursor) pagination for AttenSync listings
+A page is fetched by seeking past the last row of the previous page on the
+sort key, so every page costs one index range scan whatever its depth. No
+COUNT(*) runs unless the client asks for a total.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.exc import OperationalError
+
+MAX_PER_PAGE = 500
+TOTAL_MODES = ('exact', 'approx')
+
+
+def encode_cursor(values):
+    """
+    Encode sort-key values as an opaque URL-safe cursor
+
+    Args:
+        values (list): Sort-key values of the last row on a page
+
+    Returns:
+        str: Cursor for the next page
+    """
+    values = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """
+    Decode a cursor back into typed sort-key values
+
+    Args:
+        cursor (str): Value produced by encode_cursor
+        keys (list): Sort-key columns the cursor was built from
+
+    Returns:
+        list: One value per key
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the keys
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError('Invalid cursor')
+
+    decoded = []
+    for key, value in zip(keys, values):
+        python_type = key.type.python_type
+        try:
+            if python_type is date:
+                value = date.fromisoformat(value)
+            elif python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif value is not None and not isinstance(value, python_type):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+
+def keyset_page(query, keys, cursor=None, per_page=50, descending=False):
+    """
+    Fetch one page of query ordered by keys
+
+    Args:
+        query: SQLAlchemy query with the listing's filters applied
+        keys (list): Sort-key columns; the last must be unique (the primary key)
+        cursor (str, optional): next_cursor from the previous page
+        per_page (int): Rows per page
+        descending (bool): Newest/highest keys first
+
+    Returns:
+        tuple: (rows, next_cursor); next_cursor is None on the last page
+    """
+    if cursor:
+        # Row-value comparison: SQLite seeks straight to it on an index over the keys
+        last = tuple(decode_cursor(cursor, keys))
+        query = query.filter(tuple_(*keys) < last if descending else tuple_(*keys) > last)
+    query = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+    # One extra row tells whether another page exists without counting
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor([getattr(rows[-1], key.key) for key in keys])
+
+
+def table_row_estimate(session, table):
+    """
+    Row count of a table as recorded by the last ANALYZE
+
+    Args:
+        session: SQLAlchemy session
+        table (str): Table name
+
+    Returns:
+        int or None: Estimated rows (None if the table was never analyzed)
+    """
+    try:
+        stat = session.execute(
+            text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table ORDER BY idx IS NULL DESC LIMIT 1"),
+            {'table': table}
+        ).scalar()
+    except OperationalError:
+        # sqlite_stat1 only exists once ANALYZE has run
+        return None
+    return int(stat.split()[0]) if stat else None
+
+
+def parse_page_args(args, default_per_page=50):
+    """
+    Read cursor, per_page and total from request.args
+
+    Args:
+        args: Flask request.args
+        default_per_page (int): per_page when the client sends none
+
+    Returns:
+        dict: cursor, per_page (clamped to 1..MAX_PER_PAGE) and total mode (or None)
+
+    Raises:
+        ValueError: If total is not one of TOTAL_MODES
+    """
+    per_page = args.get('per_page', default_per_page, type=int) or default_per_page
+    total = args.get('total')
+    if total and total not in TOTAL_MODES:
+        raise ValueError(f"total must be one of {', '.join(TOTAL_MODES)}")
+    return {
+        'cursor': args.get('cursor') or None,
+        'per_page': max(1, min(per_page, MAX_PER_PAGE)),
+        'total': total or None
+    }
@@ -0,0 +1,133 @@
+"""
+Per-day "already marked" bitmap for RFID scans
+Lets repeated card taps be answered from memory instead of an attendance lookup
+"""
+import logging
+import threading
+from datetime import date
+
+from models import Attendance
+
+logger = logging.getLogger(__name__)
+
+# Statuses that count as already marked; a repeat tap over any other status must reach the database
+MARKED_STATUSES = ('present', 'late')
+
+
+class PresenceBitmap:
+    """
+    Bitset of students marked present today, indexed by student id
+
+    Only today is tracked; the bitmap is re-warmed from the attendance table
+    the first time it is used on a new day. A clear bit is not proof that no
+    row exists (another process may have written one, or the student may be
+    marked absent), so callers fall back to the database for clear bits.
+    Writers in this process report every status they write through record(),
+    so a student marked absent by hand loses the bit and the next tap is
+    written again.
+    """
+
+    def __init__(self, attendance_model):
+        """
+        Args:
+            attendance_model: Attendance model to warm from (models.Attendance or app.Attendance)
+        """
+        self.attendance_model = attendance_model
+        self.day = None
+        self._bits = bytearray()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.marked = 0
+
+    def warm(self, day=None):
+        """Load the students already marked present or late on day (default today)"""
+        day = day or date.today()
+        model = self.attendance_model
+        rows = model.query.with_entities(model.student_id).filter(
+            model.attendance_date == day,
+            model.status.in_(MARKED_STATUSES)
+        ).all()
+
+        bits = bytearray()
+        for (student_id,) in rows:
+            bits = self._set(bits, student_id)
+
+        with self._lock:
+            self.day, self._bits = day, bits
+            self.marked = len(rows)
+
+        logger.info(f"Presence bitmap warmed for {day}: {len(rows)} students marked")
+
+    @staticmethod
+    def _set(bits, student_id):
+        index = student_id >> 3
+        if index >= len(bits):
+            bits.extend(bytes(index - len(bits) + 1))
+        bits[index] |= 1 << (student_id & 7)
+        return bits
+
+    def _ensure_today(self, day):
+        today = date.today()
+        if day != today:
+            return False
+        if self.day != today:
+            self.warm(today)
+        return True
+
+    def is_marked(self, student_id, day):
+        """
+        Check whether a student is already marked for day
+
+        Returns:
+            bool: True if marked; False if not known to be marked (check the database)
+        """
+        if not self._ensure_today(day):
+            return False
+        index = student_id >> 3
+        hit = index < len(self._bits) and bool(self._bits[index] & (1 << (student_id & 7)))
+        if hit:
+            self.hits += 1
+        return hit
+
+    def mark(self, student_id, day):
+        """Record that a student has been marked present on day"""
+        if not self._ensure_today(day):
+            return
+        with self._lock:
+            index = student_id >> 3
+            if index < len(self._bits) and self._bits[index] & (1 << (student_id & 7)):
+                return
+            self._bits = self._set(self._bits, student_id)
+            self.marked += 1
+
+    def clear(self, student_id, day):
+        """Forget that a student is marked on day (their row now has another status)"""
+        if not self._ensure_today(day):
+            return
+        with self._lock:
+            index = student_id >> 3
+            if index < len(self._bits) and self._bits[index] & (1 << (student_id & 7)):
+                self._bits[index] &= ~(1 << (student_id & 7)) & 0xFF
+                self.marked -= 1
+
+    def record(self, student_id, day, status):
+        """Follow a committed attendance write: set the bit for marked statuses, clear it otherwise"""
+        if status in MARKED_STATUSES:
+            self.mark(student_id, day)
+        else:
+            self.clear(student_id, day)
+
+    def stats(self):
+        """Current day, students marked and duplicate taps answered from memory"""
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'marked': self.marked,
+            'duplicate_hits': self.hits,
+            'bytes': len(self._bits)
+        }
+
+
+# Shared instance for the hardware listeners
+presence_bitmap = PresenceBitmap(Attendance)
@@ -0,0 +1,111 @@
+"""
+In-memory student roster for RFID scan resolution
+Maps RFID tags and names to students without a database round trip per scan
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from models import Student
+
+logger = logging.getLogger(__name__)
+
+# Processes that cannot see /api/students writes (the BLE listeners) pick up
+# roster changes after this many seconds
+DEFAULT_ROSTER_TTL = float(os.getenv('RFID_ROSTER_TTL', '300'))
+
+RosterEntry = namedtuple('RosterEntry', ['student_id', 'class_id', 'full_name'])
+
+
+class RosterCache:
+    """
+    Process-wide tag/name -> student index of active students
+
+    The index is rebuilt lazily on the first lookup after invalidate() or
+    once the TTL has expired. Lookups must run inside an app context so a
+    rebuild can query the database.
+    """
+
+    def __init__(self, student_model, ttl=DEFAULT_ROSTER_TTL):
+        """
+        Args:
+            student_model: Student model to index (models.Student or app.Student)
+            ttl (float): Seconds before the index is reloaded, 0 to disable expiry
+        """
+        self.student_model = student_model
+        self.ttl = ttl
+        self._by_tag = {}
+        self._by_name = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    def load(self):
+        """Rebuild the index from the students table"""
+        model = self.student_model
+        rows = model.query.with_entities(
+            model.id, model.class_id, model.full_name, model.rfid_tag
+        ).filter(model.is_active == True).order_by(model.id).all()
+
+        by_tag, by_name = {}, {}
+        for student_id, class_id, full_name, rfid_tag in rows:
+            entry = RosterEntry(student_id, class_id, full_name)
+            if rfid_tag:
+                by_tag[rfid_tag] = entry
+            # Name lookups historically returned the first match
+            by_name.setdefault(full_name, entry)
+
+        with self._lock:
+            self._by_tag, self._by_name = by_tag, by_name
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+
+        logger.info(f"Roster loaded: {len(by_tag)} RFID tags, {len(by_name)} students")
+
+    def invalidate(self):
+        """Drop the index; the next lookup reloads it"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.ttl and time.monotonic() - loaded_at > self.ttl):
+            self.load()
+
+    def _lookup(self, index_name, key):
+        self._ensure_loaded()
+        entry = getattr(self, index_name).get(key)
+        if entry:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return entry
+
+    def resolve_tag(self, rfid_tag):
+        """Return the RosterEntry for an RFID tag, or None if unknown"""
+        return self._lookup('_by_tag', rfid_tag)
+
+    def resolve_name(self, full_name):
+        """Return the RosterEntry for a student name, or None if unknown"""
+        return self._lookup('_by_name', full_name)
+
+    def stats(self):
+        """Index size and hit/miss counters"""
+        return {
+            'tags': len(self._by_tag),
+            'students': len(self._by_name),
+            'hits': self.hits,
+            'misses': self.misses,
+            'loads': self.loads,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None
+        }
+
+
+# Shared instance for the backend API and the hardware listeners
+roster_cache = RosterCache(Student)
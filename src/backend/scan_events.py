@@ -0,0 +1,240 @@
+"""
+Live RFID scan feed for Server-Sent Events
+One tailer follows rfid_scan_logs and a broadcaster fans each new scan out to
+every open stream, so N dashboards cost one small query per interval instead
+of N full queries per poll
+"""
+import json
+import logging
+import os
+import queue
+import threading
+from collections import deque
+
+from sqlalchemy import text
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY = 500  # recent scans kept for Last-Event-ID resume
+DEFAULT_SUBSCRIBER_QUEUE = 256
+DEFAULT_TAIL_INTERVAL = float(os.getenv('RFID_STREAM_POLL_SECONDS', '0.5'))
+KEEPALIVE_SECONDS = 15
+
+SCAN_COLUMNS = """
+    SELECT r.id, r.rfid_tag, r.scan_time, r.status, r.student_id,
+           COALESCE(r.student_name, s.full_name) AS student_name, r.reader_id
+    FROM rfid_scan_logs r
+    LEFT JOIN students s ON r.student_id = s.id
+"""
+
+
+def scan_row_to_event(row):
+    return {
+        'id': row.id,
+        'rfid_tag': row.rfid_tag,
+        'scan_time': str(row.scan_time),
+        'status': row.status,
+        'student_id': row.student_id,
+        'student_name': row.student_name,
+        'reader_id': row.reader_id
+    }
+
+
+def format_sse(event, event_type='scan'):
+    """Serialize a scan as one SSE message; its id is the scan log id"""
+    return f"id: {event['id']}\nevent: {event_type}\ndata: {json.dumps(event)}\n\n"
+
+
+class ScanBroadcaster:
+    """
+    Fan-out of scan events to stream subscribers
+
+    Keeps the last HISTORY events so a reconnecting client can resume from
+    its Last-Event-ID. A subscriber that falls a full queue behind is
+    disconnected (it receives None) and resumes from the history on reconnect.
+    """
+
+    def __init__(self, history=DEFAULT_HISTORY, queue_size=DEFAULT_SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    @property
+    def last_id(self):
+        return self._history[-1]['id'] if self._history else 0
+
+    def publish(self, events):
+        """Deliver new events (in id order) to every subscriber"""
+        with self._lock:
+            events = [event for event in events if event['id'] > self.last_id]
+            if not events:
+                return
+            self._history.extend(events)
+            self.published += len(events)
+            for subscriber in list(self._subscribers):
+                try:
+                    for event in events:
+                        subscriber.put_nowait(event)
+                except queue.Full:
+                    self._drop(subscriber)
+
+    def _drop(self, subscriber):
+        self._subscribers.discard(subscriber)
+        self.dropped_subscribers += 1
+        # Make room for the sentinel so the stream notices and closes
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        subscriber.put_nowait(None)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register a subscriber
+
+        Args:
+            last_event_id (int, optional): Last scan id the client has seen
+
+        Returns:
+            tuple: (queue, backlog, complete) where backlog holds buffered events
+                newer than last_event_id and complete is False if older events
+                were already evicted from the history
+        """
+        subscriber = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if last_event_id is None:
+                return subscriber, [], True
+            backlog = [event for event in self._history if event['id'] > last_event_id]
+            oldest = self._history[0]['id'] if self._history else None
+            complete = oldest is None or oldest <= last_event_id + 1
+        return subscriber, backlog, complete
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        """Subscriber count and delivery counters"""
+        return {
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'dropped_subscribers': self.dropped_subscribers,
+            'last_id': self.last_id,
+            'history': len(self._history)
+        }
+
+
+class ScanLogTailer:
+    """Single background thread publishing new rfid_scan_logs rows"""
+
+    def __init__(self, app, broadcaster, interval=DEFAULT_TAIL_INTERVAL, batch=DEFAULT_HISTORY):
+        """
+        Args:
+            app (Flask): App whose context is used for queries
+            broadcaster (ScanBroadcaster): Where new scans are published
+            interval (float): Seconds between polls of the scan log
+            batch (int): Maximum rows read per poll
+        """
+        self.app = app
+        self.broadcaster = broadcaster
+        self.interval = interval
+        self.batch = batch
+        self._thread = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.polls = 0
+
+    def start(self):
+        """Start tailing (idempotent; called by the first stream)"""
+        with self._start_lock:
+            if self._thread:
+                return
+            self._seed()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='scan-tailer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _seed(self):
+        # Fill the history so early reconnects can resume without a query
+        with self.app.app_context():
+            rows = db.session.execute(
+                text(SCAN_COLUMNS + "ORDER BY r.id DESC LIMIT :limit"), {'limit': self.batch}
+            ).fetchall()
+            db.session.remove()
+        self.broadcaster.publish([scan_row_to_event(row) for row in reversed(rows)])
+
+    def fetch_since(self, last_id, limit=None):
+        """Scans with id > last_id, oldest first (also used to backfill a resuming client)"""
+        with self.app.app_context():
+            rows = db.session.execute(
+                text(SCAN_COLUMNS + "WHERE r.id > :last_id ORDER BY r.id LIMIT :limit"),
+                {'last_id': last_id, 'limit': limit or self.batch}
+            ).fetchall()
+            db.session.remove()
+        return [scan_row_to_event(row) for row in rows]
+
+    def poll(self):
+        self.polls += 1
+        events = self.fetch_since(self.broadcaster.last_id)
+        if events:
+            self.broadcaster.publish(events)
+        return len(events)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                # Keep reading while a burst is still arriving
+                while self.poll() == self.batch:
+                    pass
+            except Exception as e:
+                logger.error(f"❌ Scan tailer poll failed: {e}")
+
+
+def stream_scans(broadcaster, tailer, last_event_id=None, keepalive=KEEPALIVE_SECONDS):
+    """
+    Generator of SSE messages for one client
+
+    Replays scans after last_event_id (from history, or the database if the
+    history no longer reaches back that far), then follows live scans.
+    """
+    subscriber, backlog, complete = broadcaster.subscribe(last_event_id)
+    try:
+        yield "retry: 3000\n\n"
+        if not complete:
+            upto = backlog[0]['id'] if backlog else broadcaster.last_id + 1
+            missed = [event for event in tailer.fetch_since(last_event_id) if event['id'] < upto]
+            backlog = missed + backlog
+        sent = last_event_id or 0
+        for event in backlog:
+            sent = event['id']
+            yield format_sse(event)
+
+        while True:
+            try:
+                event = subscriber.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            if event is None:
+                # Fell too far behind; the client reconnects with Last-Event-ID
+                return
+            if event['id'] > sent:
+                sent = event['id']
+                yield format_sse(event)
+    finally:
+        broadcaster.unsubscribe(subscriber)
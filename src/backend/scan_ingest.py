@@ -0,0 +1,457 @@
+"""
+Batched RFID scan ingestion for AttenSync
+Shared write-behind queue used by the BLE listeners: card taps are grouped
+into micro-batches and resolved against the database in one transaction
+"""
+import asyncio
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from attendance_store import upsert_attendance
+from models import db, RFIDScanLog
+from roster_cache import roster_cache
+from presence import presence_bitmap
+
+logger = logging.getLogger(__name__)
+
+# A batch is flushed as soon as it holds BATCH_SIZE scans or the oldest scan
+# in it has waited MAX_BATCH_DELAY seconds, whichever comes first
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_MAX_BATCH_DELAY = 0.05  # seconds
+DEFAULT_MAX_QUEUE_SIZE = 2048
+DEFAULT_TEACHER_ID = 1  # Admin user marks RFID attendance
+DEFAULT_REPLAY_INTERVAL = 5.0  # seconds between spool replay attempts while the database is failing
+
+# spool_span is the (start, end) byte range of the scan in the ScanSpool, if any
+ScanEvent = namedtuple('ScanEvent', ['rfid_tag', 'scan_time', 'reader_id', 'spool_span'], defaults=(None,))
+ScanResult = namedtuple('ScanResult', [
+    'rfid_tag', 'scan_time', 'reader_id', 'status',
+    'student_id', 'student_name', 'attendance_id'
+])
+
+
+def _drop_logged_scans(scans):
+    """Filter out scans already in rfid_scan_logs, keyed by (reader, tag, scan time)"""
+    rows = db.session.query(
+        RFIDScanLog.reader_id, RFIDScanLog.rfid_tag, RFIDScanLog.scan_time
+    ).filter(
+        RFIDScanLog.scan_time.in_({scan.scan_time for scan in scans})
+    ).all()
+    logged = {(row.reader_id, row.rfid_tag, row.scan_time) for row in rows}
+    return [scan for scan in scans if (scan.reader_id, scan.rfid_tag, scan.scan_time) not in logged]
+
+
+def resolve_scan_batch(scans, teacher_id=DEFAULT_TEACHER_ID, skip_logged=False):
+    """
+    Resolve a batch of scans and write them in a single transaction
+
+    Must be called inside an app context. Students are resolved from the
+    in-memory roster and repeat taps from the presence bitmap; attendance for
+    the remaining students is inserted with one conflict-ignoring statement.
+
+    Args:
+        scans (list[ScanEvent]): Scans in arrival order
+        teacher_id (int): User recorded as marking RFID attendance
+        skip_logged (bool): Ignore scans already logged (spool replay)
+
+    Returns:
+        list[ScanResult]: One result per written scan, in the same order
+    """
+    if skip_logged and scans:
+        scans = _drop_logged_scans(scans)
+    if not scans:
+        return []
+
+    students = {}
+    for rfid_tag in {scan.rfid_tag for scan in scans}:
+        entry = roster_cache.resolve_tag(rfid_tag)
+        if entry:
+            students[rfid_tag] = entry
+
+    # Repeat taps are answered from memory; the first tap of each remaining
+    # student is inserted with ON CONFLICT DO NOTHING, so a row that already
+    # exists (marked by another process, or absent) is simply not returned
+    marked = set()
+    first_taps = {}
+    for scan in scans:
+        student = students.get(scan.rfid_tag)
+        if student:
+            key = (student.student_id, scan.scan_time.date())
+            if presence_bitmap.is_marked(*key):
+                marked.add(key)
+            elif key not in first_taps:
+                first_taps[key] = (scan, student)
+
+    created = {}
+    if first_taps:
+        result = upsert_attendance(db.session, [
+            {
+                'student_id': student.student_id,
+                'class_id': student.class_id,
+                'teacher_id': teacher_id,
+                'attendance_date': key[1],
+                'time_marked': scan.scan_time,
+                'status': 'present',
+                'method': 'rfid'
+            }
+            for key, (scan, student) in first_taps.items()
+        ], on_conflict='ignore')
+        created = {(row.student_id, row.attendance_date): row.id for row in result.rows}
+
+    pending = []
+    for scan in scans:
+        student = students.get(scan.rfid_tag)
+        scan_log = RFIDScanLog(rfid_tag=scan.rfid_tag, scan_time=scan.scan_time,
+                               reader_id=scan.reader_id, status='success')
+
+        if not student:
+            scan_log.status = 'invalid_tag'
+            scan_log.error_message = f'No student found with RFID tag: {scan.rfid_tag}'
+        else:
+            scan_log.student_id = student.student_id
+            scan_log.student_name = student.full_name
+            key = (student.student_id, scan.scan_time.date())
+            if key in created and key not in marked:
+                scan_log.attendance_id = created[key]
+                marked.add(key)
+            else:
+                scan_log.status = 'already_marked'
+
+        pending.append((scan, student, scan_log))
+
+    db.session.add_all([scan_log for _, _, scan_log in pending])
+    db.session.commit()
+
+    for student_id, day in created:
+        presence_bitmap.mark(student_id, day)
+
+    return [
+        ScanResult(
+            rfid_tag=scan.rfid_tag,
+            scan_time=scan.scan_time,
+            reader_id=scan.reader_id,
+            status=scan_log.status,
+            student_id=student.student_id if student else None,
+            student_name=student.full_name if student else None,
+            attendance_id=scan_log.attendance_id
+        )
+        for scan, student, scan_log in pending
+    ]
+
+
+class ScanIngestQueue:
+    """
+    Asyncio micro-batching queue between BLE notification handlers and the database
+
+    Handlers call submit()/submit_nowait() and return immediately; a single
+    consumer task drains the queue in size- or time-bounded batches. The queue
+    is bounded, so a stalled database pushes back on producers instead of
+    growing memory without limit.
+
+    Batches are written on a dedicated writer thread so SQLAlchemy queries
+    and commits never run on the event loop that receives BLE notifications.
+    At most one batch is in flight; later scans wait in the bounded queue.
+
+    With a ScanSpool every scan is appended to the spool before it is queued
+    and the spool is fsynced before each batch is written. Batches that fail
+    (database locked or down) and scans rejected by a full queue stay in the
+    spool and are replayed idempotently once the database accepts writes.
+    """
+
+    def __init__(self, app, batch_size=DEFAULT_BATCH_SIZE, max_batch_delay=DEFAULT_MAX_BATCH_DELAY,
+                 max_queue_size=DEFAULT_MAX_QUEUE_SIZE, on_result=None, offload_writes=True,
+                 spool=None, replay_interval=DEFAULT_REPLAY_INTERVAL):
+        """
+        Args:
+            app (Flask): App whose context is used for database work
+            batch_size (int): Maximum scans per transaction
+            max_batch_delay (float): Maximum seconds a scan waits for its batch to fill
+            max_queue_size (int): Queue capacity before producers are pushed back
+            on_result (callable, optional): Called with each ScanResult after commit,
+                on the writer thread
+            offload_writes (bool): Write on the writer thread; False runs database
+                work inline on the event loop (kept for benchmarking)
+            spool (ScanSpool, optional): Durable log written before the database
+            replay_interval (float): Seconds between spool replays while writes fail
+        """
+        self.app = app
+        self.batch_size = batch_size
+        self.max_batch_delay = max_batch_delay
+        self.max_queue_size = max_queue_size
+        self.on_result = on_result
+        self.offload_writes = offload_writes
+        self.spool = spool
+        self.replay_interval = replay_interval
+
+        self._queue = None
+        self._consumer = None
+        self._writer = None
+
+        # Writer-thread view of the spool: where the next queued scan should
+        # start, and whether anything before it still needs replaying
+        self._spool_expected = spool.checkpoint if spool else 0
+        self._spool_backlog = bool(spool and spool.backlog_bytes)
+
+        # Metrics
+        self.submitted = 0
+        self.rejected = 0
+        self.blocked = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.scans_written = 0
+        self.max_depth = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0.0
+        self.spooled = 0
+        self.replayed = 0
+
+    @property
+    def depth(self):
+        """Number of scans waiting to be written"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """Create the queue on the running loop and start the consumer task"""
+        if self._consumer:
+            return
+        if self.offload_writes:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scan-writer')
+        # Warm the caches so the first scans do not pay for the load
+        await self._run_on_writer(self._warm_caches)
+        if self._spool_backlog:
+            # Scans left over from a previous run or outage
+            await self._run_on_writer(self._replay_spool)
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._consumer = asyncio.create_task(self._consume())
+        logger.info(f"Scan ingest queue started (batch={self.batch_size}, "
+                    f"delay={self.max_batch_delay * 1000:.0f}ms, capacity={self.max_queue_size})")
+
+    async def stop(self):
+        """Flush everything already queued, then stop the consumer"""
+        if not self._consumer:
+            return
+        await self._queue.put(None)
+        await self._consumer
+        self._consumer = None
+        if self._spool_backlog:
+            await self._run_on_writer(self._replay_spool)
+        if self._writer:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+        logger.info(f"Scan ingest queue stopped. {self.scans_written} scans written "
+                    f"in {self.batches} batches")
+
+    async def submit(self, rfid_tag, scan_time=None, reader_id=None):
+        """Queue a scan, waiting for space if the queue is full"""
+        event = self._spool_event(ScanEvent(rfid_tag, scan_time or datetime.now(), reader_id))
+        if self._queue.full():
+            self.blocked += 1
+        await self._queue.put(event)
+        self._record_submit()
+
+    def submit_nowait(self, rfid_tag, scan_time=None, reader_id=None):
+        """
+        Queue a scan without waiting; safe to call from a notification callback
+
+        Returns:
+            bool: False if the queue is full and the scan was rejected (with a
+                spool it is still kept there and written by the next replay)
+        """
+        event = self._spool_event(ScanEvent(rfid_tag, scan_time or datetime.now(), reader_id))
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            if self.spool:
+                logger.warning(f"Scan queue full ({self.max_queue_size}); tag {rfid_tag} left in spool")
+            else:
+                logger.warning(f"Scan queue full ({self.max_queue_size}); rejected tag {rfid_tag}")
+            return False
+        self._record_submit()
+        return True
+
+    def _spool_event(self, event):
+        if not self.spool:
+            return event
+        span = self.spool.append(event.rfid_tag, event.scan_time, event.reader_id)
+        return event._replace(spool_span=span)
+
+    def _record_submit(self):
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            if self._spool_backlog:
+                # Keep retrying the spool while the database is failing, even if no scans arrive
+                try:
+                    first = await asyncio.wait_for(self._queue.get(), self.replay_interval)
+                except asyncio.TimeoutError:
+                    await self._run_on_writer(self._replay_spool, self._spool_expected)
+                    continue
+            else:
+                first = await self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = loop.time() + self.max_batch_delay
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._run_on_writer(self._write_batch, batch)
+
+    async def _run_on_writer(self, func, *args):
+        if not self._writer:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, func, *args)
+
+    def _warm_caches(self):
+        with self.app.app_context():
+            roster_cache.load()
+            presence_bitmap.warm()
+
+    def _write_batch(self, batch):
+        if self.spool:
+            self._write_spooled_batch(batch)
+        else:
+            self._write_and_report(batch)
+
+    def _write_spooled_batch(self, batch):
+        # One fsync covers every scan appended so far, including this batch
+        self.spool.sync()
+        if batch[0].spool_span[0] != self._spool_expected:
+            # Scans between the last batch and this one were rejected by a full queue
+            self._spool_backlog = True
+        self._spool_expected = batch[-1].spool_span[1]
+
+        if not self._write_and_report(batch):
+            self._spool_backlog = True
+        elif self._spool_backlog:
+            self._replay_spool(self._spool_expected)
+        else:
+            self._commit_spool(self._spool_expected)
+
+    def _commit_spool(self, offset):
+        self.spool.commit(offset)
+        if self.spool.checkpoint < offset:
+            # Compacted; the next scan starts at the beginning of the spool
+            self._spool_expected = self.spool.checkpoint
+
+    def _replay_spool(self, end=None):
+        """
+        Write spooled scans after the checkpoint, skipping ones already logged
+
+        Args:
+            end (int, optional): Replay up to this offset; scans after it are still
+                queued and will be written as normal batches. None replays everything.
+        """
+        replay_all = end is None
+        end = self.spool.pending_end() if replay_all else end
+        records = self.spool.pending(end)
+        last = records[-1][3] if records else self.spool.checkpoint
+        for i in range(0, len(records), self.batch_size):
+            chunk = records[i:i + self.batch_size]
+            scans = [ScanEvent(tag, scan_time, reader_id) for reader_id, tag, scan_time, _ in chunk]
+            try:
+                with self.app.app_context():
+                    try:
+                        results = resolve_scan_batch(scans, skip_logged=True)
+                    except Exception:
+                        db.session.rollback()
+                        raise
+            except Exception as e:
+                logger.warning(f"Spool replay paused, {len(records) - i} scans pending: {e}")
+                return False
+            self.replayed += len(results)
+            self._report(results)
+            self._commit_spool(chunk[-1][3])
+        if last < end:
+            # Only unreadable records remain before end
+            self._commit_spool(end)
+        if records:
+            logger.info(f"Replayed {len(records)} spooled scans")
+        if replay_all:
+            self._spool_expected = self.spool.checkpoint
+        self._spool_backlog = False
+        return True
+
+    def _write_and_report(self, batch):
+        """Write one batch and report its results; returns False if the transaction failed"""
+        started = time.perf_counter()
+        ok = True
+        try:
+            with self.app.app_context():
+                try:
+                    results = resolve_scan_batch(batch)
+                except Exception:
+                    db.session.rollback()
+                    raise
+        except Exception as e:
+            ok = False
+            self.failed_batches += 1
+            # Spooled scans are not lost, only delayed until the next replay
+            status = 'spooled' if self.spool else 'error'
+            if self.spool:
+                self.spooled += len(batch)
+            logger.error(f"Failed to write batch of {len(batch)} scans ({status}): {e}")
+            results = [
+                ScanResult(scan.rfid_tag, scan.scan_time, scan.reader_id, status, None, None, None)
+                for scan in batch
+            ]
+        else:
+            self.batches += 1
+            self.scans_written += len(batch)
+
+        self.last_batch_size = len(batch)
+        self.last_batch_ms = (time.perf_counter() - started) * 1000
+        self._report(results)
+        return ok
+
+    def _report(self, results):
+        if self.on_result:
+            for result in results:
+                try:
+                    self.on_result(result)
+                except Exception as e:
+                    logger.error(f"Scan result callback failed: {e}")
+
+    def stats(self):
+        """Queue depth, backpressure and throughput counters"""
+        return {
+            'queue_depth': self.depth,
+            'max_queue_depth': self.max_depth,
+            'capacity': self.max_queue_size,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'blocked': self.blocked,
+            'batches': self.batches,
+            'failed_batches': self.failed_batches,
+            'scans_written': self.scans_written,
+            'avg_batch_size': round(self.scans_written / self.batches, 1) if self.batches else 0,
+            'last_batch_size': self.last_batch_size,
+            'last_batch_ms': round(self.last_batch_ms, 2),
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+            'spool': self.spool.stats() if self.spool else None
+        }
@@ -0,0 +1,204 @@
+"""
+Durable local spool for RFID scans
+Every accepted scan is appended here before it reaches the database, so a
+locked or unavailable database delays scans instead of losing them
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, one listener per spool is up to the operator
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_PATH = os.getenv(
+    'RFID_SPOOL_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'rfid_scan_spool.jsonl')
+)
+
+# Once everything in the spool has been written, truncate it if it has grown past this
+COMPACT_BYTES = 1024 * 1024
+
+
+class SpoolInUseError(RuntimeError):
+    """Another open ScanSpool (in this or another process) owns the spool file"""
+
+
+def spool_path(name):
+    """
+    Spool file of one listener: DEFAULT_SPOOL_PATH with the name before the extension
+
+    Each listener process needs its own spool, since offsets and compaction
+    assume a single writer.
+    """
+    root, ext = os.path.splitext(DEFAULT_SPOOL_PATH)
+    return f"{root}.{name}{ext}"
+
+
+class ScanSpool:
+    """
+    Append-only JSON-lines log of scans with a replay checkpoint
+
+    append() only hands the record to the OS; sync() makes everything
+    appended so far durable with a single fsync, so the writer pays for one
+    fsync per batch rather than one per scan. The checkpoint file records the
+    byte offset up to which every scan is known to be in the database.
+    """
+
+    def __init__(self, path=None, name=None):
+        """
+        Args:
+            path (str, optional): Spool file; the checkpoint is kept next to it in <path>.offset
+            name (str, optional): Listener name, for spool_path(name) when no path is given
+
+        Raises:
+            SpoolInUseError: The file is already open in another ScanSpool
+        """
+        path = path or (spool_path(name) if name else DEFAULT_SPOOL_PATH)
+        self.path = path
+        self.checkpoint_path = f"{path}.offset"
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'ab+')
+        if fcntl:
+            # Held until close(): a second writer would interleave offsets and
+            # its compaction would truncate away our unreplayed scans
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                self._file.close()
+                raise SpoolInUseError(f"Spool {path} is in use by another listener; give each one its own spool")
+        self._size = self._recover()
+        self.checkpoint = self._read_checkpoint()
+
+        # Metrics
+        self.appended = 0
+        self.syncs = 0
+        self.compactions = 0
+
+    def _recover(self):
+        """Drop a torn final record left by a crash mid-append"""
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        if size == 0:
+            return 0
+        self._file.seek(0)
+        data = self._file.read()
+        end = data.rfind(b'\n') + 1
+        if end != size:
+            logger.warning(f"Spool {self.path}: discarding {size - end} bytes of a torn record")
+            self._file.truncate(end)
+            os.fsync(self._file.fileno())
+        return end
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                offset = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+        # A checkpoint past the end means the spool was compacted after it was written
+        return offset if offset <= self._size else 0
+
+    def append(self, rfid_tag, scan_time, reader_id=None):
+        """
+        Append one scan
+
+        Returns:
+            tuple: (start, end) byte offsets of the record in the spool
+        """
+        record = json.dumps({'reader': reader_id, 'tag': rfid_tag, 'ts': scan_time.isoformat()})
+        data = (record + '\n').encode('utf-8')
+        with self._lock:
+            start = self._size
+            self._file.write(data)
+            self._size += len(data)
+            self.appended += 1
+        return start, self._size
+
+    def sync(self):
+        """Make every appended record durable"""
+        with self._lock:
+            self._file.flush()
+        os.fsync(self._file.fileno())
+        self.syncs += 1
+
+    def pending_end(self):
+        """Offset just past the last appended record"""
+        with self._lock:
+            return self._size
+
+    def pending(self, end=None):
+        """
+        Read the scans after the checkpoint
+
+        Args:
+            end (int, optional): Stop at this offset instead of the current end of the spool
+
+        Returns:
+            list[tuple]: (reader_id, rfid_tag, scan_time, end_offset) per record
+        """
+        with self._lock:
+            self._file.flush()
+            end = self._size if end is None else min(end, self._size)
+        if end <= self.checkpoint:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.checkpoint)
+            data = f.read(end - self.checkpoint)
+
+        records = []
+        offset = self.checkpoint
+        for line in data.splitlines(keepends=True):
+            offset += len(line)
+            try:
+                record = json.loads(line)
+                records.append((record['reader'], record['tag'], datetime.fromisoformat(record['ts']), offset))
+            except (ValueError, KeyError) as e:
+                logger.error(f"Skipping unreadable spool record at offset {offset - len(line)}: {e}")
+        return records
+
+    def commit(self, offset):
+        """Record that every scan up to offset is in the database"""
+        if offset <= self.checkpoint:
+            return
+        with self._lock:
+            if offset == self._size and self._size > COMPACT_BYTES:
+                # Fully drained: start the spool over instead of letting it grow forever
+                self._file.flush()
+                self._file.truncate(0)
+                os.fsync(self._file.fileno())
+                self._size = 0
+                offset = 0
+                self.compactions += 1
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.checkpoint_path)
+        self.checkpoint = offset
+
+    @property
+    def backlog_bytes(self):
+        return max(0, self._size - self.checkpoint)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def stats(self):
+        """Spool size, unreplayed bytes and fsync counts"""
+        return {
+            'path': self.path,
+            'size_bytes': self._size,
+            'backlog_bytes': self.backlog_bytes,
+            'appended': self.appended,
+            'syncs': self.syncs,
+            'compactions': self.compactions
+        }
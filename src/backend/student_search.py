@@ -0,0 +1,167 @@
+"""
+Student search for AttenSync
+Matches names, roll numbers and RFID tags through students_fts, the FTS5
+trigram index that migration 6 keeps in sync with the students table, so a
+search-box keystroke no longer scans every student row
+"""
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+SEARCH_LIMIT = 50
+# Typo matches need at least this share of the term's trigrams in the name
+MIN_SIMILARITY = 0.5
+# Rows read from the index per query before ranking; a common substring
+# ("TAG", "Kum") matches most of the roster and must not be ranked in full
+CANDIDATES = 200
+
+_indexed_databases = set()
+
+
+def fts_available(session):
+    """True if the database has the students_fts index (only a positive answer is cached)"""
+    url = str(session.connection().engine.url)
+    if url in _indexed_databases:
+        return True
+    found = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'")
+    ).first() is not None
+    if found:
+        _indexed_databases.add(url)
+    else:
+        logger.warning("⚠️ students_fts missing, student search falls back to a table scan")
+    return found
+
+
+def trigrams(value):
+    """Lower-cased character trigrams of value"""
+    value = (value or '').lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def similarity(term, name):
+    """Share of the term's trigrams found in name"""
+    wanted = trigrams(term)
+    if not wanted:
+        return 0.0
+    return len(wanted & trigrams(name)) / len(wanted)
+
+
+def match_order(term, row):
+    """Sort key: roll number/tag equal to the term, name prefix, word prefix, then shorter names"""
+    term = term.lower()
+    name = (row.full_name or '').lower()
+    exact = term in ((row.roll_number or '').lower(), (row.rfid_tag or '').lower())
+    return (not exact, not name.startswith(term), not any(word.startswith(term) for word in name.split()),
+            len(name), name)
+
+
+def _student_filters(class_id, active_only):
+    clauses, params = [], {}
+    if active_only:
+        clauses.append("s.is_active = 1")
+    if class_id:
+        clauses.append("s.class_id = :class_id")
+        params['class_id'] = class_id
+    return ''.join(f" AND {clause}" for clause in clauses), params
+
+
+def _like_escape(value):
+    """value as a LIKE literal (escape character: backslash)"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _phrase(value):
+    """FTS5 string literal (a trigram phrase matches value as a substring)"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def search_students(session, term, limit=SEARCH_LIMIT, class_id=None, active_only=True):
+    """
+    Find students by name, roll number or RFID tag
+
+    Terms of three or more characters use the trigram index: substring
+    matches first (exact roll number/tag, then name and word prefixes, then
+    shorter names), followed by typo-tolerant name matches that share enough
+    trigrams with the term (a near-miss roll number or tag is a different
+    student, so those only match as substrings). Shorter terms match name, word, roll number and
+    tag prefixes.
+
+    Args:
+        session: SQLAlchemy session (models.db.session or app.db.session)
+        term (str): Search box text
+        limit (int): Most ids to return
+        class_id (int, optional): Only students of this class
+        active_only (bool): Skip students with is_active = 0
+
+    Returns:
+        list[int]: Student ids, best match first
+    """
+    term = (term or '').strip()
+    if not term or limit <= 0:
+        return []
+    filters, params = _student_filters(class_id, active_only)
+
+    if len(term) < 3 or not fts_available(session):
+        return _scan_search(session, term, limit, filters, params)
+
+    # Substring matches: the whole term as one trigram phrase. The leading
+    # match_order keys run in SQL so the candidate LIMIT keeps the best rows;
+    # the full order (word prefix, name length) is applied in Python
+    escaped = _like_escape(term)
+    rows = session.execute(text(f"""
+        SELECT s.id, s.full_name, s.roll_number, s.rfid_tag
+        FROM students_fts f JOIN students s ON s.id = f.rowid
+        WHERE students_fts MATCH :phrase{filters}
+        ORDER BY
+            CASE WHEN lower(s.roll_number) = :lowered OR lower(s.rfid_tag) = :lowered THEN 0 ELSE 1 END,
+            CASE WHEN s.full_name LIKE :prefix ESCAPE '\\' THEN 0 ELSE 1 END,
+            CASE WHEN s.full_name LIKE :prefix ESCAPE '\\' OR s.full_name LIKE :word ESCAPE '\\' THEN 0 ELSE 1 END,
+            f.rank
+        LIMIT :candidates
+    """), dict(params, phrase=_phrase(term), lowered=term.lower(), prefix=f"{escaped}%",
+               word=f"% {escaped}%", candidates=max(limit, CANDIDATES))).fetchall()
+    ranked = [row.id for row in sorted(rows, key=lambda row: match_order(term, row))][:limit]
+    if len(ranked) >= limit:
+        return ranked
+
+    # Typo tolerance: names sharing any trigram, best BM25 first, then keep close matches
+    query = 'full_name : (' + ' OR '.join(_phrase(gram) for gram in sorted(trigrams(term))) + ')'
+    candidates = session.execute(text(f"""
+        SELECT s.id, s.full_name, s.roll_number, s.rfid_tag
+        FROM students_fts f JOIN students s ON s.id = f.rowid
+        WHERE students_fts MATCH :query{filters}
+        ORDER BY f.rank LIMIT :candidates
+    """), dict(params, query=query, candidates=CANDIDATES)).fetchall()
+    seen = set(ranked)
+    fuzzy = sorted(
+        ((similarity(term, row.full_name), row.id) for row in candidates if row.id not in seen),
+        key=lambda match: -match[0]
+    )
+    ranked.extend(student_id for score, student_id in fuzzy if score >= MIN_SIMILARITY)
+    return ranked[:limit]
+
+
+def _scan_search(session, term, limit, filters, params):
+    """Prefix search for short terms (and databases without students_fts)"""
+    escaped = _like_escape(term)
+    contains = len(term) >= 3  # only reached without the index: keep the old substring semantics
+    pattern = f"%{escaped}%" if contains else f"{escaped}%"
+    # Rank in SQL (the match_order keys) so the LIMIT keeps the best matches,
+    # not whichever rows the scan reached first
+    rows = session.execute(text(f"""
+        SELECT s.id
+        FROM students s
+        WHERE (s.full_name LIKE :pattern ESCAPE '\\' OR s.full_name LIKE :word ESCAPE '\\'
+               OR s.roll_number LIKE :pattern ESCAPE '\\' OR s.rfid_tag LIKE :pattern ESCAPE '\\'){filters}
+        ORDER BY
+            CASE WHEN lower(s.roll_number) = :lowered OR lower(s.rfid_tag) = :lowered THEN 0 ELSE 1 END,
+            CASE WHEN s.full_name LIKE :prefix ESCAPE '\\' THEN 0 ELSE 1 END,
+            CASE WHEN s.full_name LIKE :prefix ESCAPE '\\' OR s.full_name LIKE :word ESCAPE '\\' THEN 0 ELSE 1 END,
+            length(s.full_name), lower(s.full_name), s.full_name, s.id
+        LIMIT :limit
+    """), dict(params, pattern=pattern, prefix=f"{escaped}%", word=f"% {escaped}%",
+               lowered=term.lower(), limit=limit)).fetchall()
+    return [row.id for row in rows]
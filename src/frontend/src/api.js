@@ -158,24 +158,24 @@ export const reportsAPI = {
 
 // Trends APIs
 export const trendsAPI = {
-  // Get trend analysis data
-  getTrendAnalysis: (type = 'monthly', period = 'current_year') => {
-    return api.get(`/api/trends/${type}?period=${period}`);
+  // Get trend analysis data (current_trend, best_day, seasonal_peak, accuracy, forecast_scores)
+  getTrendAnalysis: () => {
+    return api.get('/api/trends');
   },
 
-  // Get seasonal patterns
+  // Get seasonal patterns (seasonal_peak of the trends payload)
   getSeasonalPatterns: () => {
-    return api.get('/api/trends/seasonal');
+    return api.get('/api/trends');
   },
 
-  // Get AI predictions
-  getPredictions: (months = 6) => {
-    return api.get(`/api/trends/predictions?months=${months}`);
+  // Get AI predictions for the next school days (at most 60)
+  getPredictions: (days = 7) => {
+    return api.get(`/api/forecast/quick?periods=${days}`);
   },
 
-  // Get weekly patterns
+  // Get weekly patterns (best_day of the trends payload)
   getWeeklyPatterns: () => {
-    return api.get('/api/trends/weekly');
+    return api.get('/api/trends');
   },
 
   // Get yearly comparison
@@ -1,44 +1,69 @@
 import React, { useEffect, useState } from 'react';
 import { rfidScanAPI } from '../services/api';
 
+const MAX_SCANS = 10;
+
 const RFIDScanLogList = () => {
   const [scans, setScans] = useState([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     console.log('RFIDScanLogList: Starting to fetch RFID scans...');
-    
+    let source = null;
+    let cancelled = false;
+
+    // New scans are pushed over Server-Sent Events instead of polling
+    const followScans = (initialScans) => {
+      if (cancelled || typeof EventSource === 'undefined') return;
+      const lastId = initialScans.reduce((max, scan) => Math.max(max, scan.id), 0);
+      source = new EventSource(`http://localhost:5000/api/rfid/stream?last_event_id=${lastId}`);
+      source.addEventListener('scan', (event) => {
+        const scan = JSON.parse(event.data);
+        setScans(current => [scan, ...current.filter(s => s.id !== scan.id)].slice(0, MAX_SCANS));
+      });
+      source.onerror = () => {
+        // EventSource reconnects on its own and resumes from Last-Event-ID
+        console.warn('RFIDScanLogList: scan stream interrupted, reconnecting...');
+      };
+    };
+
     // Direct fetch test to bypass axios
-    const testUrl = 'http://localhost:5000/api/rfid/scans?limit=5';
+    const testUrl = `http://localhost:5000/api/rfid/scans?limit=${MAX_SCANS}`;
     console.log('Testing direct fetch to:', testUrl);
     
     fetch(testUrl)
       .then(response => {
         console.log('Direct fetch response status:', response.status);
-        console.log('Direct fetch response headers:', response.headers);
         return response.json();
       })
       .then(data => {
         console.log('Direct fetch data:', data);
-        if (data && data.scans) {
-          setScans(data.scans);
-        }
+        const initialScans = (data && data.scans) || [];
+        setScans(initialScans);
         setLoading(false);
+        followScans(initialScans);
       })
       .catch(error => {
         console.error('Direct fetch error:', error);
         // Fallback to axios
-        rfidScanAPI.getRecentScans(10)
+        rfidScanAPI.getRecentScans(MAX_SCANS)
           .then(res => {
             console.log('RFIDScanLogList: API Response:', res.data);
-            setScans(res.data.scans || []);
+            const initialScans = res.data.scans || [];
+            setScans(initialScans);
             setLoading(false);
+            followScans(initialScans);
           })
           .catch(error => {
             console.error('RFIDScanLogList: Error fetching scans:', error);
             setLoading(false);
           });
       });
+
+    return () => {
+      cancelled = true;
+      if (source) source.close();
+    };
   }, []);
 
   if (loading) return <div>Loading recent RFID scans...</div>;
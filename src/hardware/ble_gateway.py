@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+AttenSync Multi-Reader BLE Gateway
+Supervises many ESP32 RFID readers on one event loop and feeds every scan
+into the shared batched ingest queue
+
+Readers are configured as name=address pairs, either on the command line or
+in RFID_READERS, e.g. RFID_READERS="gate-1=D4:8A:FC:C7:CF:72,gate-2=..."
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta
+
+# Backend modules (models, ingest queue) live next to this package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from loop_lag import LoopLagMonitor
+from scan_debounce import TagDebouncer
+from scan_frames import FrameError, SequenceTracker, decode_notification
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RFID_CHAR_UUID = "abcd1234-5678-90ab-cdef-1234567890ab"
+
+# Reconnect backoff: base * 2^attempt, capped, with +/-20% jitter so readers
+# that dropped together do not reconnect in lockstep
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+CONNECT_TIMEOUT = 15.0
+HEALTH_LOG_INTERVAL = 60.0
+RATE_WINDOW = 60.0  # seconds of history used for scans-per-minute
+
+ReaderConfig = namedtuple('ReaderConfig', ['reader_id', 'address', 'char_uuid'])
+
+
+def parse_reader_specs(specs):
+    """
+    Parse "name=address" reader specs
+
+    Args:
+        specs (list[str]): Specs such as "gate-1=D4:8A:FC:C7:CF:72"; a bare
+            address uses itself as the reader name
+
+    Returns:
+        list[ReaderConfig]: One config per reader
+    """
+    readers = []
+    for spec in specs:
+        spec = spec.strip()
+        if not spec:
+            continue
+        reader_id, _, address = spec.partition('=')
+        if not address:
+            reader_id, address = spec, spec
+        readers.append(ReaderConfig(reader_id.strip(), address.strip(), RFID_CHAR_UUID))
+    return readers
+
+
+# ==================== TRANSPORTS ====================
+
+class BleakTransport:
+    """Real BLE transport backed by bleak"""
+
+    async def connect(self, address, on_disconnect):
+        from bleak import BleakClient
+
+        client = BleakClient(address, timeout=CONNECT_TIMEOUT,
+                             disconnected_callback=lambda _client: on_disconnect())
+        await client.connect()
+        return client
+
+
+class FakeBLEClient:
+    """In-memory stand-in for BleakClient used by FakeBLETransport"""
+
+    def __init__(self, transport, address, on_disconnect):
+        self.transport = transport
+        self.address = address
+        self.on_disconnect = on_disconnect
+        self.is_connected = True
+        self.handlers = {}
+
+    async def start_notify(self, char_uuid, handler):
+        if self.transport._notify_failures.get(self.address):
+            self.transport._notify_failures[self.address] -= 1
+            raise ConnectionError(f"Could not subscribe to {char_uuid} on {self.address}")
+        self.handlers[char_uuid] = handler
+
+    async def disconnect(self):
+        if self.is_connected:
+            self.is_connected = False
+            self.on_disconnect()
+
+
+class FakeBLETransport:
+    """
+    Radio-free transport for tests and demos
+
+    Use fail_next() to make connection attempts fail, fail_notify_next() to
+    make the subscription after a successful connect fail, notify() to deliver
+    a notification from a reader and drop() to simulate a link loss.
+    """
+
+    def __init__(self):
+        self.clients = {}
+        self.connect_attempts = {}
+        self.opened = []
+        self._failures = {}
+        self._notify_failures = {}
+
+    def fail_next(self, address, count=1):
+        self._failures[address] = self._failures.get(address, 0) + count
+
+    def fail_notify_next(self, address, count=1):
+        self._notify_failures[address] = self._notify_failures.get(address, 0) + count
+
+    async def connect(self, address, on_disconnect):
+        self.connect_attempts[address] = self.connect_attempts.get(address, 0) + 1
+        await asyncio.sleep(0)
+        if self._failures.get(address):
+            self._failures[address] -= 1
+            raise ConnectionError(f"Device {address} not reachable")
+        client = FakeBLEClient(self, address, on_disconnect)
+        self.clients[address] = client
+        self.opened.append(client)
+        return client
+
+    def notify(self, address, data, char_uuid=RFID_CHAR_UUID):
+        client = self.clients.get(address)
+        if not client or not client.is_connected or char_uuid not in client.handlers:
+            return False
+        client.handlers[char_uuid](char_uuid, bytearray(data))
+        return True
+
+    def drop(self, address):
+        client = self.clients.get(address)
+        if client and client.is_connected:
+            client.is_connected = False
+            client.on_disconnect()
+
+
+# ==================== SUPERVISION ====================
+
+class ReaderSupervisor:
+    """Keeps one reader connected, reconnecting with backoff, and tracks its health"""
+
+    def __init__(self, config, transport, ingest, debouncer,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.config = config
+        self.transport = transport
+        self.ingest = ingest
+        self.debouncer = debouncer
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.client = None
+        self.running = False
+        self._disconnected = None
+
+        # Health
+        self.state = 'idle'
+        self.connected_since = None
+        self.last_error = None
+        self.connect_failures = 0
+        self.reconnects = 0
+        self.notifications = 0
+        self.scans = 0
+        self.rejected = 0
+        self.bad_frames = 0
+        self.sequence = SequenceTracker()
+        self._recent_scans = deque()
+
+    @property
+    def reader_id(self):
+        return self.config.reader_id
+
+    def _backoff_delay(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def run(self):
+        """Connect, listen until the link drops, back off, repeat"""
+        self.running = True
+        attempt = 0
+        ever_connected = False
+
+        while self.running:
+            self.state = 'connecting'
+            try:
+                self._disconnected = asyncio.Event()
+                self.client = await self.transport.connect(self.config.address, self._on_disconnect)
+                try:
+                    await self.client.start_notify(self.config.char_uuid, self.notification_handler)
+                except Exception:
+                    # Connected but not subscribed: release the link (and its adapter slot) before retrying
+                    await self._release_client()
+                    raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.connect_failures += 1
+                self.last_error = str(e)
+                self.state = 'backoff'
+                delay = self._backoff_delay(attempt)
+                attempt += 1
+                logger.warning(f"[{self.reader_id}] Connection failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            if ever_connected:
+                self.reconnects += 1
+            ever_connected = True
+            attempt = 0
+            self.state = 'connected'
+            self.connected_since = time.time()
+            logger.info(f"[{self.reader_id}] Connected to {self.config.address}")
+
+            await self._disconnected.wait()
+            self.connected_since = None
+            if self.running:
+                self.state = 'backoff'
+                logger.warning(f"[{self.reader_id}] Disconnected; reconnecting")
+                await asyncio.sleep(self._backoff_delay(0))
+
+        self.state = 'stopped'
+
+    async def _release_client(self):
+        client, self.client = self.client, None
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.warning(f"[{self.reader_id}] Disconnect after a failed subscribe raised: {e}")
+
+    def _on_disconnect(self):
+        if self._disconnected:
+            self._disconnected.set()
+
+    def notification_handler(self, sender, data):
+        """Decode, debounce and enqueue a notification; never blocks the loop"""
+        self.notifications += 1
+        try:
+            frame = decode_notification(data)
+        except FrameError as e:
+            self.bad_frames += 1
+            logger.warning(f"[{self.reader_id}] Dropped malformed frame: {e}")
+            return
+
+        if frame.seq is not None:
+            missing = self.sequence.observe(self.reader_id, frame.seq)
+            if missing < 0:
+                return
+            if missing:
+                logger.warning(f"[{self.reader_id}] {missing} frames lost before seq {frame.seq}")
+
+        received_at = datetime.now()
+        for scan in frame.scans:
+            if not self.debouncer.accept(scan.uid, self.reader_id):
+                continue
+            scan_time = received_at - timedelta(milliseconds=scan.age_ms)
+            if self.ingest.submit_nowait(scan.uid, scan_time, reader_id=self.reader_id):
+                self.scans += 1
+                self._recent_scans.append(time.monotonic())
+            else:
+                self.rejected += 1
+
+    def scan_rate(self):
+        """Accepted scans per minute over the last RATE_WINDOW seconds"""
+        cutoff = time.monotonic() - RATE_WINDOW
+        while self._recent_scans and self._recent_scans[0] < cutoff:
+            self._recent_scans.popleft()
+        return round(len(self._recent_scans) * 60.0 / RATE_WINDOW, 1)
+
+    async def stop(self):
+        self.running = False
+        if self.client and self.client.is_connected:
+            try:
+                await self.client.disconnect()
+            except Exception as e:
+                logger.error(f"[{self.reader_id}] Disconnect error: {e}")
+        self._on_disconnect()
+
+    def health(self):
+        return {
+            'reader_id': self.reader_id,
+            'address': self.config.address,
+            'state': self.state,
+            'connected_for': round(time.time() - self.connected_since, 1) if self.connected_since else None,
+            'reconnects': self.reconnects,
+            'connect_failures': self.connect_failures,
+            'last_error': self.last_error,
+            'notifications': self.notifications,
+            'scans': self.scans,
+            'rejected': self.rejected,
+            'bad_frames': self.bad_frames,
+            'frames': self.sequence.stats(),
+            'scans_per_minute': self.scan_rate()
+        }
+
+
+class BLEGateway:
+    """One process, one event loop, N readers feeding one ingest queue"""
+
+    def __init__(self, readers, ingest, transport=None, debouncer=None, **supervisor_options):
+        """
+        Args:
+            readers (list[ReaderConfig]): Readers to supervise
+            ingest (ScanIngestQueue): Shared batched writer
+            transport: BleakTransport (default) or FakeBLETransport
+            debouncer (TagDebouncer, optional): Shared per-(reader, tag) debouncer
+            **supervisor_options: backoff_base / backoff_max overrides
+        """
+        self.ingest = ingest
+        self.transport = transport or BleakTransport()
+        self.debouncer = debouncer or TagDebouncer()
+        self.supervisors = [
+            ReaderSupervisor(config, self.transport, ingest, self.debouncer, **supervisor_options)
+            for config in readers
+        ]
+        self.loop_lag = LoopLagMonitor()
+        self._tasks = []
+
+    async def start(self):
+        await self.ingest.start()
+        self.loop_lag.start()
+        self._tasks = [asyncio.create_task(supervisor.run()) for supervisor in self.supervisors]
+        logger.info(f"Gateway supervising {len(self.supervisors)} readers")
+
+    async def stop(self):
+        for supervisor in self.supervisors:
+            await supervisor.stop()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.loop_lag.stop()
+        await self.ingest.stop()
+
+    async def run_forever(self, health_interval=HEALTH_LOG_INTERVAL):
+        await self.start()
+        try:
+            while True:
+                await asyncio.sleep(health_interval)
+                for reader in self.health()['readers']:
+                    logger.info(f"[{reader['reader_id']}] {reader['state']}, "
+                                f"{reader['scans_per_minute']} scans/min, "
+                                f"{reader['reconnects']} reconnects")
+                lag = self.loop_lag.stats()
+                logger.info(f"Loop lag p50={lag['p50_ms']}ms p99={lag['p99_ms']}ms max={lag['max_ms']}ms")
+        finally:
+            await self.stop()
+
+    def health(self):
+        """Per-reader health plus debounce, ingest queue and loop lag metrics"""
+        return {
+            'readers': [supervisor.health() for supervisor in self.supervisors],
+            'debounce': self.debouncer.stats(),
+            'ingest': self.ingest.stats(),
+            'loop_lag': self.loop_lag.stats()
+        }
+
+
+async def main(specs):
+    from backend import app
+    from scan_ingest import ScanIngestQueue
+    from scan_spool import ScanSpool
+
+    readers = parse_reader_specs(specs)
+    if not readers:
+        logger.error("No readers configured. Pass name=address pairs or set RFID_READERS")
+        return
+
+    gateway = BLEGateway(readers, ScanIngestQueue(app, spool=ScanSpool(name='ble_gateway')))
+    await gateway.run_forever()
+
+
+if __name__ == "__main__":
+    reader_specs = sys.argv[1:] or os.getenv('RFID_READERS', '').split(',')
+    try:
+        asyncio.run(main(reader_specs))
+    except KeyboardInterrupt:
+        logger.info("Gateway stopped by user")
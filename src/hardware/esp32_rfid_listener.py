@@ -8,14 +8,18 @@ import asyncio
 from bleak import BleakScanner, BleakClient
 import logging
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import sys
 import os
 
 # Add project path for models
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from models import db, Student, Attendance, RFIDScanLog
 from backend import app
+from scan_ingest import ScanIngestQueue
+from scan_spool import ScanSpool
+from scan_debounce import TagDebouncer
+from loop_lag import LoopLagMonitor
+from scan_frames import FrameError, SequenceTracker, decode_notification
 
 # Configure logging without emojis (Windows compatibility)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -35,6 +39,10 @@ class AttenSyncRFIDListener:
         self.connected = False
         self.scanning = False
         self.scans_processed = 0
+        self.ingest = ScanIngestQueue(app, on_result=self.log_scan_result, spool=ScanSpool(name='esp32'))
+        self.debouncer = TagDebouncer()
+        self.loop_lag = LoopLagMonitor()
+        self.sequence = SequenceTracker()
         
     async def find_esp32_device(self, max_attempts=5):
         """Find the specific ESP32 device"""
@@ -130,18 +138,16 @@ class AttenSyncRFIDListener:
                     self.scans_processed += 1
                     timestamp = datetime.now().strftime('%H:%M:%S')
                     
-                    # Try to decode as text
+                    # Binary frames and legacy text notifications are both accepted
                     try:
-                        decoded_data = data.decode('utf-8').strip()
-                        logger.info(f"[{timestamp}] RFID Data: {decoded_data}")
-                        
-                        # Process RFID scan
-                        asyncio.create_task(self.process_rfid_scan(decoded_data))
-                        
-                    except UnicodeDecodeError:
-                        # Handle binary data
-                        hex_data = data.hex()
-                        logger.info(f"[{timestamp}] RFID Binary: {hex_data}")
+                        frame = decode_notification(data)
+                    except FrameError as e:
+                        logger.warning(f"[{timestamp}] Malformed RFID frame ({e}): {data.hex()}")
+                        return
+                    logger.info(f"[{timestamp}] RFID Data: {', '.join(scan.uid for scan in frame.scans)}")
+                    
+                    # Process RFID scans (duplicates are dropped before any task or query)
+                    self.process_rfid_frame(frame)
                         
                 except Exception as e:
                     logger.error(f"Error processing RFID data: {e}")
@@ -156,83 +162,59 @@ class AttenSyncRFIDListener:
             logger.error(f"Failed to setup notifications: {e}")
             return False
     
-    async def process_rfid_scan(self, rfid_data):
-        """Process RFID scan and update database"""
+    def process_rfid_frame(self, frame):
+        """Check the frame sequence, debounce each tag and hand it to the batched ingest queue"""
         try:
-            logger.info(f"Processing RFID scan: {rfid_data}")
-            
-            # Extract RFID tag from data
-            rfid_tag = None
-            if 'RFID:' in rfid_data:
-                rfid_tag = rfid_data.split('RFID:')[1].strip()
-            elif len(rfid_data.strip()) > 4:  # Assume the whole string is the tag
-                rfid_tag = rfid_data.strip()
-            
-            if not rfid_tag:
-                logger.warning(f"Could not extract RFID tag from: {rfid_data}")
-                return
-            
-            logger.info(f"Extracted RFID tag: {rfid_tag}")
+            if frame.seq is not None:
+                missing = self.sequence.observe(frame.reader_id, frame.seq)
+                if missing < 0:
+                    logger.debug(f"Ignoring repeated frame {frame.seq}")
+                    return
+                if missing:
+                    logger.warning(f"{missing} RFID frames lost before seq {frame.seq}")
             
-            # Update database in Flask app context
-            with app.app_context():
-                # Log the scan
-                scan_log = RFIDScanLog(
-                    rfid_tag=rfid_tag,
-                    scan_time=datetime.now(),
-                    status='success'
-                )
+            received_at = datetime.now()
+            for scan in frame.scans:
+                # Text readers sometimes send short noise; real UIDs are longer
+                if frame.seq is None and len(scan.uid) <= 4:
+                    logger.warning(f"Could not extract RFID tag from: {scan.uid}")
+                    continue
                 
-                # Find student
-                student = Student.query.filter_by(rfid_tag=rfid_tag).first()
+                # Collapse the burst a card produces while it rests on the antenna
+                if not self.debouncer.accept(scan.uid):
+                    logger.debug(f"Suppressed repeat of RFID tag: {scan.uid}")
+                    continue
                 
-                if student:
-                    scan_log.student_id = student.id
-                    logger.info(f"Student found: {student.full_name}")
-                    
-                    # Check if attendance already marked today
-                    today = datetime.now().date()
-                    existing_attendance = Attendance.query.filter_by(
-                        student_id=student.id,
-                        attendance_date=today
-                    ).first()
-                    
-                    if not existing_attendance:
-                        # Mark attendance
-                        attendance = Attendance(
-                            student_id=student.id,
-                            class_id=student.class_id,
-                            teacher_id=1,  # Default teacher
-                            attendance_date=today,
-                            method='rfid'
-                        )
-                        db.session.add(attendance)
-                        scan_log.attendance_id = attendance.id
-                        
-                        logger.info(f"Attendance marked for {student.full_name}")
-                    else:
-                        scan_log.status = 'already_marked'
-                        logger.info(f"Attendance already marked for {student.full_name}")
-                        
-                else:
-                    scan_log.status = 'invalid_tag'
-                    scan_log.error_message = f'No student found with RFID tag: {rfid_tag}'
-                    logger.warning(f"No student found with RFID tag: {rfid_tag}")
-                
-                # Save scan log
-                db.session.add(scan_log)
-                db.session.commit()
+                logger.info(f"Extracted RFID tag: {scan.uid}")
                 
-                logger.info(f"Scan processed successfully! Total scans: {self.scans_processed}")
+                # Database work happens in the ingest queue, one transaction per batch
+                scan_time = received_at - timedelta(milliseconds=scan.age_ms)
+                self.ingest.submit_nowait(scan.uid, scan_time)
                 
         except Exception as e:
             logger.error(f"Error processing RFID scan: {e}")
     
+    def log_scan_result(self, result):
+        """Report the outcome of a scan once its batch is committed"""
+        if result.status == 'success':
+            logger.info(f"Attendance marked for {result.student_name}")
+        elif result.status == 'already_marked':
+            logger.info(f"Attendance already marked for {result.student_name}")
+        elif result.status == 'invalid_tag':
+            logger.warning(f"No student found with RFID tag: {result.rfid_tag}")
+        elif result.status == 'spooled':
+            logger.warning(f"Database busy; scan {result.rfid_tag} kept in spool for replay")
+        else:
+            logger.error(f"Scan for {result.rfid_tag} could not be saved")
+        logger.info(f"Scan processed! Total scans: {self.scans_processed}")
+    
     async def run_rfid_system(self):
         """Main RFID system loop"""
         try:
             logger.info("Starting AttenSync RFID System...")
             logger.info("="*50)
+            await self.ingest.start()
+            self.loop_lag.start()
             
             # Step 1: Find ESP32
             device_address = await self.find_esp32_device()
@@ -260,7 +242,9 @@ class AttenSyncRFIDListener:
                 
                 # Print status every 30 seconds
                 if self.scans_processed > 0 and self.scans_processed % 10 == 0:
-                    logger.info(f"Status: {self.scans_processed} scans processed")
+                    logger.info(f"Status: {self.scans_processed} scans processed, "
+                                f"debounce: {self.debouncer.stats()}, ingest: {self.ingest.stats()}, "
+                                f"loop lag: {self.loop_lag.stats()}")
             
         except KeyboardInterrupt:
             logger.info("RFID system stopped by user")
@@ -281,6 +265,8 @@ class AttenSyncRFIDListener:
                 logger.error(f"Disconnect error: {e}")
         
         self.connected = False
+        await self.loop_lag.stop()
+        await self.ingest.stop()
         logger.info(f"RFID system shutdown. Total scans processed: {self.scans_processed}")
 
 async def main():
@@ -0,0 +1,64 @@
+"""
+Event loop lag monitor for the BLE listeners
+Measures how late the loop wakes a sleeping task; anything that blocks the
+loop (a database commit, a model fit) shows up as lag
+"""
+import asyncio
+import time
+from collections import deque
+
+DEFAULT_INTERVAL = 0.01  # seconds between probes
+DEFAULT_SAMPLES = 2048  # probes kept for percentiles
+
+
+class LoopLagMonitor:
+    """Periodically sleeps and records how far past the deadline it woke up"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL, samples=DEFAULT_SAMPLES):
+        """
+        Args:
+            interval (float): Probe interval in seconds
+            samples (int): Number of recent probes kept for percentiles
+        """
+        self.interval = interval
+        self._lags = deque(maxlen=samples)
+        self._task = None
+        self.max_lag = 0.0
+
+    def start(self):
+        if not self._task:
+            self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _probe(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self._lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def reset(self):
+        self._lags.clear()
+        self.max_lag = 0.0
+
+    def stats(self):
+        """p50/p99/max loop lag in milliseconds over recent probes"""
+        lags = sorted(self._lags)
+        if not lags:
+            return {'samples': 0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+        return {
+            'samples': len(lags),
+            'p50_ms': round(lags[len(lags) // 2] * 1000, 2),
+            'p99_ms': round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 2),
+            'max_ms': round(self.max_lag * 1000, 2)
+        }
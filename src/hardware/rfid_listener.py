@@ -1,9 +1,14 @@
 import asyncio
 from bleak import BleakScanner, BleakClient
 import time
-from datetime import datetime
-from app import db, Attendance, Student
-from rfid_scan_log import RFIDScanLog
+from datetime import datetime, timedelta
+from backend import app
+from scan_ingest import ScanIngestQueue
+from scan_spool import ScanSpool
+from scan_debounce import TagDebouncer
+from loop_lag import LoopLagMonitor
+from forecast_refresh import ForecastRefresher
+from scan_frames import FrameError, SequenceTracker, decode_notification
 
 # ESP32 BLE details
 RFID_SERVICE_UUID = "12345678-1234-1234-1234-1234567890ab"
@@ -17,8 +22,28 @@ class BLE_RFIDReader:
         self.retry_delay = retry_delay
         self.client = None
         self.is_running = True
+        self.ingest = ScanIngestQueue(app, on_result=self._on_scan_result, spool=ScanSpool(name='ble_reader'))
+        self.debouncer = TagDebouncer()
+        self.loop_lag = LoopLagMonitor()
+        self.sequence = SequenceTracker()
+        self.forecast = ForecastRefresher(self._fit_forecast)
 
     async def start(self):
+        await self.ingest.start()
+        self.loop_lag.start()
+        self.forecast.start()
+        try:
+            await self._connect_loop()
+        finally:
+            await self.loop_lag.stop()
+            await self.ingest.stop()
+            self.forecast.stop(timeout=5)
+            print(f"Debounce stats: {self.debouncer.stats()}")
+            print(f"Event loop lag: {self.loop_lag.stats()}")
+            print(f"Frame stats: {self.sequence.stats()}")
+            print(f"Forecast refresh: {self.forecast.stats()}")
+
+    async def _connect_loop(self):
         retries = self.max_retries
         while retries > 0 and self.is_running:
             try:
@@ -82,71 +107,64 @@ class BLE_RFIDReader:
                 await self.cleanup()
 
     def notification_handler(self, sender, data):
-        from app import app, db  # Import app and db for context
         try:
             print(f"Notification received from {sender}. Raw data: {data}")
             try:
-                rfid_tag = data.decode().strip()
-            except Exception as decode_err:
-                print(f"Decode error: {decode_err}. Data: {data}")
-                rfid_tag = None
-            if not rfid_tag:
+                frame = decode_notification(data)
+            except FrameError as frame_err:
+                print(f"Decode error: {frame_err}. Data: {data}")
+                return
+            if not frame.scans:
                 print("No valid RFID tag received.")
                 return
-            current_time = datetime.now()
-            print(f"\n🏷️  Tag detected: {rfid_tag}")
-            print(f"⏰ Time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
-            # Save to database inside app context
-            try:
-                with app.app_context():
-                    self._save_attendance(rfid_tag, current_time)
-                    print(f"✓ RFID tag {rfid_tag} saved at {current_time}")
-            except Exception as db_err:
-                db.session.rollback()
-                print(f"Failed to save RFID tag: {db_err}")
+            if frame.seq is not None:
+                missing = self.sequence.observe(frame.reader_id, frame.seq)
+                if missing < 0:
+                    # Repeated frame
+                    return
+                if missing:
+                    print(f"⚠️  {missing} frames lost before seq {frame.seq}")
+            received_at = datetime.now()
+            for scan in frame.scans:
+                if not self.debouncer.accept(scan.uid):
+                    # Same card still on the antenna
+                    continue
+                current_time = received_at - timedelta(milliseconds=scan.age_ms)
+                print(f"\n🏷️  Tag detected: {scan.uid}")
+                print(f"⏰ Time: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                # Queue for the batched writer; never touch the database from the callback
+                if not self.ingest.submit_nowait(scan.uid, current_time):
+                    print(f"Scan queue full, RFID tag {scan.uid} was not saved")
         except Exception as e:
             print(f"Error processing RFID data: {e}")
         finally:
             print("\nWaiting for next tag...")
 
-    def _save_attendance(self, rfid_tag, timestamp):
-        from app import db
-        try:
-            student = Student.query.filter_by(rfid_tag=rfid_tag).first()
-            student_name = student.full_name if student else "Unknown"
-            scan_log = RFIDScanLog(tag=rfid_tag, student_name=student_name, timestamp=timestamp)
-            db.session.add(scan_log)
-            db.session.commit()
-            print(f"✓ RFID scan {rfid_tag} ({student_name}) logged at {timestamp}")
-            if not student:
-                print(f"No student found with RFID tag {rfid_tag}")
-                return
-            today_attendance = Attendance.query.filter(
-                Attendance.student_id == student.id,
-                Attendance.attendance_date == timestamp.date()
-            ).first()
-            if today_attendance:
-                print(f"Attendance already marked for student {student.full_name} today")
-                return
-            new_attendance = Attendance(
-                student_id=student.id,
-                class_id=student.class_id,
-                teacher_id=1,
-                attendance_date=timestamp.date(),
-                time_marked=timestamp,
-                status='present',
-                method='rfid',
-                confidence_score=1.0,
-                notes=f"Marked via RFID tag: {rfid_tag}"
-            )
-            db.session.add(new_attendance)
-            db.session.commit()
-            print(f"✓ Attendance marked for {student.full_name}")
-            from model import generate_forecast_from_db
-            generate_forecast_from_db()
-        except Exception as e:
-            db.session.rollback()
-            print(f"Failed to save attendance record: {e}")
+    def _on_scan_result(self, result):
+        if result.status == 'error':
+            print(f"Failed to save RFID tag {result.rfid_tag}")
+            return
+        if result.status == 'spooled':
+            print(f"Database busy, RFID tag {result.rfid_tag} spooled for replay")
+            return
+        student_name = result.student_name or "Unknown"
+        print(f"✓ RFID scan {result.rfid_tag} ({student_name}) logged at {result.scan_time}")
+        if result.status == 'invalid_tag':
+            print(f"No student found with RFID tag {result.rfid_tag}")
+        elif result.status == 'already_marked':
+            print(f"Attendance already marked for student {student_name} today")
+        else:
+            print(f"✓ Attendance marked for {student_name}")
+            # The refit happens later on the refresher's own thread
+            self.forecast.mark_dirty()
+
+    @staticmethod
+    def _fit_forecast():
+        # Forecasting lives on the legacy app.py models
+        from app import app as forecast_app
+        from model import generate_forecast_from_db
+        with forecast_app.app_context():
+            generate_forecast_from_db(plot=False)
 
     async def cleanup(self):
         if self.client and self.client.is_connected:
@@ -14,10 +14,12 @@ import sys
 import os
 import logging
 import asyncio
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import colorama
 from colorama import Fore, Back, Style
 
+from scan_frames import FrameError, SequenceTracker, decode_notification
+
 # Initialize colorama for Windows
 colorama.init()
 
@@ -66,6 +68,7 @@ def setup_database_connection():
         # Import Flask and models
         from flask import Flask
         from models import db, Student, Attendance, RFIDScanLog
+        from database import engine_options, resolve_db_path, sqlite_uri
         
         # Create Flask app for database context
         app = Flask(__name__)
@@ -74,9 +77,10 @@ def setup_database_connection():
         basedir = os.path.abspath(os.path.dirname(__file__))
         instance_path = os.path.join(basedir, '..', '..', 'instance')
         os.makedirs(instance_path, exist_ok=True)
-        db_path = os.path.join(instance_path, 'attendance_system.db')  # Use same DB as backend
+        db_path = resolve_db_path(os.path.join(instance_path, 'attendance_system.db'))  # Use same DB as backend
         
-        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+        app.config['SQLALCHEMY_DATABASE_URI'] = sqlite_uri(db_path)
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         
         # Initialize database
@@ -114,6 +118,9 @@ class RFIDSystem:
         self.Student = None
         self.Attendance = None
         self.RFIDScanLog = None
+        self.ingest = None
+        self.debouncer = None
+        self.sequence = SequenceTracker()
         self.running = False
         self.demo_mode = demo_mode
         
@@ -226,16 +233,7 @@ class RFIDSystem:
                                 # Setup notification handler
                                 def notification_handler(sender, data):
                                     try:
-                                        rfid_data = data.decode('utf-8').strip()
-                                        logger.info(f"[RFID] Card detected: {rfid_data}")
-                                        student_name, status = self.process_rfid_scan(rfid_data)
-                                        print_card_detected(rfid_data, student_name, status)
-                                    except UnicodeDecodeError:
-                                        # Handle binary data
-                                        hex_data = data.hex().upper()
-                                        logger.info(f"[RFID] Card detected (hex): {hex_data}")
-                                        student_name, status = self.process_rfid_scan(hex_data)
-                                        print_card_detected(hex_data, student_name, status)
+                                        self.process_notification(data)
                                     except Exception as e:
                                         logger.error(f"[ERROR] Error processing RFID data: {e}")
                                         print(f"{Fore.RED}❌ Error processing RFID data: {e}{Style.RESET_ALL}")
@@ -267,15 +265,7 @@ class RFIDSystem:
                             
                             def notification_handler(sender, data):
                                 try:
-                                    rfid_data = data.decode('utf-8').strip()
-                                    logger.info(f"[RFID] Card detected: {rfid_data}")
-                                    student_name, status = self.process_rfid_scan(rfid_data)
-                                    print_card_detected(rfid_data, student_name, status)
-                                except UnicodeDecodeError:
-                                    hex_data = data.hex().upper()
-                                    logger.info(f"[RFID] Card detected (hex): {hex_data}")
-                                    student_name, status = self.process_rfid_scan(hex_data)
-                                    print_card_detected(hex_data, student_name, status)
+                                    self.process_notification(data)
                                 except Exception as e:
                                     logger.error(f"[ERROR] Error processing RFID data: {e}")
                                     print(f"{Fore.RED}❌ Error processing RFID data: {e}{Style.RESET_ALL}")
@@ -296,74 +286,53 @@ class RFIDSystem:
         except Exception as e:
             logger.error(f"[ERROR] Connection error: {e}")
     
-    def process_rfid_scan(self, rfid_uid):
-        """Process RFID scan and update attendance"""
-        if not all([self.app, self.db, self.Student, self.Attendance, self.RFIDScanLog]):
+    def process_notification(self, data):
+        """Decode a BLE notification (binary frame or legacy text) and queue its scans"""
+        try:
+            frame = decode_notification(data)
+        except FrameError as e:
+            logger.warning(f"[FRAME] Malformed RFID frame ({e}): {data.hex()}")
+            return
+        
+        if frame.seq is not None:
+            missing = self.sequence.observe(frame.reader_id, frame.seq)
+            if missing < 0:
+                return
+            if missing:
+                logger.warning(f"[FRAME] {missing} frames lost before seq {frame.seq}")
+        
+        received_at = datetime.now()
+        for scan in frame.scans:
+            logger.info(f"[RFID] Card detected: {scan.uid}")
+            self.process_rfid_scan(scan.uid, received_at - timedelta(milliseconds=scan.age_ms))
+    
+    def process_rfid_scan(self, rfid_uid, scan_time=None):
+        """Queue an RFID scan; attendance is written by the batched ingest queue"""
+        if not self.ingest:
             logger.error("[ERROR] Database not properly initialized")
-            return None, None
+            return False
         
-        try:
-            with self.app.app_context():
-                # Log the scan
-                scan_log = self.RFIDScanLog(
-                    rfid_tag=rfid_uid,  # Changed from rfid_uid to rfid_tag
-                    scan_time=datetime.now(),
-                    status='detected'
-                )
-                self.db.session.add(scan_log)
-                
-                # Find student by RFID
-                student = self.Student.query.filter_by(rfid_tag=rfid_uid).first()  # Changed from rfid_uid to rfid_tag
-                
-                if student:
-                    # Check if already marked present today
-                    today = date.today()
-                    existing_attendance = self.Attendance.query.filter_by(
-                        student_id=student.id,
-                        attendance_date=today  # Changed from date to attendance_date
-                    ).first()
-                    
-                    if existing_attendance:
-                        logger.info(f"[DUPLICATE] {student.full_name} already marked present today")
-                        scan_log.status = 'already_marked'
-                        scan_log.student_id = student.id
-                        scan_log.student_name = student.full_name
-                        self.db.session.commit()  # Commit the scan log
-                        return student.full_name, "duplicate"
-                    else:
-                        # Mark attendance
-                        attendance = self.Attendance(
-                            student_id=student.id,
-                            class_id=student.class_id,
-                            teacher_id=1,  # Default teacher ID - should be configurable
-                            attendance_date=today,
-                            time_marked=datetime.now(),
-                            status='present',
-                            method='rfid'
-                        )
-                        self.db.session.add(attendance)
-                        logger.info(f"[SUCCESS] Attendance marked for {student.full_name}")
-                        scan_log.status = 'success'
-                        scan_log.student_id = student.id
-                        scan_log.student_name = student.full_name
-                        scan_log.attendance_id = attendance.id  # Link the attendance record
-                        self.db.session.commit()  # Commit both attendance and scan log
-                        return student.full_name, "success"
-                else:
-                    logger.warning(f"[UNKNOWN] Unknown RFID card: {rfid_uid}")
-                    scan_log.status = 'invalid_tag'
-                    scan_log.error_message = f'No student found with RFID tag: {rfid_uid}'
-                    self.db.session.commit()  # Commit the scan log even for unknown cards
-                    return None, "unknown"
-                
-        except Exception as e:
-            logger.error(f"[ERROR] Database error: {e}")
-            if self.db:
-                try:
-                    self.db.session.rollback()
-                except:
-                    pass
-            return None, "error"
+        # Drop the repeats a card produces while it rests on the antenna
+        if not self.debouncer.accept(rfid_uid):
+            return False
+        
+        return self.ingest.submit_nowait(rfid_uid, scan_time)
+    
+    def report_scan_result(self, result):
+        """Print the outcome of a scan once its batch is committed"""
+        if result.status == 'success':
+            logger.info(f"[SUCCESS] Attendance marked for {result.student_name}")
+            print_card_detected(result.rfid_tag, result.student_name, "success")
+        elif result.status == 'already_marked':
+            logger.info(f"[DUPLICATE] {result.student_name} already marked present today")
+            print_card_detected(result.rfid_tag, result.student_name, "duplicate")
+        elif result.status == 'invalid_tag':
+            logger.warning(f"[UNKNOWN] Unknown RFID card: {result.rfid_tag}")
+            print_card_detected(result.rfid_tag)
+        elif result.status == 'spooled':
+            logger.warning(f"[SPOOLED] Database busy; scan {result.rfid_tag} will be saved when it recovers")
+        else:
+            logger.error(f"[ERROR] Database error while saving scan {result.rfid_tag}")
     
     async def start_system(self):
         """Start the RFID system"""
@@ -382,10 +351,22 @@ class RFIDSystem:
             return False
         
         # Initialize database tables
+        from migrations import run_migrations
         with self.app.app_context():
             self.db.create_all()
+            run_migrations(self.db.engine)
             logger.info("[OK] Database tables initialized")
         
+        from scan_ingest import ScanIngestQueue
+        from scan_spool import ScanSpool
+        from scan_debounce import TagDebouncer
+        from loop_lag import LoopLagMonitor
+        self.ingest = ScanIngestQueue(self.app, on_result=self.report_scan_result, spool=ScanSpool(name='rfid_system'))
+        self.debouncer = TagDebouncer()
+        self.loop_lag = LoopLagMonitor()
+        await self.ingest.start()
+        self.loop_lag.start()
+        
         self.running = True
         
         # If hardware dependencies are missing, offer to run in demo mode
@@ -439,6 +420,10 @@ class RFIDSystem:
             logger.error(f"[ERROR] System error: {e}")
         finally:
             self.running = False
+            await self.loop_lag.stop()
+            await self.ingest.stop()
+            logger.info(f"[STATS] Debounce: {self.debouncer.stats()}")
+            logger.info(f"[STATS] Event loop lag: {self.loop_lag.stats()}")
         
         return True
 
@@ -0,0 +1,74 @@
+"""
+Per-tag debounce for BLE RFID notifications
+Collapses the burst of identical UIDs a reader sends while a card rests on
+the antenna into a single logical scan
+"""
+import os
+import time
+from collections import Counter
+
+# A repeat of the same tag within this many seconds of its previous copy is
+# treated as the same tap. The window slides, so a card left on the reader
+# stays one scan for as long as the reader keeps reporting it.
+DEFAULT_DEBOUNCE_WINDOW = float(os.getenv('RFID_DEBOUNCE_SECONDS', '2.0'))
+
+# Forget tags not seen for a while once the table grows past this size
+PRUNE_THRESHOLD = 1024
+
+
+class TagDebouncer:
+    """Suppress repeated notifications of the same tag from the same reader"""
+
+    def __init__(self, window=DEFAULT_DEBOUNCE_WINDOW, clock=time.monotonic):
+        """
+        Args:
+            window (float): Debounce window in seconds, 0 to disable
+            clock (callable): Monotonic time source (injectable for tests)
+        """
+        self.window = window
+        self.clock = clock
+        self._last_seen = {}
+
+        # Metrics
+        self.accepted = 0
+        self.suppressed = 0
+        self.suppressed_by_tag = Counter()
+
+    def accept(self, rfid_tag, reader_id=None):
+        """
+        Record a notification and decide whether it is a new scan
+
+        Returns:
+            bool: True for the first copy of a tap, False for a suppressed duplicate
+        """
+        now = self.clock()
+        key = (reader_id, rfid_tag)
+        last = self._last_seen.get(key)
+        self._last_seen[key] = now
+
+        if last is not None and now - last < self.window:
+            self.suppressed += 1
+            self.suppressed_by_tag[rfid_tag] += 1
+            return False
+
+        self.accepted += 1
+        if len(self._last_seen) > PRUNE_THRESHOLD:
+            self._prune(now)
+        return True
+
+    def _prune(self, now):
+        self._last_seen = {
+            key: seen for key, seen in self._last_seen.items()
+            if now - seen < self.window
+        }
+
+    def stats(self):
+        """Accepted vs suppressed notification counts"""
+        total = self.accepted + self.suppressed
+        return {
+            'window_seconds': self.window,
+            'accepted': self.accepted,
+            'suppressed': self.suppressed,
+            'suppression_ratio': round(self.suppressed / total, 3) if total else 0.0,
+            'top_suppressed': self.suppressed_by_tag.most_common(5)
+        }
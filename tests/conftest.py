@@ -0,0 +1,82 @@
+"""
+Shared pytest fixtures for AttenSync
+Puts the backend and hardware modules on the path and provides a Flask app
+bound to a throwaway SQLite database
+"""
+import os
+import sys
+from datetime import date
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ('backend', 'hardware'):
+    path = os.path.join(ROOT, 'src', folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Flask app on a fresh database with one teacher, one class and three students"""
+    from flask import Flask
+    from models import db, User, Class, Student
+    from migrations import run_migrations
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'attendance_system.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        run_migrations(db.engine)
+        teacher = User(username='admin', email='admin@attensync.com', full_name='Admin', role='admin')
+        teacher.set_password('admin123')
+        db.session.add(teacher)
+        db.session.flush()
+        cls = Class(name='Class 5A', grade_level=5, section='A', teacher_id=teacher.id, academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        for i, name in enumerate(['Arjun Sharma', 'Priya Patel', 'Rahul Verma'], start=1):
+            db.session.add(Student(
+                roll_number=f'{i:02d}',
+                rfid_tag=f'TAG{i:03d}',
+                full_name=name,
+                class_id=cls.id,
+                enrollment_date=date.today()
+            ))
+        db.session.commit()
+
+    yield app
+
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture(scope='session')
+def backend(tmp_path_factory):
+    """The backend module on its own database (importing it initialises the database)"""
+    tmp = tmp_path_factory.mktemp('backend')
+    cwd = os.getcwd()
+    os.environ['ATTENSYNC_DB_PATH'] = str(tmp / 'attendance_system.db')
+    os.chdir(tmp)  # backend creates its upload folder relative to the working directory
+    try:
+        import backend
+    finally:
+        os.chdir(cwd)
+        del os.environ['ATTENSYNC_DB_PATH']
+    return backend
+
+
+@pytest.fixture(scope='session')
+def legacy(tmp_path_factory):
+    """The legacy app.py module on its own database, tables created as init_db does"""
+    tmp = tmp_path_factory.mktemp('legacy')
+    os.environ['ATTENSYNC_DB_PATH'] = str(tmp / 'attendance_system.db')
+    try:
+        import app as legacy
+    finally:
+        del os.environ['ATTENSYNC_DB_PATH']
+    legacy.init_db()
+    return legacy
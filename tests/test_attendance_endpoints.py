@@ -0,0 +1,127 @@
+"""
+Tests for the backend attendance marking endpoints (single and bulk)
+"""
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def students(backend):
+    """Three students in a class of their own"""
+    from models import db, Class, Student, User
+
+    with backend.app.app_context():
+        cls = Class(name='Marking Class', grade_level=7, section='C',
+                    teacher_id=User.query.first().id, academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        ids = []
+        for i in range(3):
+            student = Student(roll_number=f'{i:02d}', rfid_tag=f'MK{i:03d}', full_name=f'Marker {i}',
+                              class_id=cls.id, enrollment_date=date.today())
+            db.session.add(student)
+            db.session.flush()
+            ids.append(student.id)
+        db.session.commit()
+        return ids
+
+
+def test_mark_creates_then_updates(backend, students):
+    from models import Attendance
+
+    client = backend.app.test_client()
+    payload = {'student_id': students[0], 'status': 'late', 'date': '2025-02-03'}
+    created = client.post('/api/attendance/mark', json=payload)
+    assert created.status_code == 201
+    body = created.get_json()['attendance']
+    assert body['student_name'] == 'Marker 0' and body['status'] == 'late'
+    assert body['attendance_date'] == '2025-02-03'
+    assert body['class_name'] == 'Marking Class' and body['teacher_name']
+    assert body['time_marked'] and body['created_at']
+
+    updated = client.post('/api/attendance/mark', json=dict(payload, status='present'))
+    assert updated.status_code == 200
+    assert updated.get_json()['attendance']['id'] == body['id']
+    with backend.app.app_context():
+        assert Attendance.query.get(body['id']).status == 'present'
+
+
+def test_mark_unknown_student_is_404(backend):
+    response = backend.app.test_client().post('/api/attendance/mark', json={'student_id': 99999})
+    assert response.status_code == 404
+
+
+def bulk(backend, payload):
+    response = backend.app.test_client().post('/api/attendance/bulk', json=payload)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def stored(backend, student_ids, day):
+    from models import Attendance
+
+    with backend.app.app_context():
+        return {row.student_id: row.status for row in Attendance.query.filter(
+            Attendance.student_id.in_(student_ids), Attendance.attendance_date == day)}
+
+
+def test_bulk_mixed_statuses(backend, students):
+    body = bulk(backend, {'date': '2025-02-04', 'records': [
+        {'student_id': students[0], 'status': 'present'},
+        {'student_id': students[1], 'status': 'absent'},
+        {'student_id': students[2], 'status': 'late', 'notes': 'bus'}
+    ]})
+    assert body['created'] == 3 and body['updated'] == 0 and body['errors'] == 0
+    assert [item['status'] for item in body['results']] == ['created'] * 3
+    assert stored(backend, students, date(2025, 2, 4)) == dict(zip(students, ['present', 'absent', 'late']))
+
+    # Re-submitting the roll call updates the same rows
+    again = bulk(backend, {'date': '2025-02-04', 'student_ids': students, 'status': 'present'})
+    assert again['created'] == 0 and again['updated'] == 3
+    assert [item['attendance_id'] for item in again['results']] == [item['attendance_id'] for item in body['results']]
+    assert set(stored(backend, students, date(2025, 2, 4)).values()) == {'present'}
+
+
+def test_bulk_reports_bad_records_and_writes_the_rest(backend, students):
+    body = bulk(backend, {'date': '2025-02-05', 'records': [
+        {'student_id': 'abc'},
+        {'student_id': 99999},
+        {'student_id': students[0], 'status': 'sleeping'},
+        {'student_id': students[1], 'date': '05/02/2025'},
+        {'student_id': students[2]}
+    ]})
+    assert [item['status'] for item in body['results']] == ['error'] * 4 + ['created']
+    assert body['results'][0]['message'] == 'Invalid student_id or date'
+    assert body['results'][1]['message'] == 'Student not found'
+    assert body['results'][2]['message'] == 'Invalid status: sleeping'
+    assert body['errors'] == 4 and body['created'] == 1
+    assert stored(backend, students, date(2025, 2, 5)) == {students[2]: 'present'}
+
+
+def test_bulk_accepts_the_attendance_shape(backend, students):
+    # The frontend posts {attendance: [{studentId, status, date}]}
+    body = bulk(backend, {'attendance': [
+        {'studentId': students[0], 'status': 'late', 'date': '2025-02-06'},
+        {'studentId': str(students[1]), 'status': 'absent', 'date': '2025-02-07'}
+    ]})
+    assert body['created'] == 2 and body['errors'] == 0
+    assert [item['student_id'] for item in body['results']] == [students[0], str(students[1])]
+    assert stored(backend, students, date(2025, 2, 6)) == {students[0]: 'late'}
+    assert stored(backend, students, date(2025, 2, 7)) == {students[1]: 'absent'}
+
+
+def test_bulk_without_students_is_rejected(backend):
+    response = backend.app.test_client().post('/api/attendance/bulk', json={'records': []})
+    assert response.status_code == 400
+
+
+def test_bulk_reports_non_object_records(backend, students):
+    body = bulk(backend, {'date': '2025-02-10', 'records': [42, 'abc', None, {'student_id': students[0]}]})
+    assert [item['status'] for item in body['results']] == ['error'] * 3 + ['created']
+    assert body['results'][0] == {'student_id': None, 'status': 'error', 'message': 'Each record must be an object'}
+    assert body['errors'] == 3
+    assert stored(backend, students, date(2025, 2, 10)) == {students[0]: 'present'}
+
+    response = backend.app.test_client().post('/api/attendance/bulk', json={'records': {'student_id': students[0]}})
+    assert response.status_code == 400
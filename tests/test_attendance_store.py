@@ -0,0 +1,90 @@
+"""
+Tests for the single-statement attendance upsert
+"""
+from datetime import date, datetime
+
+import attendance_store
+from attendance_store import UPSERT_CHUNK, upsert_attendance
+from models import db, Attendance, Student
+
+
+def rows(status='present', notes=None):
+    return [
+        {
+            'student_id': student.id,
+            'class_id': student.class_id,
+            'teacher_id': 1,
+            'attendance_date': date(2025, 1, 6),
+            'status': status,
+            'method': 'manual',
+            'notes': notes
+        }
+        for student in Student.query.order_by(Student.id).all()
+    ]
+
+
+def test_upsert_reports_created_then_updated(app):
+    with app.app_context():
+        first = upsert_attendance(db.session, rows(notes='late bus'))
+        db.session.commit()
+        assert (first.created, first.updated) == (3, 0)
+
+        second = upsert_attendance(db.session, rows(status='absent'))
+        db.session.commit()
+        assert (second.created, second.updated) == (0, 3)
+        assert [row.id for row in second.rows] == [row.id for row in first.rows]
+
+        assert Attendance.query.count() == 3
+        record = Attendance.query.get(first.rows[0].id)
+        assert record.status == 'absent'
+        assert record.notes == 'late bus'  # not overwritten without new notes
+        assert record.created_at < record.updated_at
+
+
+def test_ignore_keeps_existing_rows(app):
+    with app.app_context():
+        upsert_attendance(db.session, rows(status='absent')[:1])
+        result = upsert_attendance(db.session, rows(), on_conflict='ignore')
+        db.session.commit()
+
+        assert (result.created, result.updated) == (2, 0)
+        assert Attendance.query.filter_by(status='absent').count() == 1
+
+
+def test_large_batches_are_chunked(app):
+    with app.app_context():
+        template = rows()[0]
+        many = [dict(template, student_id=1000 + i) for i in range(UPSERT_CHUNK + 10)]
+        result = upsert_attendance(db.session, many)
+        db.session.commit()
+
+        assert result.created == len(many)
+        assert Attendance.query.count() == len(many)
+
+
+def test_update_moves_time_marked(app):
+    with app.app_context():
+        first = upsert_attendance(db.session, rows())
+        db.session.commit()
+        earlier = Attendance.query.get(first.rows[0].id).time_marked
+
+        retap = [dict(row, time_marked=datetime(2025, 1, 6, 9, 30)) for row in rows()]
+        upsert_attendance(db.session, retap)
+        db.session.commit()
+
+        record = Attendance.query.get(first.rows[0].id)
+        assert record.time_marked == datetime(2025, 1, 6, 9, 30) != earlier
+
+
+def test_read_back_without_returning(app, monkeypatch):
+    monkeypatch.setattr(attendance_store, 'RETURNING_SUPPORTED', False)
+    with app.app_context():
+        upsert_attendance(db.session, rows(status='absent')[:1])
+        ignored = upsert_attendance(db.session, rows(), on_conflict='ignore')
+        assert (ignored.created, ignored.updated) == (2, 0)
+
+        updated = upsert_attendance(db.session, rows(status='late'))
+        db.session.commit()
+        assert (updated.created, updated.updated) == (0, 3)
+        assert {row.status for row in updated.rows} == {'late'}
+        assert len({row.id for row in updated.rows}) == Attendance.query.count() == 3
@@ -0,0 +1,61 @@
+"""
+Tests for the trigger-maintained daily attendance summary
+"""
+from datetime import date
+
+from sqlalchemy import text
+
+from attendance_store import upsert_attendance
+from models import db, Attendance, DailyAttendanceSummary, Student
+
+DAY = date(2025, 1, 6)
+
+RECOUNT = """
+    SELECT attendance_date, class_id,
+           SUM(status = 'present'), SUM(status = 'absent'), SUM(status = 'late'), COUNT(*)
+    FROM attendance GROUP BY attendance_date, class_id ORDER BY attendance_date, class_id
+"""
+
+
+def summary():
+    return [
+        (row.attendance_date, row.class_id, row.present_count, row.absent_count, row.late_count, row.total_count)
+        for row in DailyAttendanceSummary.query.order_by(
+            DailyAttendanceSummary.attendance_date, DailyAttendanceSummary.class_id
+        )
+    ]
+
+
+def recount():
+    return [
+        (date.fromisoformat(row[0]), *row[1:])
+        for row in db.session.execute(text(RECOUNT))
+    ]
+
+
+def test_summary_follows_every_kind_of_write(app):
+    with app.app_context():
+        students = Student.query.order_by(Student.id).all()
+        class_id = students[0].class_id
+
+        # ORM insert, multi-row upsert (insert and update), ORM update and delete
+        db.session.add(Attendance(student_id=students[0].id, class_id=class_id, teacher_id=1,
+                                  attendance_date=DAY, status='present', method='rfid'))
+        db.session.commit()
+        upsert_attendance(db.session, [
+            {'student_id': student.id, 'class_id': class_id, 'teacher_id': 1,
+             'attendance_date': DAY, 'status': status, 'method': 'manual'}
+            for student, status in zip(students, ['late', 'absent', 'present'])
+        ])
+        db.session.commit()
+        assert summary() == [(DAY, class_id, 1, 1, 1, 3)]
+
+        record = Attendance.query.filter_by(student_id=students[1].id).one()
+        record.status = 'present'
+        record.attendance_date = date(2025, 1, 7)
+        db.session.commit()
+        assert summary() == recount()
+
+        db.session.delete(record)
+        db.session.commit()
+        assert summary() == recount() == [(DAY, class_id, 1, 0, 1, 2)]
@@ -0,0 +1,82 @@
+"""
+Tests for the multi-reader BLE gateway, using the fake BLE transport
+"""
+import asyncio
+
+from ble_gateway import BLEGateway, FakeBLETransport, parse_reader_specs
+from models import Attendance
+from scan_ingest import ScanIngestQueue
+
+
+async def wait_for(predicate, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached"
+        await asyncio.sleep(0.005)
+
+
+def test_parse_reader_specs():
+    readers = parse_reader_specs(['gate-1=AA:BB', ' CC:DD ', ''])
+    assert [(r.reader_id, r.address) for r in readers] == [('gate-1', 'AA:BB'), ('CC:DD', 'CC:DD')]
+
+
+def test_gateway_supervises_readers_independently(app):
+    transport = FakeBLETransport()
+    transport.fail_next('AA:02', count=2)
+    readers = parse_reader_specs(['gate-1=AA:01', 'gate-2=AA:02'])
+
+    async def scenario():
+        gateway = BLEGateway(readers, ScanIngestQueue(app), transport=transport, backoff_base=0.01)
+        await gateway.start()
+        gate1, gate2 = gateway.supervisors
+
+        # gate-1 comes up at once; gate-2 only after two failed attempts
+        await wait_for(lambda: gate1.state == 'connected' and gate2.state == 'connected')
+        assert transport.connect_attempts['AA:02'] == 3
+        assert gate2.connect_failures == 2
+
+        for _ in range(5):  # card resting on gate-1's antenna
+            transport.notify('AA:01', b'RFID: TAG001')
+        transport.notify('AA:02', b'TAG002')
+
+        # Dropping gate-1 must not disturb gate-2
+        transport.drop('AA:01')
+        await wait_for(lambda: gate1.reconnects == 1 and gate1.state == 'connected')
+        assert gate2.reconnects == 0
+        transport.notify('AA:01', b'TAG003')
+
+        await wait_for(lambda: gateway.ingest.stats()['scans_written'] == 3)
+        health = gateway.health()
+        await gateway.stop()
+        return health
+
+    health = asyncio.run(scenario())
+    by_reader = {reader['reader_id']: reader for reader in health['readers']}
+    assert by_reader['gate-1']['notifications'] == 6
+    assert by_reader['gate-1']['scans'] == 2
+    assert by_reader['gate-2']['scans'] == 1
+    assert health['debounce']['suppressed'] == 4
+
+    with app.app_context():
+        assert Attendance.query.count() == 3
+
+
+def test_failed_subscribe_releases_the_connection(app):
+    transport = FakeBLETransport()
+    transport.fail_notify_next('AA:03', count=2)
+
+    async def scenario():
+        gateway = BLEGateway(parse_reader_specs(['gate-3=AA:03']), ScanIngestQueue(app),
+                             transport=transport, backoff_base=0.01)
+        await gateway.start()
+        reader = gateway.supervisors[0]
+        await wait_for(lambda: reader.state == 'connected')
+        failures = reader.connect_failures
+        await gateway.stop()
+        return failures
+
+    assert asyncio.run(scenario()) == 2
+    # The two clients that connected but could not subscribe were disconnected
+    assert len(transport.opened) == 3
+    assert [client.is_connected for client in transport.opened[:2]] == [False, False]
@@ -0,0 +1,49 @@
+"""
+Tests for the single-query dashboard snapshot and its cache
+"""
+from datetime import date, datetime, timedelta
+
+from dashboard import DashboardCache, load_dashboard_snapshot
+from models import db, Attendance, RFIDScanLog, Student
+
+
+def test_snapshot_counts(app):
+    today = date.today()
+    with app.app_context():
+        students = Student.query.order_by(Student.id).all()
+        for student, status in zip(students, ['present', 'present', 'absent']):
+            db.session.add(Attendance(student_id=student.id, class_id=student.class_id, teacher_id=1,
+                                      attendance_date=today, status=status, method='manual'))
+        db.session.add(Attendance(student_id=students[0].id, class_id=students[0].class_id, teacher_id=1,
+                                  attendance_date=today - timedelta(days=3), status='present', method='manual'))
+        db.session.add(RFIDScanLog(rfid_tag='TAG001', scan_time=datetime(2025, 1, 6, 9, 0), status='success'))
+        db.session.commit()
+
+        snapshot = load_dashboard_snapshot(db.session)
+
+    assert snapshot['total_students'] == 3
+    assert snapshot['total_classes'] == 1
+    assert snapshot['present_today'] == 2
+    assert snapshot['absent_today'] == 1
+    assert snapshot['weekly_average'] == round(3 / 7, 1)
+    assert snapshot['attendance_percentage'] == 66.7
+    assert [scan['rfid_tag'] for scan in snapshot['recent_rfid_scans']] == ['TAG001']
+    assert snapshot['recent_rfid_scans'][0]['scan_time'] == '2025-01-06T09:00:00.000000'
+
+
+def test_cache_expires_and_invalidates():
+    now = [0.0]
+    cache = DashboardCache(ttl=2, clock=lambda: now[0])
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return {'load': len(loads)}
+
+    assert cache.get(loader) == {'load': 1}
+    assert cache.get(loader) == {'load': 1}
+    now[0] = 2.5
+    assert cache.get(loader) == {'load': 2}
+    cache.invalidate()
+    assert cache.get(loader) == {'load': 3}
+    assert cache.stats()['hits'] == 1
@@ -0,0 +1,64 @@
+"""
+Tests for the central SQLite connection profile and pool
+"""
+import pytest
+
+from database import ConnectionPool, connect, current_profile, resolve_db_path
+from models import db
+
+
+def test_engine_connections_get_the_profile(app):
+    with app.app_context():
+        profile = current_profile(db.engine.raw_connection())
+
+    assert profile['journal_mode'] == 'wal'
+    assert profile['synchronous'] == 1  # NORMAL
+    assert profile['busy_timeout'] == 5000
+    assert profile['temp_store'] == 2  # MEMORY
+
+
+def test_raw_connections_get_the_profile(tmp_path):
+    conn = connect(str(tmp_path / 'raw.db'))
+    try:
+        profile = current_profile(conn)
+    finally:
+        conn.close()
+
+    assert profile['journal_mode'] == 'wal'
+    assert profile['cache_size'] == -65536
+
+
+def test_db_path_can_be_moved(tmp_path, monkeypatch):
+    target = tmp_path / 'elsewhere' / 'attendance.db'
+    monkeypatch.setenv('ATTENSYNC_DB_PATH', str(target))
+
+    assert resolve_db_path() == str(target)
+    assert target.parent.is_dir()
+
+
+def test_pool_reuses_connections(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), size=2, timeout=0.1)
+    with pool.connection() as first:
+        first.execute("CREATE TABLE t (x INTEGER)")
+    with pool.connection() as again:
+        assert again is first
+        with pool.connection() as second:
+            assert second is not first
+            with pytest.raises(TimeoutError):
+                with pool.connection():
+                    pass
+
+    assert pool.stats()['open'] == 2
+    assert pool.stats()['idle'] == 2
+    pool.close()
+
+
+def test_pool_rolls_back_abandoned_transactions(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), size=1)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.close()
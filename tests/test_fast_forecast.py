@@ -0,0 +1,79 @@
+"""
+Tests for the NumPy forecasters
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fast_forecast import FORECASTERS, FastForecastModel, fit_fast, future_dates
+from models import db
+
+WEEKDAY_EFFECT = np.array([-6.0, 0.0, 2.0, 0.0, -3.0])
+
+
+def school_days(weeks, noise=0.0, seed=3):
+    ds = pd.bdate_range('2025-01-06', periods=weeks * 5)
+    y = 85 + WEEKDAY_EFFECT[ds.weekday] + np.random.default_rng(seed).normal(0, noise, len(ds))
+    return pd.DataFrame({'ds': ds, 'y': y})
+
+
+@pytest.mark.parametrize('method', list(FORECASTERS))
+def test_weekday_pattern_is_forecast(method):
+    history = school_days(8)
+    dates = future_dates(history, 7)
+    yhat, sigma = fit_fast(method, history).predict(dates)
+
+    school = dates.dt.weekday < 5
+    expected = 85 + WEEKDAY_EFFECT[dates[school].dt.weekday]
+    assert np.allclose(yhat[school.to_numpy()], expected, atol=0.5)
+    assert np.all(sigma >= 0) and len(yhat) == 7
+
+
+def test_intervals_widen_with_noise():
+    for method in FORECASTERS:
+        quiet = fit_fast(method, school_days(8, noise=0.5)).sigma
+        noisy = fit_fast(method, school_days(8, noise=4.0)).sigma
+        assert noisy > quiet, method
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        fit_fast('arima', school_days(2))
+    with pytest.raises(ValueError):
+        FastForecastModel(method='arima')
+
+
+def test_model_returns_the_generate_forecast_schema(app, tmp_path):
+    start = date.today() - timedelta(days=28)
+    with app.app_context():
+        conn = db.engine.raw_connection()
+        conn.executemany(
+            "INSERT INTO daily_attendance_summary "
+            "(attendance_date, class_id, present_count, absent_count, late_count, total_count) "
+            "VALUES (?, 1, ?, ?, 0, 3)",
+            [((start + timedelta(days=d)).isoformat(), 2 + d % 2, 1 - d % 2) for d in range(28)]
+        )
+        conn.commit()
+        conn.close()
+
+    model = FastForecastModel(method='ridge', db_path=str(tmp_path / 'attendance_system.db'))
+    forecast = model.generate_forecast(periods=7)
+    assert set(forecast) == {'dates', 'predicted_attendance', 'lower_bound', 'upper_bound',
+                             'confidence_level', 'model_info', 'summary'}
+    assert forecast['dates'][0] == date.today().isoformat()
+    assert len(forecast['predicted_attendance']) == 7
+    assert all(lo <= mid <= hi for lo, mid, hi in
+               zip(forecast['lower_bound'], forecast['predicted_attendance'], forecast['upper_bound']))
+    assert forecast['model_info']['method'] == 'ridge' and forecast['model_info']['fit_ms'] < 100
+
+    # Class without attendance: no forecast
+    assert FastForecastModel(db_path=str(tmp_path / 'attendance_system.db')).generate_forecast(class_id=99) is None
+
+
+@pytest.mark.parametrize('periods', [0, -3])
+def test_quick_forecast_rejects_non_positive_periods(legacy, periods):
+    response = legacy.app.test_client().get(f'/api/forecast/quick?periods={periods}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'periods must be at least 1'
@@ -0,0 +1,86 @@
+"""
+Tests for batch per-class forecasting
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import text
+
+pytest.importorskip('prophet')
+
+from forecast_batch import forecast_all_classes, load_class_series  # noqa: E402
+from models import db, Attendance, Class, Student  # noqa: E402
+
+
+def seed_classes(app):
+    """Class 5A plus two more; the last has too little history to forecast"""
+    start = date.today() - timedelta(days=30)
+    with app.app_context():
+        first = Class.query.first()
+        classes = [first.id]
+        for name, days in (('Class 6A', 25), ('Class 7A', 5)):
+            cls = Class(name=name, grade_level=6, section='A', teacher_id=first.teacher_id, academic_year='2024-25')
+            db.session.add(cls)
+            db.session.flush()
+            for i in range(4):
+                db.session.add(Student(roll_number=f'{i:02d}', full_name=f'{name} Student {i}', class_id=cls.id,
+                                       enrollment_date=start))
+            classes.append((cls.id, days))
+        db.session.flush()
+        classes[0] = (first.id, 25)
+
+        for class_id, days in classes:
+            students = [student.id for student in Student.query.filter_by(class_id=class_id)]
+            for day in range(days):
+                for i, student_id in enumerate(students):
+                    db.session.add(Attendance(student_id=student_id, class_id=class_id, teacher_id=1,
+                                              attendance_date=start + timedelta(days=day),
+                                              status='absent' if (day * 3 + i + class_id) % 5 == 0 else 'present'))
+        db.session.commit()
+        return [class_id for class_id, _ in classes]
+
+
+def test_all_classes_are_forecast_in_one_pass(app, tmp_path):
+    class_ids = seed_classes(app)
+    db_path = str(tmp_path / 'attendance_system.db')
+
+    parallel = forecast_all_classes(db_path, periods=7, workers=2, model_dir=str(tmp_path / 'pool'))
+    assert parallel['classes'] == 2 and parallel['refitted'] == 2
+    assert parallel['skipped'] == [class_ids[2]]
+    assert parallel['rows_written'] == 14
+
+    with app.app_context():
+        stored = db.session.execute(text(
+            "SELECT class_id, forecast_date, predicted_present, predicted_rate FROM attendance_forecast "
+            "ORDER BY class_id, forecast_date"
+        )).fetchall()
+    assert {row.class_id for row in stored} == set(class_ids[:2])
+    assert all(0 <= row.predicted_rate <= 100 for row in stored)
+    with app.app_context():
+        bounds = db.session.execute(text("SELECT yhat_lower, yhat_upper, model_version FROM attendance_forecast")).fetchall()
+    assert all(row.yhat_lower <= row.yhat_upper and row.model_version for row in bounds)
+
+    # Serial and pooled runs produce the same forecast; a rerun reuses the stored fits
+    serial = forecast_all_classes(db_path, periods=7, workers=1, model_dir=str(tmp_path / 'serial'))
+    with app.app_context():
+        again = db.session.execute(text(
+            "SELECT class_id, forecast_date, predicted_present, predicted_rate FROM attendance_forecast "
+            "ORDER BY class_id, forecast_date"
+        )).fetchall()
+    assert serial['refitted'] == 2 and again == stored
+    assert serial['rows_written'] == 0  # same fit, same forecast: nothing rewritten
+    rerun = forecast_all_classes(db_path, periods=7, workers=2, model_dir=str(tmp_path / 'pool'))
+    assert rerun['refitted'] == 0 and rerun['rows_written'] == 0
+
+
+def test_series_are_split_per_class(app, tmp_path):
+    class_ids = seed_classes(app)
+    import sqlite3
+    conn = sqlite3.connect(str(tmp_path / 'attendance_system.db'))
+    try:
+        series = load_class_series(conn, days_back=60)
+    finally:
+        conn.close()
+    assert sorted(series) == sorted(class_ids)
+    assert [len(series[class_id]) for class_id in class_ids] == [25, 25, 5]
+    assert list(series[class_ids[0]].columns) == ['ds', 'y']
@@ -0,0 +1,179 @@
+"""
+Tests for the rolling-origin forecast evaluation
+"""
+import re
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from forecast_eval import (evaluate_forecasters, fold_origins, latest_scores, prediction_accuracy,
+                           score_folds)
+from models import db
+
+METHODS = ['seasonal_naive', 'ets']
+
+
+def seed_summary(app, days, last=None):
+    """School days of class 1 (3 students) over the days up to last (yesterday); Mondays one absent"""
+    start = (last or date.today() - timedelta(days=1)) - timedelta(days=days - 1)
+    rows = []
+    for d in range(days):
+        day = start + timedelta(days=d)
+        if day.weekday() < 5:
+            present = 2 if day.weekday() == 0 else 3
+            rows.append((day.isoformat(), present, 3 - present))
+    with app.app_context():
+        conn = db.engine.raw_connection()
+        conn.executemany(
+            "INSERT INTO daily_attendance_summary "
+            "(attendance_date, class_id, present_count, absent_count, late_count, total_count) "
+            "VALUES (?, 1, ?, ?, 0, 3)", rows
+        )
+        conn.commit()
+        conn.close()
+
+
+def read_scores(path, class_id=0):
+    conn = sqlite3.connect(path)
+    try:
+        return latest_scores(conn, class_id)
+    finally:
+        conn.close()
+
+
+def test_origins_stay_put_as_days_arrive():
+    history = pd.DataFrame({'ds': pd.bdate_range('2025-01-06', '2025-03-28')})
+    origins = fold_origins(history, horizon=7, folds=4)
+    assert [o.strftime('%Y-%m-%d') for o in origins] == ['2025-02-23', '2025-03-02', '2025-03-09', '2025-03-16']
+    # Existing folds keep their origin; a newly completed week adds one and the oldest drops out
+    longer = pd.DataFrame({'ds': pd.bdate_range('2025-01-06', '2025-03-31')})
+    assert fold_origins(longer, horizon=7, folds=4) == origins[1:] + [pd.Timestamp('2025-03-23')]
+
+
+def test_scores_per_horizon():
+    folds = pd.DataFrame({
+        'class_id': 0, 'method': 'ets', 'origin': ['2025-03-02'] * 2 + ['2025-03-09'] * 2,
+        'horizon': [1, 2, 1, 2], 'actual': [80.0, 100.0, 50.0, 100.0], 'predicted': [90.0, 100.0, 50.0, 90.0],
+        'lower': [85.0, 95.0, 45.0, 85.0], 'upper': [95.0, 105.0, 55.0, 95.0]
+    })
+    scores = score_folds(folds).set_index('horizon')
+    assert scores.loc[0, 'mae'] == 5.0 and scores.loc[0, 'folds'] == 2 and scores.loc[0, 'points'] == 4
+    assert scores.loc[1, 'mape'] == 6.25 and scores.loc[1, 'coverage'] == 50.0
+    assert scores.loc[2, 'mape'] == 5.0 and scores.loc[2, 'coverage'] == 50.0
+
+
+def test_evaluation_scores_and_caches_folds(app, tmp_path):
+    path = str(tmp_path / 'attendance_system.db')
+    assert read_scores(path) is None
+    seed_summary(app, 70)
+
+    first = evaluate_forecasters(path, methods=METHODS, folds=4, workers=2)
+    assert first['series'] == 2  # whole school and class 1
+    assert first['folds'] == 2 * 4 * len(METHODS) and first['evaluated'] == first['folds']
+
+    scores = read_scores(path)
+    assert set(scores['methods']) == set(METHODS)
+    naive = scores['methods']['seasonal_naive']
+    # Mondays are 66.7%, other days 100%: the weekday-naive forecast is exact
+    assert naive['mae'] == 0 and naive['folds'] == 4
+    assert [h['horizon'] for h in naive['by_horizon']] == [1, 2, 3, 4, 5]  # Monday..Friday after Sunday origins
+    assert read_scores(path, class_id=1)['methods']['ets']['points'] == 20
+    assert prediction_accuracy(scores) == 100.0  # Prophet not scored: best method
+
+    # Nothing new: every fold comes from the cache
+    again = evaluate_forecasters(path, methods=METHODS, folds=4, workers=1)
+    assert again['evaluated'] == 0 and again['cached'] == again['folds']
+    assert read_scores(path)['methods'] == scores['methods']
+
+    # Folds that leave the window are dropped from the cache
+    fewer = evaluate_forecasters(path, methods=METHODS, folds=2, workers=1)
+    assert fewer['evaluated'] == 0
+    conn = sqlite3.connect(path)
+    try:
+        stored = conn.execute("SELECT COUNT(DISTINCT class_id || method || origin) FROM forecast_eval_folds").fetchone()
+    finally:
+        conn.close()
+    assert stored == (fewer['folds'],)
+
+
+def test_new_days_only_evaluate_new_origins(app, tmp_path):
+    path = str(tmp_path / 'attendance_system.db')
+    wednesday = date(2025, 3, 12)
+    seed_summary(app, 70, last=wednesday)
+    first = evaluate_forecasters(path, methods=METHODS, folds=4, workers=1, today=wednesday)
+    assert first['series'] == 2 and first['evaluated'] == first['folds'] == 2 * 4 * len(METHODS)
+
+    # Thursday and Friday arrive, then the weekend: no fold window reaches them yet
+    seed_summary(app, 2, last=wednesday + timedelta(days=2))
+    for day in range(1, 5):
+        report = evaluate_forecasters(path, methods=METHODS, folds=4, workers=1,
+                                      today=wednesday + timedelta(days=day))
+        assert report['evaluated'] == 0 and report['cached'] == first['folds']
+
+    # A week on, each series and method gains one origin and the rest come from the cache
+    seed_summary(app, 5, last=wednesday + timedelta(days=7))
+    week = evaluate_forecasters(path, methods=METHODS, folds=4, workers=1, today=wednesday + timedelta(days=7))
+    assert week['folds'] == first['folds'] and week['evaluated'] == 2 * len(METHODS)
+    conn = sqlite3.connect(path)
+    try:
+        origins = conn.execute("SELECT DISTINCT origin FROM forecast_eval_folds ORDER BY origin").fetchall()
+    finally:
+        conn.close()
+    assert origins == [('2025-02-16',), ('2025-02-23',), ('2025-03-02',), ('2025-03-09',)]
+
+
+def test_prediction_accuracy_prefers_the_named_method():
+    scores = {'methods': {'prophet': {'mape': 12.5}, 'ets': {'mape': 4.0}}}
+    assert prediction_accuracy(scores) == 87.5
+    assert prediction_accuracy(scores, method='ridge') == 96.0
+    assert prediction_accuracy(None) is None
+
+
+def test_short_history_is_not_scored(app, tmp_path):
+    seed_summary(app, 10)
+    report = evaluate_forecasters(str(tmp_path / 'attendance_system.db'), methods=METHODS, workers=1)
+    assert report['folds'] == 0
+    assert read_scores(str(tmp_path / 'attendance_system.db')) is None
+
+
+def test_trends_read_the_summary_not_the_attendance_rows(legacy):
+    from sqlalchemy import event
+
+    with legacy.app.app_context():
+        # A busy Wednesday in July outweighs anything else in the summary
+        legacy.db.session.add(legacy.DailyAttendanceSummary(attendance_date=date(2024, 7, 10), class_id=1,
+                                                            present_count=5000, total_count=5000))
+        legacy.db.session.commit()
+        engine = legacy.db.engine
+
+    statements = []
+
+    def record(conn, cursor, statement, *_):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = legacy.app.test_client().get('/api/trends')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['best_day'] == 'Wednesday' and body['seasonal_peak'] == 'Summer'
+    assert not [sql for sql in statements if re.search(r'\bFROM attendance\b', sql)]
+
+
+def test_frontend_trend_helpers_call_served_routes(legacy):
+    frontend = Path(__file__).resolve().parent.parent / 'src' / 'frontend' / 'src'
+    urls = legacy.app.url_map.bind('localhost')
+    for api_js in (frontend / 'api.js', frontend / 'services' / 'api.js'):
+        helpers = dict(re.findall(
+            r"(getTrendAnalysis|getSeasonalPatterns|getPredictions|getWeeklyPatterns): \([^)]*\) => \{\s*"
+            r"return api\.get\(['`]([^'`?]+)", api_js.read_text()))
+        assert len(helpers) == 4, api_js
+        for helper, path in helpers.items():
+            # Unknown paths fall through to the static and SPA catch-alls (404 for api/)
+            endpoint, _ = urls.match(path)
+            assert endpoint not in ('static', 'serve_react'), (api_js.name, helper, path)
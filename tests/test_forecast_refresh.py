@@ -0,0 +1,86 @@
+"""
+Tests for the debounced background forecast refresher
+"""
+import threading
+import time
+
+from forecast_refresh import ForecastRefresher
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_burst_of_signals_causes_one_fit():
+    fits = []
+    refresher = ForecastRefresher(lambda: fits.append(threading.current_thread().name), min_interval=0.3)
+    refresher.start()
+    try:
+        for _ in range(50):
+            refresher.mark_dirty()
+        assert wait_for(lambda: len(fits) == 1)
+        assert fits[0] == 'forecast-refresh'
+
+        # Signals inside the interval are coalesced into one later refit
+        refresher.mark_dirty()
+        refresher.mark_dirty()
+        time.sleep(0.1)
+        assert len(fits) == 1
+        assert refresher.stats()['dirty']
+        assert wait_for(lambda: len(fits) == 2)
+    finally:
+        refresher.stop(timeout=2)
+
+    stats = refresher.stats()
+    assert stats['signals'] == 52
+    assert stats['fits'] == 2
+    assert stats['staleness_seconds'] == 0.0
+    assert stats['last_fit_seconds'] is not None
+
+
+def test_failed_fit_is_counted_and_does_not_stop_the_worker():
+    calls = []
+
+    def flaky_fit():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("prophet exploded")
+
+    refresher = ForecastRefresher(flaky_fit, min_interval=0)
+    refresher.start()
+    try:
+        refresher.mark_dirty()
+        assert wait_for(lambda: refresher.failures == 1)
+        refresher.mark_dirty()
+        assert wait_for(lambda: refresher.fits == 1)
+    finally:
+        refresher.stop(timeout=2)
+
+    assert refresher.stats()['last_error'] == "prophet exploded"
+
+
+def test_failed_fit_is_retried_without_a_new_signal():
+    calls = []
+
+    def flaky_fit():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+
+    refresher = ForecastRefresher(flaky_fit, min_interval=0.1)
+    refresher.start()
+    try:
+        refresher.mark_dirty()
+        assert wait_for(lambda: refresher.failures == 1)
+        assert wait_for(lambda: refresher.stats()['dirty'])  # still behind the data after the failure
+        assert wait_for(lambda: refresher.fits == 1)
+    finally:
+        refresher.stop(timeout=2)
+
+    assert len(calls) == 2 and refresher.stats()['signals'] == 1
+    assert not refresher.stats()['dirty']
@@ -0,0 +1,119 @@
+"""
+Tests for the on-disk forecast model registry
+"""
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from forecast_store import ForecastModelStore, data_watermark
+
+CONFIG = {'model': 'attendance_rate', 'days_back': 90}
+JSON_SERIALIZER = (json.dumps, json.loads)
+
+
+def test_models_are_reused_until_the_watermark_moves(tmp_path):
+    fits = []
+
+    def fit():
+        fits.append(1)
+        return {'fit': len(fits)}
+
+    store = ForecastModelStore(str(tmp_path), serializer=JSON_SERIALIZER)
+    assert store.get_or_fit(3, CONFIG, '2025-01-06_40', fit) == ({'fit': 1}, True)
+    assert store.get_or_fit(3, CONFIG, '2025-01-06_40', fit) == ({'fit': 1}, False)
+
+    # A new process finds the fit on disk, loading it on first use
+    restarted = ForecastModelStore(str(tmp_path), serializer=JSON_SERIALIZER)
+    assert restarted.get_or_fit(3, CONFIG, '2025-01-06_40', fit) == ({'fit': 1}, False)
+    assert restarted.stats()['disk_hits'] == 1
+
+    # New attendance day, another class or another configuration: refit
+    assert restarted.get_or_fit(3, CONFIG, '2025-01-07_41', fit) == ({'fit': 2}, True)
+    assert restarted.get_or_fit(4, CONFIG, '2025-01-07_41', fit) == ({'fit': 3}, True)
+    assert restarted.get_or_fit(3, dict(CONFIG, days_back=30), '2025-01-07_41', fit) == ({'fit': 4}, True)
+    assert len(fits) == 4
+    # One file per class and configuration; a refit replaces the older watermark
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+def test_forecast_model_loads_the_stored_prophet_fit(app, tmp_path):
+    pytest.importorskip('prophet')
+    from forecast_model import AttendanceForecastModel
+    from models import db, Attendance, Student
+
+    db_path = str(tmp_path / 'attendance_system.db')
+    start = date.today() - timedelta(days=21)
+    with app.app_context():
+        students = [(student.id, student.class_id) for student in Student.query.all()]
+        for day in range(20):
+            for i, (student_id, class_id) in enumerate(students):
+                db.session.add(Attendance(student_id=student_id, class_id=class_id, teacher_id=1,
+                                          attendance_date=start + timedelta(days=day),
+                                          status='absent' if (day + i) % 4 == 0 else 'present'))
+        db.session.commit()
+
+    model_dir = str(tmp_path / 'models')
+    first = AttendanceForecastModel(db_path=db_path, store=ForecastModelStore(model_dir))
+    assert first.generate_forecast(periods=7)['dates']
+    assert first.store.stats()['fits'] == 1
+
+    second = AttendanceForecastModel(db_path=db_path, store=ForecastModelStore(model_dir))
+    forecast = second.generate_forecast(periods=7)
+    assert second.store.stats()['fits'] == 0 and second.store.stats()['disk_hits'] == 1
+    assert forecast['dates'] == first.generate_forecast(periods=7)['dates']
+
+    with app.app_context():
+        for student_id, class_id in students:
+            db.session.add(Attendance(student_id=student_id, class_id=class_id, teacher_id=1,
+                                      attendance_date=start + timedelta(days=20), status='present'))
+        db.session.commit()
+    # A new attendance day moves the watermark
+    assert second.train_model()
+    assert second.store.stats()['fits'] == 1
+
+
+def test_watermark_follows_the_values_not_the_window(app, tmp_path):
+    import sqlite3
+
+    from forecast_batch import load_class_series
+    from models import db
+
+    today = date(2025, 3, 14)  # a Friday
+    with app.app_context():
+        conn = db.engine.raw_connection()
+        conn.executemany(
+            "INSERT INTO daily_attendance_summary "
+            "(attendance_date, class_id, present_count, absent_count, late_count, total_count) "
+            "VALUES (?, 1, ?, ?, 0, 3)",
+            [((today - timedelta(days=d)).isoformat(), 3 if d else 1, 0 if d else 2) for d in range(40)]
+        )
+        conn.commit()
+        conn.close()
+
+    fits = []
+    store = ForecastModelStore(str(tmp_path / 'models'), serializer=JSON_SERIALIZER)
+
+    def refits(day):
+        conn = sqlite3.connect(str(tmp_path / 'attendance_system.db'))
+        try:
+            history = load_class_series(conn, days_back=30, today=day)[1]
+        finally:
+            conn.close()
+        return store.get_or_fit(1, CONFIG, data_watermark(history), lambda: fits.append(1) or len(fits))[1]
+
+    assert refits(today)
+    assert not refits(today)  # unchanged frame
+
+    # More students tapped in today: same last day and row count, new values
+    with app.app_context():
+        db.session.execute(db.text(
+            "UPDATE daily_attendance_summary SET present_count = 3, absent_count = 0 WHERE attendance_date = :day"
+        ), {'day': today.isoformat()})
+        db.session.commit()
+    assert refits(today)
+
+    # The weekend slides the window start, but no attendance arrived
+    assert not refits(today + timedelta(days=1))
+    assert not refits(today + timedelta(days=2))
+    assert len(fits) == 2
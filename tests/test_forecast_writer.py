@@ -0,0 +1,88 @@
+"""
+Tests for writing forecast rows
+"""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from forecast_writer import forecast_frame, write_forecast
+
+
+def stored_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(
+            "SELECT class_id, forecast_date, predicted_present, predicted_rate, yhat_lower, yhat_upper, model_version "
+            "FROM attendance_forecast ORDER BY class_id, forecast_date"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def write(path, class_id, frame, version):
+    conn = sqlite3.connect(path)
+    try:
+        result = write_forecast(conn, class_id, frame, version)
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+def test_only_new_or_changed_rows_are_written(app, tmp_path):
+    path = str(tmp_path / 'attendance_system.db')
+    dates = pd.date_range('2025-01-06', periods=5, freq='D')
+    present = np.array([30.4, 31.6, 29.2, -1.0, 28.0])
+    frame = forecast_frame(dates, present, rate=present / 40 * 100, lower=present - 2, upper=present + 2)
+
+    assert write(path, 3, frame, 'v1') == {'written': 5, 'unchanged': 0}
+    rows = stored_rows(path)
+    assert [row[1] for row in rows] == [f'2025-01-{day:02d}' for day in range(6, 11)]
+    assert [row[2] for row in rows] == [30, 32, 29, 0, 28]
+    assert rows[0][4:] == (28.4, 32.4, 'v1')
+
+    # Unchanged forecast: nothing written
+    assert write(path, 3, frame, 'v1') == {'written': 0, 'unchanged': 5}
+
+    # One changed day, one new day; the same days of another class are separate rows
+    changed = present.copy()
+    changed[1] = 33.0
+    frame = forecast_frame(pd.date_range('2025-01-06', periods=6, freq='D'), np.append(changed, 27.0))
+    assert write(path, 3, frame.iloc[:2], 'v1') == {'written': 2, 'unchanged': 0}  # rate/bounds now empty
+    assert write(path, 3, frame.iloc[1:], 'v1') == {'written': 4, 'unchanged': 1}
+    assert write(path, 0, frame, 'v1')['written'] == 6
+
+    rows = stored_rows(path)
+    assert len(rows) == 12
+    assert [row[2] for row in rows if row[0] == 3] == [30, 33, 29, 0, 28, 27]
+
+
+def test_new_model_version_rewrites_rows(app, tmp_path):
+    path = str(tmp_path / 'attendance_system.db')
+    frame = forecast_frame(['2025-01-06', '2025-01-07'], [10, 11])
+    write(path, 0, frame, 'v1')
+    assert write(path, 0, frame, 'v2') == {'written': 2, 'unchanged': 0}
+    assert {row[6] for row in stored_rows(path)} == {'v2'}
+
+
+class SamplingModel:
+    """Draws its bounds from the global RNG, as Prophet's interval sampling does"""
+
+    def predict(self, future):
+        return future.assign(yhat_lower=np.random.uniform(size=len(future)))
+
+
+def test_predict_repeats_bounds_and_leaves_the_global_rng_alone():
+    from forecast_model import predict
+
+    future = pd.DataFrame({'ds': pd.date_range('2025-03-03', periods=5)})
+    np.random.seed(42)
+    expected_next = np.random.uniform()
+    np.random.seed(42)
+
+    first = predict(SamplingModel(), future)
+    second = predict(SamplingModel(), future)
+    assert first['yhat_lower'].tolist() == second['yhat_lower'].tolist()
+    # The caller's sequence continues as if predict had not run
+    assert np.random.uniform() == expected_next
@@ -0,0 +1,97 @@
+"""
+Tests for the versioned schema migrations
+"""
+from sqlalchemy import create_engine, text
+
+from migrations import MIGRATIONS, check_query_plans, has_unique_index, run_migrations, table_columns
+
+# Tables as created by older versions of the app: no reader_id, no indexes,
+# nothing stopping two attendance rows for the same student and day
+LEGACY_SCHEMA = [
+    "CREATE TABLE classes (id INTEGER PRIMARY KEY, name VARCHAR(100))",
+    "CREATE TABLE students (id INTEGER PRIMARY KEY, class_id INTEGER, full_name VARCHAR(100), "
+    "roll_number VARCHAR(10), rfid_tag VARCHAR(50), is_active BOOLEAN)",
+    "CREATE TABLE attendance (id INTEGER PRIMARY KEY, student_id INTEGER NOT NULL, class_id INTEGER NOT NULL, "
+    "teacher_id INTEGER NOT NULL, attendance_date DATE NOT NULL, time_marked DATETIME, status VARCHAR(10), "
+    "method VARCHAR(20) NOT NULL)",
+    "CREATE TABLE rfid_scan_logs (id INTEGER PRIMARY KEY, rfid_tag VARCHAR(50) NOT NULL, "
+    "scan_time DATETIME NOT NULL, student_id INTEGER, student_name VARCHAR(100), attendance_id INTEGER, "
+    "status VARCHAR(20) NOT NULL, error_message TEXT, created_at DATETIME)",
+    "CREATE TABLE attendance_forecast (id INTEGER PRIMARY KEY, forecast_date DATE UNIQUE NOT NULL, "
+    "predicted_present INTEGER NOT NULL, created_at DATETIME)",
+]
+
+
+def legacy_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for ddl in LEGACY_SCHEMA:
+            conn.execute(text(ddl))
+    return engine
+
+
+def test_migrations_upgrade_an_existing_database_once(tmp_path):
+    engine = legacy_engine(tmp_path)
+
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+    with engine.connect() as conn:
+        assert 'reader_id' in table_columns(conn, 'rfid_scan_logs')
+        assert has_unique_index(conn, 'attendance', ['student_id', 'attendance_date'])
+        versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))]
+    assert versions == [version for version, _, _ in MIGRATIONS]
+
+
+def test_duplicate_attendance_is_collapsed_before_the_unique_index(tmp_path):
+    engine = legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO attendance (id, student_id, class_id, teacher_id, attendance_date, status, method) VALUES "
+            "(1, 7, 1, 1, '2025-01-06', 'present', 'rfid'), (2, 7, 1, 1, '2025-01-06', 'present', 'manual'), "
+            "(3, 8, 1, 1, '2025-01-06', 'absent', 'manual')"
+        ))
+        conn.execute(text(
+            "INSERT INTO rfid_scan_logs (rfid_tag, scan_time, student_id, attendance_id, status) "
+            "VALUES ('E4F8E400', '2025-01-06 09:00:00', 7, 1, 'success')"
+        ))
+
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        assert [row[0] for row in conn.execute(text("SELECT id FROM attendance ORDER BY id"))] == [2, 3]
+        assert conn.execute(text("SELECT attendance_id FROM rfid_scan_logs")).scalar() == 2
+        # The daily summary is backfilled from the deduplicated rows
+        assert conn.execute(text(
+            "SELECT present_count, absent_count, total_count FROM daily_attendance_summary"
+        )).fetchall() == [(1, 1, 2)]
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine = legacy_engine(tmp_path)
+    run_migrations(engine)
+
+    report = check_query_plans(engine)
+    assert report
+    for query in report:
+        assert query['uses_index'], f"{query['name']}: {query['plan']}"
+        assert not query['sorts_in_memory'], f"{query['name']}: {query['plan']}"
+
+
+def test_forecast_table_becomes_per_class(tmp_path):
+    engine = legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO attendance_forecast (forecast_date, predicted_present) VALUES ('2025-01-06', 40)"))
+
+    run_migrations(engine)
+
+    with engine.begin() as conn:
+        # Existing rows become the whole-school forecast (class 0); classes get their own rows for the same day
+        conn.execute(text("INSERT OR REPLACE INTO attendance_forecast (forecast_date, predicted_present) "
+                          "VALUES ('2025-01-06', 42)"))
+        conn.execute(text("INSERT INTO attendance_forecast (class_id, forecast_date, predicted_present, predicted_rate) "
+                          "VALUES (5, '2025-01-06', 20, 95.0)"))
+        rows = conn.execute(text(
+            "SELECT class_id, predicted_present FROM attendance_forecast ORDER BY class_id"
+        )).fetchall()
+    assert rows == [(0, 42), (5, 20)]
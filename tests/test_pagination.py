@@ -0,0 +1,104 @@
+"""
+Tests for keyset pagination of the backend listings
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture(scope='module')
+def listing(backend):
+    """A class of 12 students with attendance on 5 days, several rows sharing each date"""
+    from models import db, Attendance, Class, Student, User
+
+    with backend.app.app_context():
+        cls = Class(name='Paging Class', grade_level=6, section='B',
+                    teacher_id=User.query.first().id, academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        # Duplicate roll numbers across classes are allowed, so ties on roll_number need the id
+        for i in range(12):
+            student = Student(roll_number=f'{i % 6:02d}', rfid_tag=f'PG{i:03d}', full_name=f'Pager {i}',
+                              class_id=cls.id if i < 6 else 1, enrollment_date=date.today())
+            db.session.add(student)
+            db.session.flush()
+            for day in range(5):
+                db.session.add(Attendance(student_id=student.id, class_id=student.class_id,
+                                          teacher_id=cls.teacher_id,
+                                          attendance_date=date(2025, 1, 6) + timedelta(days=day),
+                                          status='late' if day == 2 else 'present', method='manual'))
+        db.session.commit()
+        return cls.id
+
+
+def walk(client, url, key, per_page):
+    """Follow next_cursor to the last page; returns every row and the page count"""
+    rows, pages, cursor = [], 0, None
+    while True:
+        separator = '&' if '?' in url else '?'
+        response = client.get(f"{url}{separator}per_page={per_page}" + (f"&cursor={cursor}" if cursor else ''))
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        rows.extend(body[key])
+        pages += 1
+        cursor = body['next_cursor']
+        if not cursor:
+            return rows, pages
+
+
+def test_attendance_pages_cover_every_row_once(backend, listing):
+    from models import Attendance
+
+    client = backend.app.test_client()
+    rows, pages = walk(client, f'/api/attendance?class_id={listing}', 'attendance', per_page=7)
+
+    with backend.app.app_context():
+        expected = [record.id for record in Attendance.query.filter_by(class_id=listing).order_by(
+            Attendance.attendance_date.desc(), Attendance.id.desc())]
+    assert [row['id'] for row in rows] == expected
+    assert pages == -(-len(expected) // 7)
+
+
+def test_student_pages_break_roll_number_ties_by_id(backend, listing):
+    from models import Student
+
+    client = backend.app.test_client()
+    rows, _ = walk(client, '/api/students', 'students', per_page=5)
+
+    with backend.app.app_context():
+        expected = [student.id for student in Student.query.filter_by(is_active=True).order_by(
+            Student.roll_number, Student.id)]
+    assert [row['id'] for row in rows] == expected
+
+
+def test_totals_are_opt_in(backend, listing):
+    client = backend.app.test_client()
+
+    assert 'total' not in client.get(f'/api/attendance?class_id={listing}').get_json()
+    exact = client.get(f'/api/attendance?class_id={listing}&status=late&total=exact').get_json()
+    approx = client.get(f'/api/attendance?class_id={listing}&status=late&total=approx').get_json()
+    assert exact['total'] == approx['total'] == 6
+    assert approx['total_is_estimate'] and not exact['total_is_estimate']
+
+    # Offset pagination is still served when a client asks for a page number
+    legacy = client.get(f'/api/attendance?class_id={listing}&page=2&per_page=10').get_json()
+    assert legacy['total'] == 30 and legacy['pages'] == 3 and len(legacy['attendance']) == 10
+
+
+def test_bad_cursor_and_total_are_rejected(backend):
+    client = backend.app.test_client()
+
+    assert client.get('/api/attendance?cursor=not-a-cursor').status_code == 400
+    assert client.get(f"/api/students?cursor={encode_cursor(['01'])}").status_code == 400
+    assert client.get('/api/students?total=maybe').status_code == 400
+
+
+def test_cursor_round_trip():
+    from models import Attendance
+
+    keys = [Attendance.attendance_date, Attendance.id]
+    assert decode_cursor(encode_cursor([date(2025, 1, 6), 42]), keys) == [date(2025, 1, 6), 42]
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(['2025-01-06', 'x']), keys)
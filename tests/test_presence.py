@@ -0,0 +1,77 @@
+"""
+Tests for the per-day presence bitmap and the writers that keep it honest
+"""
+from datetime import date
+
+
+def test_record_sets_and_clears_bits(app):
+    from models import Attendance
+    from presence import PresenceBitmap
+
+    bitmap = PresenceBitmap(Attendance)
+    today = date.today()
+    with app.app_context():
+        bitmap.record(9, today, 'late')
+        bitmap.record(12, today, 'present')
+        assert bitmap.is_marked(9, today) and bitmap.is_marked(12, today)
+
+        bitmap.record(9, today, 'absent')
+        assert not bitmap.is_marked(9, today) and bitmap.is_marked(12, today)
+        bitmap.clear(9, today)  # clearing twice does not miscount
+        assert bitmap.stats()['marked'] == 1
+
+
+def test_tap_after_a_manual_absent_marks_present_again(legacy):
+    with legacy.app.app_context():
+        db = legacy.db
+        cls = legacy.Class(class_name='Presence Class', section='P', academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        student = legacy.Student(student_id='PR001', roll_number='01', rfid_tag='PR001', full_name='Anaya Singh',
+                                 class_id=cls.id, enrollment_date=date.today())
+        db.session.add(student)
+        db.session.commit()
+        student_id = student.id
+
+    def status():
+        with legacy.app.app_context():
+            return legacy.Attendance.query.filter_by(student_id=student_id, attendance_date=date.today()).one().status
+
+    client = legacy.app.test_client()
+    assert client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'}).status_code == 200
+    tap = {'tag': 'PR001', 'student_name': 'Anaya Singh'}
+
+    assert client.post('/api/scan_rfid', json=tap).status_code == 200
+    assert status() == 'present'
+    response = client.post('/api/attendance', json={'student_id': student_id, 'status': 'absent',
+                                                     'date': date.today().isoformat()})
+    assert response.status_code == 200
+    assert status() == 'absent'
+    assert client.post('/api/scan_rfid', json=tap).status_code == 200
+    assert status() == 'present'
+
+
+def test_backend_manual_marks_clear_the_bit(backend):
+    from models import db, Class, Student
+    from presence import presence_bitmap
+
+    today = date.today()
+    with backend.app.app_context():
+        student = Student(roll_number='31', rfid_tag='PR031', full_name='Dev Malhotra',
+                          class_id=Class.query.first().id, enrollment_date=today)
+        db.session.add(student)
+        db.session.commit()
+        student_id = student.id
+        presence_bitmap.mark(student_id, today)  # tapped in earlier today
+
+    client = backend.app.test_client()
+    client.post('/api/attendance/mark', json={'student_id': student_id, 'status': 'absent'})
+    with backend.app.app_context():
+        assert not presence_bitmap.is_marked(student_id, today)
+
+    client.post('/api/attendance/bulk', json={'records': [{'student_id': student_id, 'status': 'late'}]})
+    with backend.app.app_context():
+        assert presence_bitmap.is_marked(student_id, today)
+    client.post('/api/attendance/bulk', json={'student_ids': [student_id], 'status': 'absent'})
+    with backend.app.app_context():
+        assert not presence_bitmap.is_marked(student_id, today)
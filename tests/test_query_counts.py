@@ -0,0 +1,160 @@
+"""
+Statement-count and query-plan guard for the listing endpoints
+Each listing must run a fixed number of SQL statements however many rows it
+returns; a lazy relationship load inside a loop shows up as a count that
+grows with the data. The statements the endpoints run must also be answered
+through indexes.
+"""
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+# Most statements any listing may issue (page, optional count, batched lookups)
+MAX_STATEMENTS = 5
+
+LISTING_ENDPOINTS = [
+    '/api/students',
+    '/api/attendance',
+    '/api/classes',
+    '/api/stats/dashboard',
+]
+
+# The legacy app.py listings of RFID attendance
+LEGACY_ENDPOINTS = [
+    '/api/rfid_scans?limit=100',
+    '/api/attendance/today',
+]
+
+# Listings plus their filtered and next-page forms, for the plan check
+PLANNED_ENDPOINTS = LISTING_ENDPOINTS + [
+    '/api/students?class_id=1',
+    '/api/attendance?class_id=1',
+    '/api/attendance?student_id=1',
+    '/api/attendance?date=' + date.today().isoformat(),
+]
+
+
+@contextmanager
+def count_statements(engine):
+    """Collect every statement sent to the database inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def add_students(backend, count):
+    """Add a class of students with a week of attendance each"""
+    from models import db, Attendance, Class, Student, User
+
+    with backend.app.app_context():
+        offset = Student.query.count()
+        cls = Class(name=f'Class {offset}', grade_level=5, section='A',
+                    teacher_id=User.query.first().id, academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        for i in range(offset, offset + count):
+            student = Student(roll_number=f'{i:03d}', rfid_tag=f'QC{i:03d}', full_name=f'Student {i}',
+                              class_id=cls.id, enrollment_date=date.today())
+            db.session.add(student)
+            db.session.flush()
+            for day in range(7):
+                db.session.add(Attendance(student_id=student.id, class_id=cls.id, teacher_id=cls.teacher_id,
+                                          attendance_date=date.today() - timedelta(days=day),
+                                          status='present' if (i + day) % 3 else 'absent', method='rfid'))
+        db.session.commit()
+
+
+def add_legacy_scans(legacy, count):
+    """Add a class of app.py students, each with an RFID mark today"""
+    from datetime import datetime
+
+    with legacy.app.app_context():
+        db = legacy.db
+        offset = legacy.Student.query.count()
+        teacher = legacy.User.query.first()
+        cls = legacy.Class(class_name=f'Class {offset}', section='A', teacher_id=teacher.id, academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        for i in range(offset, offset + count):
+            student = legacy.Student(student_id=f'LG{i:03d}', roll_number=f'{i:03d}', rfid_tag=f'LG{i:03d}',
+                                     full_name=f'Student {i}', class_id=cls.id, enrollment_date=date.today())
+            db.session.add(student)
+            db.session.flush()
+            db.session.add(legacy.Attendance(student_id=student.id, class_id=cls.id, teacher_id=teacher.id,
+                                             attendance_date=date.today(), time_marked=datetime.now(),
+                                             status='present', method='rfid'))
+        db.session.commit()
+
+
+def backend_engine(backend):
+    from models import db
+
+    with backend.app.app_context():
+        return db.engine
+
+
+def statements_for(backend, url):
+    """(sql, parameters) of every statement one GET of url runs"""
+    backend.dashboard_cache.invalidate()
+    client = backend.app.test_client()
+    with count_statements(backend_engine(backend)) as statements:
+        response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return statements
+
+
+@pytest.mark.parametrize('url', LISTING_ENDPOINTS)
+def test_listing_statement_count_is_constant(backend, url):
+    add_students(backend, 3)
+    few = len(statements_for(backend, url))
+    add_students(backend, 20)
+    many = len(statements_for(backend, url))
+
+    assert many == few, f"{url} ran {few} statements for 3 students and {many} for 23"
+    assert many <= MAX_STATEMENTS
+
+
+@pytest.mark.parametrize('url', PLANNED_ENDPOINTS)
+def test_listing_queries_use_indexes(backend, url):
+    from migrations import check_statement_plans
+
+    add_students(backend, 3)
+    statements = statements_for(backend, url)
+    # Follow the cursor so the keyset form of the page query is checked too
+    next_cursor = backend.app.test_client().get(url).get_json().get('next_cursor')
+    if next_cursor:
+        statements += statements_for(backend, f"{url}{'&' if '?' in url else '?'}cursor={next_cursor}&per_page=2")
+
+    report = check_statement_plans(backend_engine(backend), statements)
+    assert report
+    for query in report:
+        assert not query['full_scans'], f"{url}: {query['sql']}\n{query['plan']}"
+        assert not query['sorts_in_memory'], f"{url}: {query['sql']}\n{query['plan']}"
+
+
+@pytest.mark.parametrize('url', LEGACY_ENDPOINTS)
+def test_legacy_listing_statement_count_is_constant(legacy, url):
+    client = legacy.app.test_client()
+    with legacy.app.app_context():
+        engine = legacy.db.engine
+
+    counts = []
+    for students in (3, 20):
+        add_legacy_scans(legacy, students)
+        with count_statements(engine) as statements:
+            response = client.get(url)
+        assert response.status_code == 200, response.get_json()
+        counts.append(len(statements))
+
+    few, many = counts
+    assert many == few, f"{url} ran {few} statements for 3 students and {many} for 23"
+    assert many <= MAX_STATEMENTS
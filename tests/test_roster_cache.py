@@ -0,0 +1,58 @@
+"""
+Tests for invalidating the RFID roster on student writes
+"""
+from datetime import date
+
+
+def test_backend_student_update_drops_the_roster(backend):
+    from models import db, Class, Student
+    from roster_cache import roster_cache
+
+    with backend.app.app_context():
+        student = Student(roll_number='90', rfid_tag='RS900', full_name='Kiran Rao',
+                          class_id=Class.query.first().id, enrollment_date=date.today())
+        db.session.add(student)
+        db.session.commit()
+        student_id = student.id
+        roster_cache.load()
+        assert roster_cache.stats()['age_seconds'] is not None
+
+    response = backend.app.test_client().put(f'/api/students/{student_id}', json={'address': 'Ward 4'})
+    assert response.status_code == 200
+    assert roster_cache.stats()['age_seconds'] is None
+
+
+def test_legacy_student_writes_drop_the_roster(legacy):
+    db, Student, roster = legacy.db, legacy.Student, legacy.student_roster
+
+    with legacy.app.app_context():
+        cls = legacy.Class(class_name='Roster Class', section='R', academic_year='2024-25')
+        db.session.add(cls)
+        db.session.flush()
+        student = Student(student_id='RS001', roll_number='01', rfid_tag='RS001', full_name='Meera Iyer',
+                          class_id=cls.id, enrollment_date=date.today())
+        db.session.add(student)
+        db.session.commit()
+        assert roster.resolve_tag('RS001').full_name == 'Meera Iyer'
+
+        # Moved to another class and renamed
+        other = legacy.Class(class_name='Roster Class 2', section='R', academic_year='2024-25')
+        db.session.add(other)
+        db.session.flush()
+        student.class_id, student.full_name = other.id, 'Meera Nair'
+        db.session.commit()
+        entry = roster.resolve_tag('RS001')
+        assert (entry.class_id, entry.full_name) == (other.id, 'Meera Nair')
+
+        # Deactivated
+        student.is_active = False
+        db.session.commit()
+        assert roster.resolve_tag('RS001') is None
+
+        # A rolled-back change leaves the loaded roster alone
+        loads = roster.stats()['loads']
+        student.full_name = 'Nobody'
+        db.session.flush()
+        db.session.rollback()
+        roster.resolve_tag('RS001')
+        assert roster.stats()['loads'] == loads
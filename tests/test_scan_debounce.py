@@ -0,0 +1,43 @@
+"""
+Tests for per-tag debouncing of BLE notifications
+"""
+from scan_debounce import TagDebouncer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_collapses_into_one_scan():
+    clock = FakeClock()
+    debouncer = TagDebouncer(window=1.0, clock=clock)
+
+    accepted = []
+    for _ in range(20):  # card resting on the antenna, reported every 100ms
+        accepted.append(debouncer.accept('E4F8E400'))
+        clock.now += 0.1
+
+    assert accepted.count(True) == 1
+    assert debouncer.stats()['suppressed'] == 19
+
+
+def test_new_tap_after_window_is_accepted():
+    clock = FakeClock()
+    debouncer = TagDebouncer(window=1.0, clock=clock)
+
+    assert debouncer.accept('E4F8E400')
+    clock.now += 1.5
+    assert debouncer.accept('E4F8E400')
+
+
+def test_tags_and_readers_are_independent():
+    debouncer = TagDebouncer(window=1.0, clock=FakeClock())
+
+    assert debouncer.accept('E4F8E400', reader_id='gate-1')
+    assert debouncer.accept('2E401405', reader_id='gate-1')
+    assert debouncer.accept('E4F8E400', reader_id='gate-2')
+    assert not debouncer.accept('E4F8E400', reader_id='gate-1')
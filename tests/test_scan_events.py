@@ -0,0 +1,66 @@
+"""
+Tests for the live scan feed behind /api/rfid/stream
+"""
+import json
+from datetime import datetime
+
+from models import db, RFIDScanLog
+from scan_events import ScanBroadcaster, ScanLogTailer, stream_scans
+
+
+def add_scans(app, *tags):
+    with app.app_context():
+        for tag in tags:
+            db.session.add(RFIDScanLog(rfid_tag=tag, scan_time=datetime.now(), status='invalid_tag'))
+        db.session.commit()
+
+
+def scan_messages(messages):
+    return [json.loads(m.split('data: ', 1)[1]) for m in messages if m.startswith('id:')]
+
+
+def test_one_poll_fans_out_to_every_subscriber(app):
+    add_scans(app, 'OLD1')
+    broadcaster = ScanBroadcaster()
+    tailer = ScanLogTailer(app, broadcaster)
+    tailer._seed()
+
+    first, _, _ = broadcaster.subscribe()
+    second, _, _ = broadcaster.subscribe()
+    add_scans(app, 'NEW1', 'NEW2')
+    assert tailer.poll() == 2
+
+    for subscriber in (first, second):
+        assert [subscriber.get_nowait()['rfid_tag'] for _ in range(2)] == ['NEW1', 'NEW2']
+    assert broadcaster.stats()['subscribers'] == 2
+
+
+def test_stream_resumes_from_last_event_id(app):
+    add_scans(app, 'A', 'B', 'C')
+    broadcaster = ScanBroadcaster(history=2)  # 'A' is no longer buffered
+    tailer = ScanLogTailer(app, broadcaster)
+    tailer._seed()
+
+    stream = stream_scans(broadcaster, tailer, last_event_id=0, keepalive=0.01)
+    messages = [next(stream) for _ in range(4)]
+    assert messages[0].startswith('retry:')
+    assert [event['rfid_tag'] for event in scan_messages(messages)] == ['A', 'B', 'C']
+    assert next(stream) == ': keepalive\n\n'
+
+    add_scans(app, 'D')
+    tailer.poll()
+    assert scan_messages([next(stream)])[0]['rfid_tag'] == 'D'
+    stream.close()
+    assert broadcaster.stats()['subscribers'] == 0
+
+
+def test_slow_subscriber_is_disconnected(app):
+    broadcaster = ScanBroadcaster(queue_size=2)
+    slow, _, _ = broadcaster.subscribe()
+    broadcaster.publish([{'id': i, 'rfid_tag': f'T{i}'} for i in range(1, 4)])
+
+    assert slow.get_nowait() is None
+    assert broadcaster.stats()['dropped_subscribers'] == 1
+    # It can resume from the buffered history
+    _, backlog, complete = broadcaster.subscribe(last_event_id=1)
+    assert [event['id'] for event in backlog] == [2, 3] and complete
@@ -0,0 +1,98 @@
+"""
+Tests for the binary BLE scan frame protocol
+"""
+import asyncio
+from datetime import date
+
+import pytest
+
+from ble_gateway import BLEGateway, FakeBLETransport, parse_reader_specs
+from scan_frames import (
+    FrameError, SequenceTracker, decode_notification, encode_frame, is_frame, parse_frame
+)
+from scan_ingest import ScanIngestQueue
+
+
+def test_multi_uid_frame_round_trip():
+    data = encode_frame(7, 42, 123456, [('E4F8E400', 250), bytes.fromhex('04A1B2C3D4E5F6')])
+    frame = parse_frame(bytearray(data))
+
+    assert (frame.version, frame.reader_id, frame.seq, frame.timestamp_ms) == (1, 7, 42, 123456)
+    assert [(scan.uid, scan.age_ms) for scan in frame.scans] == [('E4F8E400', 250), ('04A1B2C3D4E5F6', 0)]
+    # Extra 4-byte UIDs cost 7 bytes each
+    assert len(encode_frame(7, 1, 0, ['E4F8E400'] * 3)) - len(encode_frame(7, 1, 0, ['E4F8E400'])) == 14
+
+
+def test_text_notifications_are_still_accepted():
+    assert decode_notification(b'RFID: E4F8E400\r\n').scans[0].uid == 'E4F8E400'
+    assert decode_notification(b'TAG001').scans[0].uid == 'TAG001'
+    frame = decode_notification(b'')
+    assert frame.seq is None and frame.scans == []
+
+
+def test_raw_uid_starting_with_the_magic_byte_is_not_a_frame():
+    assert not is_frame(bytes.fromhex('A5F8E400'))
+    assert decode_notification(bytearray.fromhex('A5F8E400')).scans[0].uid == 'A5F8E400'
+    # As long as a frame header, but the entries do not fill the payload
+    assert decode_notification(bytes.fromhex('A5010203040506070809101112131415')).scans[0].uid == \
+        'A5010203040506070809101112131415'
+    assert is_frame(encode_frame(1, 1, 0, ['E4F8E400']))
+
+
+def test_truncated_frames_are_rejected():
+    data = encode_frame(1, 1, 0, ['E4F8E400'])
+    with pytest.raises(FrameError):
+        parse_frame(data[:-1])
+    with pytest.raises(FrameError):
+        parse_frame(data + b'\x00')
+
+
+def test_sequence_gaps_duplicates_and_resets():
+    tracker = SequenceTracker()
+    assert tracker.observe('gate-1', 10) == 0
+    assert tracker.observe('gate-1', 11) == 0
+    assert tracker.observe('gate-1', 14) == 2
+    assert tracker.observe('gate-1', 14) == -1
+    assert tracker.observe('gate-1', 12) == -1
+    assert tracker.observe('gate-1', 0) == 0  # reader rebooted
+    assert tracker.observe('gate-2', 2 ** 32 - 1) == 0
+    assert tracker.observe('gate-2', 1) == 1  # wrapped past 0
+
+    stats = tracker.stats()
+    assert (stats['gaps'], stats['lost_frames'], stats['duplicates'], stats['resets']) == (2, 3, 2, 1)
+
+
+def test_gateway_ingests_binary_frames(app):
+    from models import db, Student, RFIDScanLog
+
+    with app.app_context():
+        db.session.add(Student(roll_number='04', rfid_tag='E4F8E400', full_name='Sneha Reddy',
+                               class_id=1, enrollment_date=date.today()))
+        db.session.commit()
+
+    transport = FakeBLETransport()
+    readers = parse_reader_specs(['gate-1=AA:01'])
+
+    async def scenario():
+        gateway = BLEGateway(readers, ScanIngestQueue(app), transport=transport)
+        await gateway.start()
+        gate = gateway.supervisors[0]
+        await asyncio.sleep(0.01)
+        transport.notify('AA:01', encode_frame(1, 1, 1000, [('E4F8E400', 40)]))
+        transport.notify('AA:01', encode_frame(1, 1, 1000, [('E4F8E400', 40)]))  # retransmit
+        transport.notify('AA:01', b'\xa5\x01')  # not a whole frame: read as a raw UID
+        transport.notify('AA:01', encode_frame(1, 4, 1500, ['0A0B0C0D']))
+        while gateway.ingest.stats()['scans_written'] < 3:
+            await asyncio.sleep(0.005)
+        health = gate.health()
+        await gateway.stop()
+        return health
+
+    health = asyncio.run(scenario())
+    assert health['frames']['duplicates'] == 1
+    assert health['frames']['lost_frames'] == 2
+    assert health['bad_frames'] == 0
+    with app.app_context():
+        logs = RFIDScanLog.query.order_by(RFIDScanLog.id).all()
+        assert [(log.rfid_tag, log.status) for log in logs] == [
+            ('E4F8E400', 'success'), ('A501', 'invalid_tag'), ('0A0B0C0D', 'invalid_tag')]
@@ -0,0 +1,100 @@
+"""
+Tests for the batched RFID scan ingestion queue
+"""
+import asyncio
+import threading
+from datetime import datetime
+
+from models import Attendance, RFIDScanLog
+from scan_ingest import ScanIngestQueue
+
+
+def run_scans(app, tags, **kwargs):
+    results = []
+
+    async def scenario():
+        queue = ScanIngestQueue(app, on_result=results.append, **kwargs)
+        await queue.start()
+        for tag in tags:
+            await queue.submit(tag, datetime.now())
+        await queue.stop()
+        return queue
+
+    return asyncio.run(scenario()), results
+
+
+def test_batch_marks_attendance_once_per_student(app):
+    queue, results = run_scans(app, ['TAG001', 'TAG002', 'TAG001', 'BOGUS'])
+
+    assert [r.status for r in results] == ['success', 'success', 'already_marked', 'invalid_tag']
+    assert queue.batches == 1
+    assert queue.stats()['scans_written'] == 4
+
+    with app.app_context():
+        assert Attendance.query.count() == 2
+        logs = RFIDScanLog.query.order_by(RFIDScanLog.id).all()
+        assert [log.status for log in logs] == ['success', 'success', 'already_marked', 'invalid_tag']
+        assert logs[0].attendance_id is not None
+
+
+def test_batches_are_size_bounded(app):
+    queue, results = run_scans(app, ['TAG001'] * 10, batch_size=4)
+
+    assert len(results) == 10
+    assert queue.batches == 3
+    assert queue.stats()['max_queue_depth'] <= queue.max_queue_size
+
+
+def test_full_queue_rejects_without_blocking(app):
+    async def scenario():
+        queue = ScanIngestQueue(app, max_queue_size=2)
+        await queue.start()
+        accepted = [queue.submit_nowait('TAG001') for _ in range(5)]
+        await queue.stop()
+        return queue, accepted
+
+    queue, accepted = asyncio.run(scenario())
+    assert accepted.count(True) == 2
+    assert queue.stats()['rejected'] == 3
+
+
+def test_roster_invalidation_picks_up_deactivated_students(app):
+    from models import db, Student
+    from roster_cache import roster_cache
+
+    with app.app_context():
+        roster_cache.load()
+        assert roster_cache.resolve_tag('TAG003').full_name == 'Rahul Verma'
+
+        Student.query.filter_by(rfid_tag='TAG003').one().is_active = False
+        db.session.commit()
+        assert roster_cache.resolve_tag('TAG003') is not None  # still cached
+        roster_cache.invalidate()
+        assert roster_cache.resolve_tag('TAG003') is None
+
+
+def test_repeat_taps_are_answered_from_presence_bitmap(app):
+    from presence import presence_bitmap
+
+    run_scans(app, ['TAG001'])
+    hits_before = presence_bitmap.hits
+    _, results = run_scans(app, ['TAG001', 'TAG001'])
+
+    assert [r.status for r in results] == ['already_marked', 'already_marked']
+    assert presence_bitmap.hits - hits_before == 2
+    with app.app_context():
+        assert Attendance.query.count() == 1
+        assert RFIDScanLog.query.filter_by(status='already_marked').count() == 2
+
+
+def test_batches_are_written_off_the_event_loop(app):
+    threads = []
+
+    async def scenario():
+        queue = ScanIngestQueue(app, on_result=lambda result: threads.append(threading.current_thread().name))
+        await queue.start()
+        await queue.submit('TAG001')
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert threads and threads[0].startswith('scan-writer')
@@ -0,0 +1,119 @@
+"""
+Tests for the durable scan spool and its replay through the ingest queue
+"""
+import asyncio
+
+import scan_ingest
+from models import Attendance, RFIDScanLog
+from scan_ingest import ScanIngestQueue
+import pytest
+
+import scan_spool
+from scan_spool import ScanSpool, SpoolInUseError
+
+
+def test_scans_survive_a_database_outage(app, tmp_path, monkeypatch):
+    down = {'value': True}
+    real_resolve = scan_ingest.resolve_scan_batch
+
+    def flaky_resolve(scans, *args, **kwargs):
+        if down['value']:
+            raise RuntimeError("database is locked")
+        return real_resolve(scans, *args, **kwargs)
+
+    monkeypatch.setattr(scan_ingest, 'resolve_scan_batch', flaky_resolve)
+    spool = ScanSpool(str(tmp_path / 'scans.jsonl'))
+    results = []
+
+    async def scenario():
+        queue = ScanIngestQueue(app, on_result=results.append, spool=spool, replay_interval=0.05)
+        await queue.start()
+        for tag in ['TAG001', 'TAG002', 'BOGUS']:
+            await queue.submit(tag, reader_id='gate-1')
+        await asyncio.sleep(0.1)
+        down['value'] = False
+        await queue.submit('TAG003', reader_id='gate-1')
+        await queue.stop()
+        return queue
+
+    queue = asyncio.run(scenario())
+
+    assert [r.status for r in results[:3]] == ['spooled'] * 3
+    assert queue.stats()['replayed'] == 3
+    assert spool.backlog_bytes == 0
+    with app.app_context():
+        assert Attendance.query.count() == 3
+        logs = RFIDScanLog.query.all()
+        assert sorted(log.rfid_tag for log in logs) == ['BOGUS', 'TAG001', 'TAG002', 'TAG003']
+        assert {log.reader_id for log in logs} == {'gate-1'}
+
+
+def test_replay_after_crash_does_not_duplicate_scans(app, tmp_path):
+    path = str(tmp_path / 'scans.jsonl')
+
+    async def scenario(spool, tags):
+        queue = ScanIngestQueue(app, spool=spool)
+        await queue.start()
+        for tag in tags:
+            await queue.submit(tag, reader_id='gate-1')
+        await queue.stop()
+
+    first = ScanSpool(path)
+    asyncio.run(scenario(first, ['TAG001', 'TAG002']))
+    first.close()
+
+    # Crash after the commit but before the checkpoint was written
+    with open(f"{path}.offset", 'w') as f:
+        f.write('0')
+    spool = ScanSpool(path)
+    assert spool.backlog_bytes > 0
+    asyncio.run(scenario(spool, []))
+
+    assert spool.backlog_bytes == 0
+    with app.app_context():
+        assert RFIDScanLog.query.count() == 2
+        assert Attendance.query.count() == 2
+
+
+def test_torn_final_record_is_discarded(tmp_path):
+    from datetime import datetime
+
+    path = str(tmp_path / 'scans.jsonl')
+    spool = ScanSpool(path)
+    spool.append('TAG001', datetime(2025, 1, 6, 9, 0), 'gate-1')
+    spool.sync()
+    spool.close()
+    with open(path, 'ab') as f:
+        f.write(b'{"reader": "gate-1", "ta')
+
+    spool = ScanSpool(path)
+    assert [(r[0], r[1]) for r in spool.pending()] == [('gate-1', 'TAG001')]
+
+
+@pytest.mark.skipif(scan_spool.fcntl is None, reason='needs flock')
+def test_second_spool_on_the_same_file_is_refused(tmp_path, monkeypatch):
+    from datetime import datetime
+
+    path = str(tmp_path / 'scans.jsonl')
+    owner = ScanSpool(path)
+    owner.append('TAG001', datetime(2025, 1, 6, 9, 0), 'gate-1')
+    owner.sync()
+
+    # A second listener on the same file would interleave offsets and could compact away these scans
+    with pytest.raises(SpoolInUseError):
+        ScanSpool(path)
+    assert [r[1] for r in owner.pending()] == ['TAG001']
+
+    # Listeners given their own name get their own file
+    monkeypatch.setattr(scan_spool, 'DEFAULT_SPOOL_PATH', path)
+    other = ScanSpool(name='gate-2')
+    try:
+        assert other.path == str(tmp_path / 'scans.gate-2.jsonl')
+    finally:
+        other.close()
+
+    # Once the owner is gone the next process takes over, backlog included
+    owner.close()
+    successor = ScanSpool(path)
+    assert [r[1] for r in successor.pending()] == ['TAG001']
+    successor.close()
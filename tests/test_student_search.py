@@ -0,0 +1,87 @@
+"""
+Tests for the trigram student search index
+"""
+from datetime import date
+
+from models import db, Student
+from student_search import CANDIDATES, search_students
+
+
+def names(ids):
+    return [db.session.get(Student, student_id).full_name for student_id in ids]
+
+
+def test_substring_prefix_and_tag_matches(app):
+    with app.app_context():
+        assert sorted(names(search_students(db.session, 'rma'))) == ['Arjun Sharma', 'Rahul Verma']
+        assert names(search_students(db.session, 'arj')) == ['Arjun Sharma']
+        assert names(search_students(db.session, 'tag002')) == ['Priya Patel']
+        assert names(search_students(db.session, 'Pr')) == ['Priya Patel']
+        # Short terms match word prefixes, not arbitrary substrings
+        assert names(search_students(db.session, 'S')) == ['Arjun Sharma']
+        assert search_students(db.session, 'ha') == []
+
+
+def test_typos_still_find_the_student(app):
+    with app.app_context():
+        assert names(search_students(db.session, 'Sharam')) == ['Arjun Sharma']
+        assert names(search_students(db.session, 'rahul vemra')) == ['Rahul Verma']
+        assert search_students(db.session, 'zzzz') == []
+
+
+def test_index_follows_student_writes(app):
+    with app.app_context():
+        priya = Student.query.filter_by(full_name='Priya Patel').one()
+        priya.full_name = 'Priya Kapoor'
+        db.session.add(Student(roll_number='04', rfid_tag='TAG004', full_name='Kavya Nair',
+                               class_id=priya.class_id, enrollment_date=date.today()))
+        db.session.delete(Student.query.filter_by(full_name='Rahul Verma').one())
+        db.session.commit()
+
+        assert names(search_students(db.session, 'kapoor')) == ['Priya Kapoor']
+        assert search_students(db.session, 'patel') == []
+        assert names(search_students(db.session, 'nair')) == ['Kavya Nair']
+        assert search_students(db.session, 'verma') == []
+
+
+def test_class_and_active_filters(app):
+    with app.app_context():
+        arjun = Student.query.filter_by(full_name='Arjun Sharma').one()
+        arjun.is_active = False
+        db.session.commit()
+
+        assert search_students(db.session, 'sharma') == []
+        assert names(search_students(db.session, 'sharma', active_only=False)) == ['Arjun Sharma']
+        assert search_students(db.session, 'priya', class_id=arjun.class_id + 1) == []
+
+
+def test_short_terms_keep_the_best_matches_under_the_limit(app):
+    with app.app_context():
+        class_id = Student.query.first().class_id
+        # Many roll-number prefix hits enrolled before the exact one and the name prefix
+        for i in range(30):
+            db.session.add(Student(roll_number=f'7{i:02d}', rfid_tag=f'LIM{i:03d}', full_name=f'Pupil {i}',
+                                   class_id=class_id, enrollment_date=date.today()))
+        db.session.add(Student(roll_number='7', rfid_tag='LIM100', full_name='Zoya Khan',
+                               class_id=class_id, enrollment_date=date.today()))
+        db.session.add(Student(roll_number='99', rfid_tag='LIM101', full_name='7th Reserve',
+                               class_id=class_id, enrollment_date=date.today()))
+        db.session.commit()
+
+        assert names(search_students(db.session, '7', limit=2)) == ['Zoya Khan', '7th Reserve']
+
+
+def test_best_substring_matches_survive_the_candidate_limit(app):
+    with app.app_context():
+        class_id = Student.query.first().class_id
+        # More substring hits than CANDIDATES, all enrolled before the best ones
+        for i in range(CANDIDATES + 50):
+            db.session.add(Student(roll_number=f'R{i:03d}', rfid_tag=f'XQZ{i:04d}', full_name=f'Pupil Xqz {i}',
+                                   class_id=class_id, enrollment_date=date.today()))
+        db.session.add(Student(roll_number='900', rfid_tag='XQZ', full_name='Zoya Khan',
+                               class_id=class_id, enrollment_date=date.today()))
+        db.session.add(Student(roll_number='901', rfid_tag='PFX001', full_name='Xqzander Roy',
+                               class_id=class_id, enrollment_date=date.today()))
+        db.session.commit()
+
+        assert names(search_students(db.session, 'xqz', limit=2)) == ['Zoya Khan', 'Xqzander Roy']